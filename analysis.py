@@ -0,0 +1,340 @@
+import numpy as np
+import pandas as pd
+
+from db import METRIC_COLUMNS, day_range_epoch, escolher_granularidade, pontos_query, rollup_query, snapshots_query
+
+# ==============================================
+# CÁLCULOS DA ANÁLISE DO HISTÓRICO
+# ==============================================
+METRICAS_CRESCIMENTO = ('seguidores', 'curtidas', 'visualizacoes', 'ganhos')
+
+# Gráficos: máximo de pontos enviados por série e, acima de LIMITE_WEBGL pontos
+# no gráfico, traces WebGL em vez de SVG
+PONTOS_POR_SERIE = 1000
+LIMITE_WEBGL = 2000
+
+
+def resumo_crescimento(df, metricas=METRICAS_CRESCIMENTO):
+    """Crescimento de cada métrica entre o primeiro e o último snapshot do período.
+
+    Recebe os snapshots (colunas influencer, data e as métricas) e devolve uma
+    linha por influencer com o crescimento absoluto de cada métrica e a coluna
+    ``<metrica>_percentual``. Métricas sem dados ou com valor inicial zero
+    ficam com 0, como no resumo original.
+    """
+    metricas = list(metricas)
+    if df.empty:
+        return _crescimento(None, None, metricas)
+    return _crescimento(*_pontas(df, metricas), metricas)
+
+
+def _pontas(df, metricas):
+    """Primeiro e último valor não nulo de cada métrica por influencer, na ordem de ``data``."""
+    grupos = df.sort_values(['influencer', 'data'], kind='stable').groupby('influencer', sort=False)[metricas]
+    # first()/last() ignoram nulos, como o dropna().iloc[0] / iloc[-1] por influencer
+    return grupos.first(), grupos.last()
+
+
+def _crescimento(inicio, fim, metricas):
+    colunas = ['influencer'] + metricas + [f'{metrica}_percentual' for metrica in metricas]
+    if inicio is None or inicio.empty:
+        return pd.DataFrame(columns=colunas)
+
+    crescimento = fim - inicio
+    percentual = crescimento / inicio.where(inicio != 0) * 100
+
+    resumo = pd.concat([crescimento.fillna(0), percentual.fillna(0).add_suffix('_percentual')], axis=1)
+    return resumo.reset_index()[colunas]
+
+
+# ==============================================
+# REDUÇÃO DE PONTOS DOS GRÁFICOS (LTTB)
+# ==============================================
+def lttb_indices(x, y, limite):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto e, de cada balde intermediário, o ponto
+    que forma o maior triângulo com o escolhido antes e a média do balde
+    seguinte, o que preserva picos e vales. ``x`` precisa estar ordenado.
+    """
+    n = len(x)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    bordas = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    anterior = 0
+    for balde in range(limite - 2):
+        inicio, fim = bordas[balde], bordas[balde + 1]
+        if balde == limite - 3:
+            media_x, media_y = x[-1], y[-1]
+        else:
+            seguinte = slice(bordas[balde + 1], bordas[balde + 2])
+            media_x, media_y = x[seguinte].mean(), y[seguinte].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[balde + 1] = anterior
+    return indices
+
+
+def reduzir_series(df, x, y, por, limite=PONTOS_POR_SERIE):
+    """Aplica LTTB a cada série (grupo ``por``) com mais de ``limite`` pontos.
+
+    Retorna (df reduzido, True se alguma série foi reduzida). Linhas com ``y``
+    nulo são descartadas antes, como os gráficos já faziam.
+    """
+    if len(df) <= limite:
+        return df, False
+
+    partes = []
+    reduzido = False
+    for _, serie in df.dropna(subset=[y]).groupby(por, sort=False):
+        if len(serie) > limite:
+            serie = serie.sort_values(x, kind='stable')
+            eixo_x = serie[x]
+            if pd.api.types.is_datetime64_any_dtype(eixo_x):
+                eixo_x = eixo_x.astype('int64')
+            serie = serie.iloc[lttb_indices(eixo_x.to_numpy(), serie[y].to_numpy(), limite)]
+            reduzido = True
+        partes.append(serie)
+    if not partes:
+        return df, False
+    return pd.concat(partes, ignore_index=True), reduzido
+
+
+def modo_renderizacao(df):
+    """'webgl' para gráficos com muitos pontos, 'svg' nos demais."""
+    return 'webgl' if len(df) > LIMITE_WEBGL else 'svg'
+
+
+# ==============================================
+# ANÁLISE INCREMENTAL
+# ==============================================
+# Gerar a mesma análise de novo não relê o período inteiro: cada frame guarda
+# a marca d'água (maior ts) por influencer, a atualização lê só as linhas com
+# ts >= marca e os agregados (crescimento, engajamento e lives por mês) são
+# corrigidos só com as linhas novas e as que elas substituem. O >= pega
+# snapshots gravados no mesmo segundo da marca e o período de rollup ainda em
+# aberto; as linhas repetidas são trocadas pela versão nova pela chave.
+METRICAS_ENGAJAMENTO = ['seguidores', 'curtidas']
+
+
+def _maiores_ts(df):
+    return df.groupby('influencer')['ts'].max() if df is not None and not df.empty else pd.Series(dtype='int64')
+
+
+def marcas_dagua(maiores, influencers, inicio):
+    """{influencer: maior ts já lido}, com ``inicio`` para quem ainda não tem linhas."""
+    return {influencer: int(maiores[influencer]) if influencer in maiores.index else inicio
+            for influencer in influencers}
+
+
+def _somar(total, novos, removidos):
+    """``total`` + ``novos`` - ``removidos``, alinhando pelo índice (agregados por grupo)."""
+    for parte, sinal in ((novos, 1), (removidos, -1)):
+        if not parte.empty:
+            total = parte * sinal if total is None else total.add(parte * sinal, fill_value=0)
+    return total
+
+
+class FrameIncremental:
+    """DataFrame que só cresce; linhas novas com a mesma ``chave`` substituem as antigas."""
+
+    def __init__(self, chave):
+        self.chave = list(chave)
+        self.df = None
+
+    def acrescentar(self, novos):
+        """Junta ``novos`` ao frame e devolve as linhas antigas que eles substituíram."""
+        if self.df is None or self.df.empty:
+            self.df = novos.reset_index(drop=True)
+            return novos.iloc[:0]
+        if novos.empty:
+            return novos
+        substituidas = self.df.set_index(self.chave).index.isin(novos.set_index(self.chave).index)
+        removidas = self.df[substituidas]
+        self.df = pd.concat([self.df[~substituidas], novos], ignore_index=True)
+        return removidas
+
+
+class AnaliseIncremental:
+    """Frames e agregados de uma análise, atualizados com as linhas novas a cada geração.
+
+    ``atualizar`` recebe três frames com as colunas influencer, data e ts:
+    ``df`` (gráficos; id nos snapshots brutos, um período por linha nos
+    rollups), ``df_resumo`` (pontas para o crescimento, em ordem de data) e
+    ``df_lives`` (snapshots com live, com id).
+    """
+
+    def __init__(self, granularidade, metricas=METRICAS_CRESCIMENTO):
+        self.granularidade = granularidade
+        self.metricas = list(metricas)
+        self.graficos = FrameIncremental(['id'] if granularidade == 'bruto' else ['influencer', 'ts'])
+        self.lives = FrameIncremental(['id'])
+        self._maiores_resumo = pd.Series(dtype='int64')
+        self._inicio = self._fim = None
+        self._engajamento = None
+        self._lives_mes = None
+
+    def marcas(self, influencers, inicio):
+        """Marcas d'água de cada frame: {'df': {...}, 'resumo': {...}, 'lives': {...}}."""
+        return {
+            'df': marcas_dagua(_maiores_ts(self.graficos.df), influencers, inicio),
+            'resumo': marcas_dagua(self._maiores_resumo, influencers, inicio),
+            'lives': marcas_dagua(_maiores_ts(self.lives.df), influencers, inicio),
+        }
+
+    def atualizar(self, df, df_resumo, df_lives):
+        """Acrescenta as linhas novas e corrige os agregados; retorna quantas linhas chegaram."""
+        removidas = self.graficos.acrescentar(df)
+        self._engajamento = _somar(self._engajamento, _somas_engajamento(df), _somas_engajamento(removidas))
+
+        removidas = self.lives.acrescentar(df_lives)
+        self._lives_mes = _somar(self._lives_mes, _contagem_lives(df_lives), _contagem_lives(removidas))
+
+        if not df_resumo.empty:
+            # As linhas novas são posteriores às já vistas, então as pontas
+            # antigas vêm primeiro: first() fica com o início e last() com o fim
+            inicio, fim = _pontas(df_resumo, self.metricas)
+            if self._inicio is not None:
+                inicio = pd.concat([self._inicio, inicio]).groupby(level=0).first()
+                fim = pd.concat([self._fim, fim]).groupby(level=0).last()
+            self._inicio, self._fim = inicio, fim
+            self._maiores_resumo = _maiores_ts(df_resumo).combine(self._maiores_resumo, max,
+                                                                  fill_value=0)
+        return len(df) + len(df_lives)
+
+    @property
+    def df(self):
+        return self.graficos.df.copy()
+
+    @property
+    def df_lives(self):
+        return self.lives.df.copy()
+
+    def resumo_crescimento(self):
+        """Mesmo resultado de ``resumo_crescimento`` sobre todas as linhas já lidas."""
+        return _crescimento(self._inicio, self._fim, self.metricas)
+
+    def engajamento(self):
+        """Média de seguidores e curtidas por influencer (colunas influencer, seguidores, curtidas)."""
+        if self._engajamento is None:
+            return pd.DataFrame(columns=['influencer'] + METRICAS_ENGAJAMENTO)
+        somas = self._engajamento.xs('sum', axis=1, level=1)
+        contagens = self._engajamento.xs('count', axis=1, level=1)
+        return (somas / contagens.where(contagens > 0)).rename_axis('influencer').reset_index()
+
+    def lives_por_mes(self):
+        """Quantidade de lives por influencer e mês (colunas influencer, mes, quantidade_lives)."""
+        if self._lives_mes is None:
+            return pd.DataFrame(columns=['influencer', 'mes', 'quantidade_lives'])
+        contagens = self._lives_mes[self._lives_mes > 0].astype('int64')
+        return contagens.rename('quantidade_lives').reset_index()
+
+
+def _somas_engajamento(df):
+    if df.empty:
+        return df
+    return df.groupby('influencer')[METRICAS_ENGAJAMENTO].agg(['sum', 'count'])
+
+
+def _contagem_lives(df):
+    if df.empty:
+        return df
+    meses = pd.to_datetime(df['data']).dt.to_period('M').astype(str).rename('mes')
+    return df.groupby([df['influencer'], meses]).size()
+
+
+# ==============================================
+# CARREGAMENTO DA ANÁLISE
+# ==============================================
+# Leitura dos frames de AnaliseIncremental no banco (``database`` é um
+# db.Database), na granularidade escolhida pelo número de snapshots.
+def _consultar_snapshots(database, usuario, influencers, data_inicio, data_fim, colunas, condicao="",
+                         filtros_frios=(), marcas=None):
+    """Snapshots do SQLite somados aos do armazenamento frio que caem no intervalo.
+
+    Com ``marcas`` lê só os snapshots a partir delas, que ainda estão no SQLite.
+    """
+    query, params, dependencias = snapshots_query(usuario, influencers, data_inicio, data_fim, colunas, condicao,
+                                                  marcas)
+    if marcas:
+        return database.query_df(query, params=params)
+
+    def carregar():
+        from archive import read_cold
+
+        df = database.query_df(query, params=params)
+        df_frio = read_cold(database, usuario, influencers, *day_range_epoch(data_inicio, data_fim),
+                            [coluna.strip() for coluna in colunas.split(',')], filtros_frios)
+        if df_frio.empty:
+            return df
+        # Colunas só com NULL num dos lados viram object no concat
+        return pd.concat([df_frio, df], ignore_index=True).infer_objects()
+
+    # Só volta ao SQLite se houve escrita para algum desses influencers
+    return database.cached(('snapshots', query, tuple(params)), dependencias, carregar)
+
+
+def _consultar_rollup(database, usuario, influencers, data_inicio, data_fim, granularidade, colunas, marcas=None):
+    query, params, dependencias = rollup_query(usuario, influencers, data_inicio, data_fim, granularidade, colunas,
+                                               marcas)
+    if marcas:
+        return database.query_df(query, params=params)
+    return database.query_df_cached(query, params=params, depends_on=dependencias)
+
+
+def granularidade_da_analise(database, usuario, influencers, data_inicio, data_fim):
+    """'bruto' enquanto os snapshots do intervalo cabem nos gráficos; senão o rollup que cabe nele."""
+    query, params, dependencias = pontos_query(usuario, influencers, data_inicio, data_fim)
+    df_pontos = database.query_df_cached(query, params=params, depends_on=dependencias)
+    return escolher_granularidade(data_inicio, data_fim, int(df_pontos['pontos'].max()) if not df_pontos.empty else 0)
+
+
+def carregar_analise(database, usuario, influencers, data_inicio, data_fim, analise=None):
+    """Dados da análise na granularidade mais grossa que cabe no intervalo.
+
+    Retorna (analise, linhas_novas). A AnaliseIncremental traz o df dos
+    gráficos (em rollups, o último valor de cada período), o resumo de
+    crescimento (primeiro e último valor do período), o engajamento e as lives.
+    Com a ``analise`` anterior da mesma seleção, lê só as linhas a partir das
+    marcas d'água dela e atualiza esse objeto (se os snapshots novos mudaram a
+    granularidade, a análise é refeita do zero).
+    """
+    granularidade = granularidade_da_analise(database, usuario, influencers, data_inicio, data_fim)
+    marcas = {'df': None, 'resumo': None, 'lives': None}
+    if analise is None or analise.granularidade != granularidade:
+        analise = AnaliseIncremental(granularidade)
+    else:
+        marcas = analise.marcas(influencers, day_range_epoch(data_inicio, data_fim)[0])
+
+    colunas_lives = "id, ts, influencer, data, live_curtidas, live_visualizacoes"
+    if granularidade == 'bruto':
+        df = _consultar_snapshots(database, usuario, influencers, data_inicio, data_fim,
+                                  "id, ts, influencer, data, " + ", ".join(METRIC_COLUMNS) +
+                                  ", live_curtidas, live_visualizacoes", marcas=marcas['df'])
+        df_lives = df.loc[df['live_visualizacoes'] > 0, colunas_lives.split(", ")]
+        return analise, analise.atualizar(df, df, df_lives)
+
+    df = _consultar_rollup(database, usuario, influencers, data_inicio, data_fim, granularidade,
+                           "influencer, ts, periodo AS data, contagem, " +
+                           ", ".join(f"{metrica}_ultimo AS {metrica}" for metrica in METRIC_COLUMNS),
+                           marcas['df'])
+    # O resumo usa o rollup diário, que respeita exatamente as datas escolhidas
+    df_resumo = _consultar_rollup(database, usuario, influencers, data_inicio, data_fim, 'dia',
+                                  "influencer, ts, primeiro_ts, ultimo_ts, " + ", ".join(
+                                      f"{metrica}_primeiro, {metrica}_ultimo" for metrica in METRIC_COLUMNS),
+                                  marcas['resumo'])
+    pontas = [
+        df_resumo[['influencer', 'ts', f'{ponta}_ts'] + [f'{metrica}_{ponta}' for metrica in METRIC_COLUMNS]].set_axis(
+            ['influencer', 'ts', 'data'] + list(METRIC_COLUMNS), axis=1)
+        for ponta in ('primeiro', 'ultimo')
+    ]
+    df_resumo = pd.concat(pontas, ignore_index=True)
+    df_lives = _consultar_snapshots(database, usuario, influencers, data_inicio, data_fim, colunas_lives,
+                                    "AND live_visualizacoes > 0", [('live_visualizacoes', '>', 0)], marcas['lives'])
+    return analise, analise.atualizar(df, df_resumo, df_lives)
@@ -1,14 +1,8 @@
-from playwright.sync_api import Playwright, sync_playwright, Error as PlaywrightError
 import streamlit as st
-import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
-import plotly.express as px
-import tempfile
-import os
-import requests
-import json
-import time
+
+# pandas e plotly só são importados depois do login (ver main_app), para a tela
+# de login abrir rápido e o executável do PyInstaller não carregar tudo na partida.
 
 # ==============================================
 # CONFIGURAÇÃO INICIAL DO APP
@@ -111,6 +105,8 @@ def get_influencer_data(influencers_list, start_date, end_date):
     Simula a busca de dados de influencers, incluindo um tratamento de erro robusto.
     Para fins de demonstração, retorna dados simulados.
     """
+    import pandas as pd
+
     st.info("Buscando dados. Isso pode levar alguns segundos...")
 
     try:
@@ -158,6 +154,9 @@ def get_influencer_data(influencers_list, start_date, end_date):
 # ==============================================
 
 def main_app():
+    import pandas as pd
+    import plotly.express as px
+
     st.sidebar.title("Navegação")
     page = st.sidebar.radio("Selecione a página", ["Painel Principal", "Análise de Produtos"])
 
@@ -1,15 +1,19 @@
-from playwright.sync_api import Playwright, sync_playwright, Error as PlaywrightError
 import streamlit as st
-import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
-import plotly.express as px
-import tempfile
 import os
-import requests
-import json
 import time
 
+from db import get_database, QUERY_CACHE_TTL_S, data_versions, influencers_query, snapshot_key, query_cache, insert_snapshot, insert_produtos, influencer_state, day_range_epoch, produtos_query, snapshots_query, SnapshotBatchWriter
+from export import FORMATOS, exportar_consulta, formatos_disponiveis
+from metrics import prometheus_text, reset as reset_metrics, span, start_exporters, summary as metrics_summary
+from utils import estimate_earnings, limpar_usernames, normalize_username
+
+# pandas, plotly, Playwright e o scraper são importados dentro das funções que
+# os usam: a tela de login não carrega nenhum deles (ver
+# benchmarks/bench_import_time.py).
+
+BATCH_FLUSH_EVERY = 20
+
 
 
 # ...
@@ -72,145 +76,60 @@ st.markdown(
 """, unsafe_allow_html=True
 )
 
-# ...existing code...
-def convert_to_int(text):
-    """Converte texto do TikTok (ex: '1.2M') para inteiro."""
-    text = text.replace(',', '').replace('.', '')
-    if 'K' in text:
-        return int(float(text.replace('K', '')) * 1000)
-    elif 'M' in text:
-        return int(float(text.replace('M', '')) * 1000000)
-    elif 'B' in text:
-        return int(float(text.replace('B', '')) * 1000000000)
-    else:
-        try:
-            return int(text)
-        except:
-            return 0
-
-def estimate_earnings(views):
-    """Estimativa simples de ganhos baseada em visualizações."""
-    # Ajuste conforme sua lógica
-    return views * 0.01
-# ...existing code...
-
 # ==============================================
 # BANCO DE DADOS
 # ==============================================
+# Recursos compartilhados entre sessões e reruns: o pool de conexões (com o
+# schema já criado) e o pool de navegadores são montados uma vez por processo.
+@st.cache_resource
+def _banco_compartilhado():
+    return get_database()
+
+
+@st.cache_resource
+def _pool_navegadores():
+    from browser_pool import get_browser_pool
+
+    return get_browser_pool()
+
+
 def init_db():
     """Inicializa o banco de dados e cria as tabelas necessárias."""
     try:
-        conn = sqlite3.connect("influencers.db", check_same_thread=False)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario TEXT UNIQUE,
-            senha TEXT,
-            tipo TEXT
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS historico (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario TEXT,
-            influencer TEXT,
-            tipo TEXT,
-            valor INTEGER,
-            data TEXT,
-            metodo TEXT,
-            ganhos REAL,
-            live_curtidas INTEGER,
-            live_visualizacoes INTEGER
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS produtos_live (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            influencer TEXT,
-            nome_produto TEXT,
-            valor_estimado REAL,
-            data TEXT
-        )
-        """)
-
-        # Adiciona colunas se não existirem
-        try:
-            cursor.execute("ALTER TABLE historico ADD COLUMN ganhos REAL")
-        except sqlite3.OperationalError:
-            pass
-
-        try:
-            cursor.execute("ALTER TABLE historico ADD COLUMN live_curtidas INTEGER")
-        except sqlite3.OperationalError:
-            pass
-
-        try:
-            cursor.execute("ALTER TABLE historico ADD COLUMN live_visualizacoes INTEGER")
-        except sqlite3.OperationalError:
-            pass
-
-        # Adiciona ou atualiza usuários de login
-        cursor.execute("INSERT OR IGNORE INTO usuarios (usuario, senha, tipo) VALUES (?, ?, ?)",
-                       ('admin', 'alfa@01admin', 'criador'))
-        cursor.execute("INSERT OR IGNORE INTO usuarios (usuario, senha, tipo) VALUES (?, ?, ?)",
-                       ('dev', 'dev@123', 'criador'))
-
-        conn.commit()
-        return conn, cursor
+        return _banco_compartilhado()
 
     except Exception as e:
         st.error(f"Erro ao inicializar banco de dados: {str(e)}")
-        return None, None
-
+        return None
 
-conn, cursor = init_db()
 
+banco = init_db()
 
-# ==============================================
-# CONFIGURAÇÃO DO PLAYWRIGHT E NAVEGADOR
-# ==============================================
-def setup_playwright():
-    p = sync_playwright().start()
-    browser = p.chromium.launch(headless=True)
-    return p, browser
 
 # ==============================================
 # FUNÇÕES DE SCRAPING
 # ==============================================
 def get_tiktok_data_from_scraping(username):
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
-            )
-            page = context.new_page()
-
-            st.info(f"Conectando ao TikTok para buscar dados de @{username}...")
-            page.goto(f"https://www.tiktok.com/@{username}", timeout=120000)
-
-            followers_elem = page.locator("xpath=//strong[@data-e2e='followers-count']")
-            likes_elem = page.locator("xpath=//strong[@data-e2e='likes-count']")
+    import requests
+    from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+    from scraper import BlockedError, fetch_profile
+    from throttle import CircuitOpenError
 
-            # Wait for elements to be visible
-            followers_elem.wait_for(state="visible")
-            likes_elem.wait_for(state="visible")
-
-            followers_num = convert_to_int(followers_elem.inner_text())
-            likes_num = convert_to_int(likes_elem.inner_text())
-            views_num = likes_num
-
-            return {
-                'seguidores': followers_num,
-                'curtidas': likes_num,
-                'visualizacoes': views_num
-            }
+    try:
+        st.info(f"Conectando ao TikTok para buscar dados de @{username}...")
+        return fetch_profile(username)
 
-    except TimeoutError:
+    except CircuitOpenError as e:
+        st.error(f"O TikTok está recusando ou atrasando as requisições. Tente de novo em {e.retry_in:.0f}s.")
+        return None
+    except BlockedError as e:
+        st.error(f"O TikTok limitou as requisições (HTTP {e.status}) mesmo após novas tentativas. "
+                 f"Aguarde alguns minutos e tente de novo.")
+        return None
+    except requests.RequestException as e:
+        st.error(f"Erro de conexão ao buscar o perfil do influencer. Erro: {str(e)}")
+        return None
+    except PlaywrightTimeoutError:
         st.error("Erro: O tempo limite para carregar a página ou encontrar elementos foi excedido. O influencer pode não existir ou a conexão está lenta.")
         return None
     except PlaywrightError as e:
@@ -220,77 +139,62 @@ def get_tiktok_data_from_scraping(username):
         st.error(f"Erro inesperado no scraping: {str(e)}")
         return None
 
-# ...existing code...
-conn, cursor = init_db()
+# Agendador de snapshots em segundo plano (uma thread por servidor)
+if os.environ.get("SCHEDULER_IN_APP") == "1":
+    from scheduler import start_background_scheduler
 
-# ==============================================
-# FUNÇÕES UTILITÁRIAS
-# ==============================================
-def convert_to_int(text):
-    """Converte texto do TikTok (ex: '1.2M') para inteiro."""
-    text = text.replace(',', '').replace('.', '')
-    if 'K' in text:
-        return int(float(text.replace('K', '')) * 1000)
-    elif 'M' in text:
-        return int(float(text.replace('M', '')) * 1000000)
-    elif 'B' in text:
-        return int(float(text.replace('B', '')) * 1000000000)
-    else:
-        try:
-            return int(text)
-        except:
-            return 0
+    start_background_scheduler()
 
-def estimate_earnings(views):
-    """Estimativa simples de ganhos baseada em visualizações."""
-    # Ajuste conforme sua lógica
-    return views * 0.01
+# Endpoint/arquivo do Prometheus, se METRICS_PORT ou METRICS_FILE estiverem definidos
+start_exporters()
+
+# Usuários que veem o painel de desempenho
+METRICS_ADMIN_USERS = set(os.environ.get("METRICS_ADMIN_USERS", "admin").split(","))
 
-# ==============================================
-# CONFIGURAÇÃO DO PLAYWRIGHT PARA AMBIENTES HEADLESS
-# ==============================================
-def setup_playwright():
-    p = sync_playwright().start()
-    browser = p.chromium.launch(headless=True)
-    return p, browser
-# ...existing code...
 # ==============================================
 # FUNÇÕES DO APLICATIVO
 # ==============================================
 def verificar_login(usuario, senha):
     try:
-        cursor.execute("SELECT * FROM usuarios WHERE usuario=? AND senha=?", (usuario, senha))
-        return cursor.fetchone()
+        return banco.fetchone("SELECT * FROM usuarios WHERE usuario=? AND senha=?", (usuario, senha))
     except Exception as e:
         st.error(f"Erro ao verificar login: {str(e)}")
         return None
 
 
-def adicionar_registro(usuario, influencer, tipo, valor, metodo, live_curtidas=0, live_visualizacoes=0):
+def adicionar_registro(usuario, influencer, dados, live_data=None):
+    """Grava os contadores de um scraping como um snapshot do influencer."""
     try:
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ganhos_estimados = estimate_earnings(valor)
-        cursor.execute("""
-        INSERT INTO historico (usuario, influencer, tipo, valor, data, metodo, ganhos, live_curtidas, live_visualizacoes) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (usuario, influencer, tipo, valor, data, metodo, ganhos_estimados, live_curtidas, live_visualizacoes))
-        conn.commit()
-        return True
+        gravados = banco.run(lambda conn: insert_snapshot(conn, usuario, influencer, dados, live_data),
+                             "sql.insert_snapshot")
     except Exception as e:
         st.error(f"Erro ao adicionar registro: {str(e)}")
         return False
+    if not gravados:
+        st.warning(f"{influencer} já tem um snapshot gravado neste mesmo segundo; o novo foi descartado.")
+    return bool(gravados)
+
+
+def ler_lista_influencers(texto, arquivo_csv=None):
+    """Monta a lista de usernames (sem @ e sem repetição) a partir do texto e/ou de um CSV."""
+    nomes = texto.replace(',', '\n').replace(';', '\n').split() if texto else []
+
+    if arquivo_csv is not None:
+        import pandas as pd
+
+        df_csv = pd.read_csv(arquivo_csv, dtype=str)
+        colunas = [c for c in df_csv.columns if c.strip().lower() in ('influencer', 'username', 'usuario')]
+        coluna = colunas[0] if colunas else df_csv.columns[0]
+        nomes += df_csv[coluna].dropna().tolist()
+
+    return limpar_usernames(nomes)
 
 
 def check_monthly_live_scrape(influencer, usuario):
-    cursor.execute("""
-    SELECT data FROM historico
-    WHERE influencer = ? AND usuario = ? AND live_visualizacoes > 0
-    ORDER BY data DESC LIMIT 1
-    """, (influencer, usuario))
-    last_scrape = cursor.fetchone()
-
-    if last_scrape:
-        last_date = datetime.strptime(last_scrape[0], "%Y-%m-%d %H:%M:%S")
+    estado = influencer_state(banco, usuario, influencer)
+
+    if estado and estado['ultima_live_data']:
+        last_date = datetime.strptime(estado['ultima_live_data'], "%Y-%m-%d %H:%M:%S")
         if last_date.month == datetime.now().month and last_date.year == datetime.now().year:
             return False
     return True
@@ -298,49 +202,110 @@ def check_monthly_live_scrape(influencer, usuario):
 
 def adicionar_produto_live(influencer, nome_produto, valor_estimado):
     try:
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("""
-        INSERT INTO produtos_live (influencer, nome_produto, valor_estimado, data)
-        VALUES (?, ?, ?, ?)
-        """, (influencer, nome_produto, valor_estimado, data))
-        conn.commit()
+        banco.run(lambda conn: insert_produtos(conn, [(influencer, nome_produto, valor_estimado)]), "sql.insert_produtos")
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar produto: {str(e)}")
         return False
 
 
-def get_produtos_ganhados(influencers, data_inicio, data_fim):
+def importar_produtos_live(arquivo_csv):
+    """Importa produtos de um CSV (influencer, nome_produto, valor_estimado e, opcionalmente, data)."""
+    import pandas as pd
+
     try:
-        query = """
-        SELECT influencer, nome_produto, valor_estimado, data
-        FROM produtos_live
-        WHERE influencer IN ({}) AND data >= ? AND data <= ?
-        """.format(','.join(['?'] * len(influencers)))
+        df_import = pd.read_csv(arquivo_csv)
+        faltando = {'influencer', 'nome_produto', 'valor_estimado'} - set(df_import.columns)
+        if faltando:
+            st.error(f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}")
+            return 0
+
+        influencers = df_import['influencer'].astype(str).str.strip().str.lstrip('@')
+        if 'data' in df_import.columns:
+            datas = pd.to_datetime(df_import['data'])
+        else:
+            datas = pd.Series(pd.NaT, index=df_import.index)
+        produtos = [
+            (f"@{influencer}", nome_produto, float(valor_estimado), data.to_pydatetime() if pd.notna(data) else None)
+            for influencer, nome_produto, valor_estimado, data
+            in zip(influencers, df_import['nome_produto'], df_import['valor_estimado'], datas)
+        ]
+        return banco.run(lambda conn: insert_produtos(conn, produtos), "sql.insert_produtos")
+    except Exception as e:
+        st.error(f"Erro ao importar produtos: {str(e)}")
+        return 0
 
-        params = influencers + [data_inicio.strftime("%Y-%m-%d 00:00:00"), data_fim.strftime("%Y-%m-%d 23:59:59")]
 
-        df = pd.read_sql_query(query, conn, params=params)
+def get_produtos_ganhados(influencers, data_inicio, data_fim):
+    import pandas as pd
+
+    try:
+        query, params, dependencias = produtos_query(influencers, data_inicio, data_fim)
+        df = banco.query_df_cached(query, params=params, depends_on=dependencias)
         return df
     except Exception as e:
         st.error(f"Erro ao buscar produtos: {str(e)}")
         return pd.DataFrame()
 
 
-def exportar_excel(df, filename="relatorio.xlsx"):
+ROTULOS_GRANULARIDADE = {'bruto': 'Diária', 'dia': 'Diária', 'semana': 'Semanal', 'mes': 'Mensal'}
+PERIODOS_ROLLUP = {'dia': 'dia', 'semana': 'semana', 'mes': 'mês'}
+
+
+def analise_da_sessao(usuario, influencers, data_inicio, data_fim):
+    """``carregar_analise`` reaproveitando a última análise da sessão quando a seleção é a mesma.
+
+    Sem escrita nova nesses influencers (data_versions) e dentro de
+    QUERY_CACHE_TTL_S, nem as linhas novas são consultadas. Retorna
+    (analise, linhas_novas), com linhas_novas None numa análise do zero.
+    """
+    from analysis import carregar_analise
+
+    selecao = (usuario, tuple(influencers), data_inicio, data_fim)
+    versoes = data_versions.snapshot([snapshot_key(usuario, influencer) for influencer in influencers])
+    anterior = st.session_state.get('analise')
+    if anterior is None or anterior['selecao'] != selecao:
+        analise, _ = carregar_analise(banco, usuario, influencers, data_inicio, data_fim)
+        linhas_novas = None
+    elif anterior['versoes'] == versoes and time.monotonic() - anterior['lida_em'] < QUERY_CACHE_TTL_S:
+        return anterior['analise'], 0
+    else:
+        analise, linhas_novas = carregar_analise(banco, usuario, influencers, data_inicio, data_fim,
+                                                  anterior['analise'])
+        if analise is not anterior['analise']:
+            linhas_novas = None
+    st.session_state['analise'] = {'selecao': selecao, 'versoes': versoes, 'lida_em': time.monotonic(),
+                                   'analise': analise}
+    return analise, linhas_novas
+
+
+def avisar_reducao(reduzido, total):
+    from analysis import PONTOS_POR_SERIE
+
+    if reduzido:
+        st.caption(f"Gráfico reduzido a até {PONTOS_POR_SERIE:,} pontos por série (LTTB), "
+                   f"de {total:,} pontos no período; picos e vales são mantidos.")
+
+
+COLUNAS_EXPORTACAO = ("influencer, data, seguidores, curtidas, visualizacoes, ganhos, "
+                      "live_curtidas, live_visualizacoes, metodo")
+
+
+def exportar_relatorio(query, params, dependencias, nome_base, antes=None):
+    """Botões de download; o arquivo só é gerado (ou lido do cache) quando alguém clica."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            df.to_excel(tmp.name, index=False)
-            tmp_path = tmp.name
-
-        with open(tmp_path, "rb") as f:
-            st.download_button(
-                "📊 Exportar para Excel",
-                f,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-        os.unlink(tmp_path)
+        formatos = formatos_disponiveis()
+        for coluna, formato in zip(st.columns(len(formatos)), formatos):
+            rotulo, mime = FORMATOS[formato]
+            with coluna:
+                st.download_button(
+                    f"📊 Exportar {rotulo}",
+                    lambda formato=formato: exportar_consulta(banco, query, params, formato, dependencias, antes),
+                    file_name=f"{nome_base}.{formato}",
+                    mime=mime,
+                    key=f"exportar_{nome_base}_{formato}",
+                    on_click="ignore"
+                )
     except Exception as e:
         st.error(f"Erro ao exportar arquivo: {str(e)}")
 
@@ -370,10 +335,18 @@ def login_section():
 
 
 def main_app():
+    import pandas as pd
+    import plotly.express as px
+    from analysis import modo_renderizacao, reduzir_series
+    from archive import iter_cold_rows
+    from scraper import get_profile_backend, profile_cache, scrape_many, get_page_metrics, storage_state, BATCH_CONCURRENCY, BATCH_ITEM_TIMEOUT_S, PROFILE_URL
+    from throttle import get_host_guard
+
     st.title(f"Bem-vindo, ao gerenciamento de carreira de tiktokers {st.session_state.usuario}!")
 
     st.header("1. Buscar e Adicionar Influencer")
-    influencer = st.text_input("Nome do influencer (sem @)", placeholder="ex: simoneses")
+    # Mesma chave @username que o scraper e a busca em lote usam
+    influencer = normalize_username(st.text_input("Nome do influencer (sem @)", placeholder="ex: simoneses"))
 
     if st.button("Buscar Dados e Salvar"):
         if not influencer:
@@ -389,17 +362,7 @@ def main_app():
                     st.info(f"A verificação de lives para @{influencer} já foi realizada este mês. Pulando esta etapa.")
 
                 if dados:
-                    salvo_seguidores = adicionar_registro(st.session_state.usuario, f"@{influencer}", 'seguidores',
-                                          dados['seguidores'], 'Scraping',
-                                          live_data.get('live_curtidas'), live_data.get('live_visualizacoes'))
-                    salvo_curtidas = adicionar_registro(st.session_state.usuario, f"@{influencer}", 'curtidas',
-                                          dados['curtidas'], 'Scraping')
-                    salvo_visualizacoes = adicionar_registro(st.session_state.usuario, f"@{influencer}",
-                                          'visualizacoes', dados['visualizacoes'], 'Scraping')
-                    salvo_ganhos = adicionar_registro(st.session_state.usuario, f"@{influencer}", 'ganhos',
-                                          estimate_earnings(dados['visualizacoes']), 'Estimativa')
-
-                    if salvo_seguidores and salvo_curtidas and salvo_visualizacoes and salvo_ganhos:
+                    if adicionar_registro(st.session_state.usuario, f"@{influencer}", dados, live_data):
                         st.success(f"Dados de @{influencer} salvos com sucesso!")
                         st.write(f"**Seguidores:** {dados['seguidores']:,}")
                         st.write(f"**Curtidas:** {dados['curtidas']:,}")
@@ -413,10 +376,73 @@ def main_app():
                 else:
                     st.error("Não foi possível obter os dados do influencer. Verifique o nome ou tente novamente.")
 
+    with st.expander("Buscar em lote (vários influencers)"):
+        texto_lote = st.text_area("Influencers (um por linha, sem @)", placeholder="simoneses\noutro_influencer")
+        arquivo_lote = st.file_uploader("Ou envie um CSV com a coluna 'influencer'", type=["csv"])
+        col_conc, col_timeout = st.columns(2)
+        with col_conc:
+            concorrencia = st.number_input("Buscas simultâneas", min_value=1, max_value=16, value=BATCH_CONCURRENCY)
+        with col_timeout:
+            timeout_item = st.number_input("Tempo limite por influencer (s)", min_value=10,
+                                           max_value=300, value=int(BATCH_ITEM_TIMEOUT_S))
+
+        if st.button("Buscar Lote e Salvar"):
+            usernames = ler_lista_influencers(texto_lote, arquivo_lote)
+            if not usernames:
+                st.warning("Informe ao menos um influencer no texto ou no CSV.")
+            else:
+                progresso = st.progress(0.0, text=f"0 de {len(usernames)} influencers processados")
+                status_lote = []
+                # Grava os snapshots em lotes, numa transação por lote
+                escritor = SnapshotBatchWriter(banco, flush_every=BATCH_FLUSH_EVERY)
+                # Itens de status_lote ainda no buffer do escritor; só viram 'Salvo'
+                # depois que o lote deles é gravado, e um erro no flush derruba o lote inteiro
+                pendentes = []
+
+                def concluir_pendentes(erro=None):
+                    for item in pendentes:
+                        item['status'] = f"Falha: Erro ao salvar no banco ({erro})" if erro else 'Salvo'
+                    pendentes.clear()
+
+                def registrar_resultado(username, dados, erro):
+                    if dados:
+                        item = {'influencer': f"@{username}", 'status': 'Pendente', **dados}
+                        status_lote.append(item)
+                        pendentes.append(item)
+                        try:
+                            escritor.add(st.session_state.usuario, f"@{username}", dados)
+                        except Exception as e:
+                            concluir_pendentes(e)
+                        else:
+                            if not escritor.pending:
+                                concluir_pendentes()
+                    else:
+                        status_lote.append({'influencer': f"@{username}", 'status': f"Falha: {erro}"})
+                    progresso.progress(len(status_lote) / len(usernames),
+                                       text=f"{len(status_lote)} de {len(usernames)} influencers processados")
+
+                try:
+                    scrape_many(usernames, concurrency=int(concorrencia), timeout=float(timeout_item),
+                                on_result=registrar_resultado)
+                except Exception as e:
+                    st.error(f"Erro inesperado na busca em lote: {str(e)}")
+
+                try:
+                    escritor.flush()
+                except Exception as e:
+                    concluir_pendentes(e)
+                    st.error(f"Erro ao salvar os últimos registros do lote: {str(e)}")
+                else:
+                    concluir_pendentes()
+
+                if status_lote:
+                    salvos = sum(1 for item in status_lote if item['status'] == 'Salvo')
+                    st.success(f"{salvos} de {len(usernames)} influencers salvos.")
+                    st.dataframe(pd.DataFrame(status_lote), use_container_width=True)
+
     st.header("2. Análise do Histórico de Influencers")
-    influencers_disponiveis = pd.read_sql_query(
-        "SELECT DISTINCT influencer FROM historico WHERE usuario = ?", conn, params=[st.session_state.usuario]
-    )['influencer'].tolist()
+    query, params, dependencias = influencers_query(st.session_state.usuario)
+    influencers_disponiveis = banco.query_df_cached(query, params=params, depends_on=dependencias)['influencer'].tolist()
 
     if not influencers_disponiveis:
         st.info("Nenhum influencer encontrado no histórico. Use a seção acima para adicionar um.")
@@ -441,20 +467,21 @@ def main_app():
             if not influencers_selecionados:
                 st.warning("Por favor, selecione ao menos um influencer.")
             else:
-                query = """
-                SELECT influencer, tipo, valor, data, ganhos, live_curtidas, live_visualizacoes
-                FROM historico
-                WHERE usuario = ? AND data >= ? AND data <= ? AND influencer IN ({})
-                """.format(','.join(['?'] * len(influencers_selecionados)))
-
-                params = [st.session_state.usuario, data_inicio.strftime("%Y-%m-%d 00:00:00"),
-                          data_fim.strftime("%Y-%m-%d 23:59:59")] + influencers_selecionados
-
-                df = pd.read_sql_query(query, conn, params=params)
+                with span("analise.carregar"):
+                    analise, linhas_novas = analise_da_sessao(
+                        st.session_state.usuario, influencers_selecionados, data_inicio, data_fim)
+                df, df_lives, granularidade = analise.df, analise.df_lives, analise.granularidade
 
                 if not df.empty:
-                    df['data'] = pd.to_datetime(df['data'])
-                    df = df.sort_values(by=['influencer', 'data'])
+                    if linhas_novas is not None:
+                        st.caption(f"Análise atualizada a partir da anterior: {linhas_novas:,} linhas novas lidas.")
+                    with span("pandas.preparar"):
+                        df['data'] = pd.to_datetime(df['data'])
+                        df = df.sort_values(by=['influencer', 'data'])
+                    rotulo_variacao = ROTULOS_GRANULARIDADE[granularidade]
+                    if granularidade != 'bruto':
+                        st.caption(f"Intervalo longo: gráficos com um ponto por {PERIODOS_ROLLUP[granularidade]} "
+                                   f"(último valor de cada período).")
 
                     escala = 1
                     unidade_label = ""
@@ -468,111 +495,88 @@ def main_app():
                         escala = 100000
                         unidade_label = " (em Cem Milhares)"
 
-                    df['valor_escala'] = df['valor'] / escala
                     df['ganhos_escala'] = df['ganhos'] / escala
 
                     st.subheader("Resumo do Crescimento no Período")
-                    crescimento_df = pd.DataFrame()
-
-                    for influencer in influencers_selecionados:
-                        temp_df = df[df['influencer'] == influencer]
-                        if not temp_df.empty:
-                            crescimentos = {}
-                            for tipo in ['seguidores', 'curtidas', 'visualizacoes']:
-                                df_tipo = temp_df[temp_df['tipo'] == tipo]
-                                if not df_tipo.empty:
-                                    start_value = df_tipo['valor'].iloc[0]
-                                    end_value = df_tipo['valor'].iloc[-1]
-                                    crescimento = end_value - start_value
-                                    crescimento_percentual = ((
-                                                                      end_value - start_value) / start_value) * 100 if start_value != 0 else 0
-                                    crescimentos[tipo] = crescimento
-                                    crescimentos[f'{tipo}_percentual'] = crescimento_percentual
-                                else:
-                                    crescimentos[tipo] = 0
-                                    crescimentos[f'{tipo}_percentual'] = 0
-
-                            df_ganhos = temp_df[temp_df['tipo'] == 'ganhos']
-                            if not df_ganhos.empty:
-                                start_ganhos = df_ganhos['valor'].iloc[0]
-                                end_ganhos = df_ganhos['valor'].iloc[-1]
-                                crescimento_ganhos = end_ganhos - start_ganhos
-                                crescimento_ganhos_percentual = ((
-                                                                         end_ganhos - start_ganhos) / start_ganhos) * 100 if start_ganhos != 0 else 0
-                            else:
-                                crescimento_ganhos = 0
-                                crescimento_ganhos_percentual = 0
-
-                            crescimento_df = pd.concat(
-                                [crescimento_df,
-                                 pd.DataFrame(
-                                     [{'influencer': influencer, **crescimentos, 'ganhos': crescimento_ganhos,
-                                       'ganhos_percentual': crescimento_ganhos_percentual}])],
-                                ignore_index=True)
+                    with span("pandas.resumo_crescimento"):
+                        crescimento_df = analise.resumo_crescimento()
 
                     if not crescimento_df.empty:
                         for index, row in crescimento_df.iterrows():
                             st.write(f"### {row['influencer']}")
                             col_seg, col_cur, col_vis, col_ganhos = st.columns(4)
                             with col_seg:
-                                st.metric("Novos Seguidores", f"{row['seguidores']:,}",
+                                st.metric("Novos Seguidores", f"{row['seguidores']:,.0f}",
                                           f"{row['seguidores_percentual']:.2f}%")
                             with col_cur:
-                                st.metric("Novas Curtidas", f"{row['curtidas']:,}",
+                                st.metric("Novas Curtidas", f"{row['curtidas']:,.0f}",
                                           f"{row['curtidas_percentual']:.2f}%")
                             with col_vis:
-                                st.metric("Novas Visualizações", f"{row['visualizacoes']:,}",
+                                st.metric("Novas Visualizações", f"{row['visualizacoes']:,.0f}",
                                           f"{row['visualizacoes_percentual']:.2f}%")
                             with col_ganhos:
                                 st.metric("Ganhos Estimados (R$)", f"R$ {row['ganhos']:,.2f}",
                                           f"{row['ganhos_percentual']:.2f}%")
 
                     st.subheader("Evolução das Métricas" + unidade_label)
-                    df_filtrado_metrica = df[df['tipo'].isin(['seguidores', 'curtidas', 'visualizacoes'])]
-                    fig_evolucao = px.line(df_filtrado_metrica, x='data', y='valor_escala', color='influencer',
-                                           line_dash='tipo',
-                                           title="Evolução de Seguidores, Curtidas e Visualizações")
-                    fig_evolucao.update_layout(yaxis_tickformat='.2s')
-                    fig_evolucao.update_traces(
-                        hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Valor: %{y:,.0f}' + unidade_label.replace(
-                            " (", "").replace(")", ""))
-                    st.plotly_chart(fig_evolucao, use_container_width=True)
+                    with span("pandas.evolucao"):
+                        df_filtrado_metrica = df.melt(id_vars=['influencer', 'data'],
+                                                      value_vars=['seguidores', 'curtidas', 'visualizacoes'],
+                                                      var_name='tipo', value_name='valor').dropna(subset=['valor'])
+                        df_filtrado_metrica['valor_escala'] = df_filtrado_metrica['valor'] / escala
+                        total_evolucao = len(df_filtrado_metrica)
+                        df_filtrado_metrica, reduzido = reduzir_series(df_filtrado_metrica, 'data', 'valor_escala',
+                                                                       ['influencer', 'tipo'])
+                    with span("chart.evolucao"):
+                        fig_evolucao = px.line(df_filtrado_metrica, x='data', y='valor_escala', color='influencer',
+                                               line_dash='tipo', render_mode=modo_renderizacao(df_filtrado_metrica),
+                                               title="Evolução de Seguidores, Curtidas e Visualizações")
+                        fig_evolucao.update_layout(yaxis_tickformat='.2s')
+                        fig_evolucao.update_traces(
+                            hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Valor: %{y:,.0f}' + unidade_label.replace(
+                                " (", "").replace(")", ""))
+                        st.plotly_chart(fig_evolucao, use_container_width=True)
+                    avisar_reducao(reduzido, total_evolucao)
 
                     # Novo gráfico de variação diária
-                    st.subheader("Variação Diária de Seguidores e Curtidas")
-                    df_seguidores = df[df['tipo'] == 'seguidores'].set_index('data')
-                    df_curtidas = df[df['tipo'] == 'curtidas'].set_index('data')
-
-                    df_seguidores_diff = df_seguidores.groupby('influencer')['valor'].diff().fillna(0)
-                    df_curtidas_diff = df_curtidas.groupby('influencer')['valor'].diff().fillna(0)
-
-                    df_variacao = pd.DataFrame({
-                        'seguidores_diff': df_seguidores_diff,
-                        'curtidas_diff': df_curtidas_diff,
-                        'influencer': df_seguidores['influencer']
-                    }).reset_index().melt(id_vars=['data', 'influencer'],
-                                          value_vars=['seguidores_diff', 'curtidas_diff'],
-                                          var_name='metrica',
-                                          value_name='variacao')
-
-                    fig_variacao = px.bar(df_variacao, x='data', y='variacao', color='influencer', barmode='group',
-                                          facet_col='metrica', title="Variação Diária de Seguidores e Curtidas")
-                    st.plotly_chart(fig_variacao, use_container_width=True)
+                    st.subheader(f"Variação {rotulo_variacao} de Seguidores e Curtidas")
+                    with span("pandas.variacao"):
+                        df_variacao = pd.DataFrame({
+                            'data': df['data'],
+                            'influencer': df['influencer'],
+                            'seguidores_diff': df.groupby('influencer')['seguidores'].diff().fillna(0),
+                            'curtidas_diff': df.groupby('influencer')['curtidas'].diff().fillna(0)
+                        }).melt(id_vars=['data', 'influencer'],
+                                              value_vars=['seguidores_diff', 'curtidas_diff'],
+                                              var_name='metrica',
+                                              value_name='variacao')
+
+                    with span("chart.variacao"):
+                        fig_variacao = px.bar(df_variacao, x='data', y='variacao', color='influencer', barmode='group',
+                                              facet_col='metrica', title=f"Variação {rotulo_variacao} de Seguidores e Curtidas")
+                        st.plotly_chart(fig_variacao, use_container_width=True)
 
                     st.subheader("Evolução de Ganhos Estimados (R$)" + unidade_label)
-                    df_filtrado_ganhos = df[df['tipo'] == 'ganhos']
-                    fig_ganhos = px.line(df_filtrado_ganhos, x='data', y='valor_escala', color='influencer',
-                                         title="Evolução de Ganhos Estimados")
-                    fig_ganhos.update_layout(yaxis_tickformat='.2s')
-                    fig_ganhos.update_traces(
-                        hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Ganhos: R$ %{y:,.2f}')
-                    st.plotly_chart(fig_ganhos, use_container_width=True)
+                    with span("pandas.ganhos"):
+                        df_filtrado_ganhos = df.dropna(subset=['ganhos'])
+                        total_ganhos = len(df_filtrado_ganhos)
+                        df_filtrado_ganhos, reduzido = reduzir_series(df_filtrado_ganhos, 'data', 'ganhos_escala',
+                                                                      'influencer')
+                    with span("chart.ganhos"):
+                        fig_ganhos = px.line(df_filtrado_ganhos, x='data', y='ganhos_escala', color='influencer',
+                                             render_mode=modo_renderizacao(df_filtrado_ganhos),
+                                             title="Evolução de Ganhos Estimados")
+                        fig_ganhos.update_layout(yaxis_tickformat='.2s')
+                        fig_ganhos.update_traces(
+                            hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Ganhos: R$ %{y:,.2f}')
+                        st.plotly_chart(fig_ganhos, use_container_width=True)
+                    avisar_reducao(reduzido, total_ganhos)
 
                     st.subheader("Taxa de Engajamento por Influencer")
-                    df_pivot = df.pivot_table(index='influencer', columns='tipo', values='valor',
-                                              aggfunc='mean').reset_index()
+                    with span("pandas.engajamento"):
+                        df_pivot = analise.engajamento()
 
-                    if 'curtidas' in df_pivot.columns and 'seguidores' in df_pivot.columns:
+                    if df_pivot['curtidas'].notna().any() and df_pivot['seguidores'].notna().any():
                         df_pivot['taxa_engajamento_absoluta'] = (df_pivot['curtidas'] / df_pivot['seguidores']).fillna(
                             0)
                         df_engagement = df_pivot[['influencer', 'taxa_engajamento_absoluta']].round(4)
@@ -585,54 +589,65 @@ def main_app():
                         df_engagement_sorted = df_engagement.sort_values(by='taxa_engajamento_absoluta',
                                                                          ascending=False)
 
-                        fig_engajamento = px.bar(df_engagement_sorted, x='influencer', y='taxa_engajamento_absoluta',
-                                                 title="Taxa de Engajamento Média (Valor Absoluto)",
-                                                 labels={
-                                                     'taxa_engajamento_absoluta': 'Engajamento (curtidas/seguidores)',
-                                                     'influencer': 'Influencer'})
-                        st.plotly_chart(fig_engajamento, use_container_width=True)
+                        with span("chart.engajamento"):
+                            fig_engajamento = px.bar(df_engagement_sorted, x='influencer', y='taxa_engajamento_absoluta',
+                                                     title="Taxa de Engajamento Média (Valor Absoluto)",
+                                                     labels={
+                                                         'taxa_engajamento_absoluta': 'Engajamento (curtidas/seguidores)',
+                                                         'influencer': 'Influencer'})
+                            st.plotly_chart(fig_engajamento, use_container_width=True)
                     else:
                         st.info(
                             "Para visualizar a taxa de engajamento, certifique-se de que o histórico inclui dados de 'seguidores' e 'curtidas'.")
 
                     st.subheader("Análise de Lives")
-                    df_lives = df[
-                        ['influencer', 'data', 'live_curtidas', 'live_visualizacoes']].drop_duplicates().dropna(
-                        subset=['live_curtidas'])
                     if not df_lives.empty:
-                        df_lives['mes'] = df_lives['data'].dt.to_period('M')
-                        lives_por_mes = df_lives.groupby(['influencer', 'mes']).size().reset_index(
-                            name='quantidade_lives')
-                        lives_por_mes['mes'] = lives_por_mes['mes'].astype(str)
+                        with span("pandas.lives"):
+                            df_lives['data'] = pd.to_datetime(df_lives['data'])
+                            lives_por_mes = analise.lives_por_mes()
 
                         st.subheader("Quantidade de Lives por Mês")
-                        fig_lives_mes = px.bar(lives_por_mes, x='mes', y='quantidade_lives', color='influencer',
-                                               title="Quantidade de Lives Registradas por Mês")
-                        st.plotly_chart(fig_lives_mes, use_container_width=True)
+                        with span("chart.lives_mes"):
+                            fig_lives_mes = px.bar(lives_por_mes, x='mes', y='quantidade_lives', color='influencer',
+                                                   title="Quantidade de Lives Registradas por Mês")
+                            st.plotly_chart(fig_lives_mes, use_container_width=True)
 
                         st.subheader("Visualizações e Curtidas em Lives")
                         # Modificação para ajustar a escala e o hover
-                        df_lives['live_visualizacoes_k'] = df_lives['live_visualizacoes'] / 1000
-
-                        fig_lives = px.scatter(df_lives, x='data', y='live_visualizacoes_k', color='influencer',
-                                               size='live_curtidas',
-                                               hover_data={
-                                                   'live_visualizacoes': ':.0f',
-                                                   'live_curtidas': ':.0f',
-                                                   'live_visualizacoes_k': False
-                                               },
-                                               title="Visualizações e Curtidas em Lives por Período")
-
-                        fig_lives.update_layout(
-                            yaxis_title="Visualizações de Live (em milhares)",
-                            hovermode="x unified"
-                        )
-                        st.plotly_chart(fig_lives, use_container_width=True)
+                        with span("pandas.lives_escala"):
+                            df_lives['live_visualizacoes_k'] = df_lives['live_visualizacoes'] / 1000
+                            total_lives = len(df_lives)
+                            df_lives_grafico, reduzido = reduzir_series(df_lives, 'data', 'live_visualizacoes_k',
+                                                                        'influencer')
+
+                        with span("chart.lives"):
+                            fig_lives = px.scatter(df_lives_grafico, x='data', y='live_visualizacoes_k', color='influencer',
+                                                   size='live_curtidas', render_mode=modo_renderizacao(df_lives_grafico),
+                                                   hover_data={
+                                                       'live_visualizacoes': ':.0f',
+                                                       'live_curtidas': ':.0f',
+                                                       'live_visualizacoes_k': False
+                                                   },
+                                                   title="Visualizações e Curtidas em Lives por Período")
+
+                            fig_lives.update_layout(
+                                yaxis_title="Visualizações de Live (em milhares)",
+                                hovermode="x unified"
+                            )
+                            st.plotly_chart(fig_lives, use_container_width=True)
+                        avisar_reducao(reduzido, total_lives)
 
                     else:
                         st.info("Nenhum dado de live encontrado para o período selecionado.")
 
-                    exportar_excel(df, filename=f"relatorio_tiktok_{data_inicio}_{data_fim}.xlsx")
+                    # Exporta os snapshots brutos do período, mesmo quando os gráficos usam rollups
+                    exportar_relatorio(
+                        *snapshots_query(st.session_state.usuario, influencers_selecionados,
+                                        data_inicio, data_fim, COLUNAS_EXPORTACAO),
+                        nome_base=f"relatorio_tiktok_{data_inicio}_{data_fim}",
+                        antes=lambda: iter_cold_rows(banco, st.session_state.usuario, influencers_selecionados,
+                                                     *day_range_epoch(data_inicio, data_fim),
+                                                     [coluna.strip() for coluna in COLUNAS_EXPORTACAO.split(',')]))
                 else:
                     st.warning("Nenhum dado encontrado para os filtros selecionados.")
 
@@ -661,6 +676,15 @@ def main_app():
                     else:
                         st.error("Falha ao adicionar o produto.")
 
+            st.subheader("Importar Produtos em Lote")
+            arquivo_produtos = st.file_uploader(
+                "CSV com as colunas influencer, nome_produto, valor_estimado e (opcional) data",
+                type=["csv"], key="arquivo_produtos")
+            if st.button("Importar Produtos") and arquivo_produtos is not None:
+                importados = importar_produtos_live(arquivo_produtos)
+                if importados:
+                    st.success(f"{importados} produtos importados com sucesso!")
+
         with tab2:
             st.subheader("Consultar Produtos Ganhados")
             influencers_consulta_prod = st.multiselect(
@@ -688,15 +712,91 @@ def main_app():
                     if not df_produtos.empty:
                         df_produtos['data'] = pd.to_datetime(df_produtos['data']).dt.strftime('%Y-%m-%d %H:%M:%S')
                         st.dataframe(df_produtos, use_container_width=True)
-                        exportar_excel(df_produtos, filename="produtos_ganhados.xlsx")
+                        exportar_relatorio(*produtos_query(influencers_consulta_prod, data_inicio_prod, data_fim_prod),
+                                           nome_base="produtos_ganhados")
                     else:
                         st.info("Nenhum produto encontrado para os influencers e período selecionados.")
 
+    with st.sidebar.expander("Pool de navegadores"):
+        stats_pool = _pool_navegadores().stats()
+        st.write(f"**Hits:** {stats_pool['hits']} | **Misses:** {stats_pool['misses']} "
+                 f"({stats_pool['hit_rate']:.0%} de reaproveitamento)")
+        st.write(f"**Navegadores abertos:** {stats_pool['launches']} "
+                 f"(média de {stats_pool['launch_time_avg']:.2f}s para abrir)")
+        st.write(f"**Reciclagens:** {stats_pool['recycles']} | **Falhas:** {stats_pool['crashes']}")
+
+    backend = get_profile_backend()
+    if hasattr(backend, "stats"):
+        stats_backend = backend.stats()
+        st.sidebar.caption(f"Perfis lidos via HTTP: {stats_backend['primary']} | "
+                           f"via navegador (fallback): {stats_backend['fallback']}")
+
+    stats_host = get_host_guard(PROFILE_URL).stats()
+    st.sidebar.caption(f"TikTok: circuito {stats_host['circuit']}, {stats_host['concurrency']} de até "
+                       f"{stats_host['concurrency_max']} buscas simultâneas, {stats_host['rate_per_s']:g} req/s, "
+                       f"{stats_host['error_rate']:.0%} de erros recentes ({stats_host['retries']} novas tentativas, "
+                       f"{stats_host['rejected']} recusadas com o circuito aberto)")
+
+    stats_cache = profile_cache.stats()
+    st.sidebar.caption(f"Cache de perfis: {stats_cache['hit_rate']:.0%} de acertos "
+                       f"({stats_cache['hits']} hits, {stats_cache['shared']} compartilhados, "
+                       f"{stats_cache['misses']} misses, {stats_cache['size']} perfis em cache)")
+    stats_consultas = query_cache.stats()
+    st.sidebar.caption(f"Cache de consultas: {stats_consultas['hit_rate']:.0%} de acertos "
+                       f"({stats_consultas['hits']} hits, {stats_consultas['misses']} misses, "
+                       f"{stats_consultas['size']} resultados em cache)")
+
+    with st.sidebar.expander("Carregamento das páginas"):
+        metricas_paginas = get_page_metrics()
+        if not metricas_paginas:
+            st.write("Nenhuma página carregada ainda.")
+        for modo, titulo in (("lean", "Navegação enxuta"), ("full", "Navegação completa")):
+            if modo in metricas_paginas:
+                m = metricas_paginas[modo]
+                st.write(f"**{titulo}** ({m['pages']} páginas)")
+                st.write(f"{m['avg_bytes'] / 1024:,.0f} KB e {m['avg_requests']:.0f} requisições por página "
+                         f"({m['avg_blocked']:.0f} bloqueadas)")
+                st.write(f"Tempo até os contadores: {m['avg_time_to_selector']:.2f}s")
+        if "warm" in metricas_paginas and "cold" in metricas_paginas:
+            quente, frio = metricas_paginas["warm"], metricas_paginas["cold"]
+            st.write(f"**Contexto aquecido** ({quente['pages']} páginas): {quente['avg_time_to_selector']:.2f}s até os "
+                     f"contadores, contra {frio['avg_time_to_selector']:.2f}s em contexto frio "
+                     f"({frio['avg_time_to_selector'] - quente['avg_time_to_selector']:+.2f}s); "
+                     f"{quente['avg_cached']:.0f} arquivos por página vieram do cache")
+        estado = storage_state.stats()
+        idade = "sem estado salvo" if estado['age_s'] is None else f"estado salvo há {estado['age_s'] / 60:.0f} min"
+        st.caption(f"Estado do navegador: {idade}; {estado['saves']} gravações, {estado['rotations']} rotações "
+                   f"({estado['blocks']} por bloqueio)")
+
+    if st.session_state.usuario in METRICS_ADMIN_USERS:
+        painel_desempenho()
+
     if st.sidebar.button("Sair"):
         st.session_state.clear()
         st.rerun()
 
 
+def painel_desempenho():
+    """Histogramas dos spans (metrics.py), só para os usuários de METRICS_ADMIN_USERS."""
+    import pandas as pd
+
+    with st.sidebar.expander("Desempenho (admin)"):
+        resumo = metrics_summary()
+        if not resumo:
+            st.write("Nenhuma medição ainda.")
+            return
+        df_spans = pd.DataFrame.from_dict(resumo, orient='index')
+        df_spans[['avg', 'p50', 'p95', 'max']] *= 1000
+        df_spans = df_spans.rename(columns={'count': 'n', 'sum': 'total (s)', 'avg': 'média (ms)',
+                                            'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'max': 'máx (ms)'})
+        st.dataframe(df_spans.sort_values('total (s)', ascending=False).round(1), use_container_width=True)
+        st.download_button("Baixar métricas (Prometheus)", prometheus_text(), file_name="metrics.prom",
+                           mime="text/plain", on_click="ignore")
+        if st.button("Zerar métricas"):
+            reset_metrics()
+            st.rerun()
+
+
 # ==============================================
 # EXECUÇÃO PRINCIPAL
 # ==============================================
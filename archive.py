@@ -0,0 +1,180 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from db import DATE_FORMAT, get_database, to_epoch
+from export import EXPORT_CHUNK_ROWS, escrever_parquet, ler_em_blocos
+
+# ==============================================
+# ARMAZENAMENTO FRIO (PARQUET POR MÊS)
+# ==============================================
+# Snapshots com mais de ARCHIVE_AFTER_DAYS dias saem do SQLite para arquivos
+# Parquet comprimidos em COLD_STORAGE_DIR/mes=AAAA-MM/. Cada arquivo é
+# registrado em particoes_frias na mesma transação que apaga as linhas do
+# SQLite, então uma linha está sempre em um dos dois lados; arquivos fora de
+# particoes_frias (ex.: job interrompido) são ignorados e removidos na próxima
+# execução. Os rollups não são apagados, então os gráficos de intervalos longos
+# continuam vindo do SQLite, e db.rebuild_rollups também lê as partições para
+# recalcular os períodos arquivados.
+COLD_STORAGE_DIR = os.environ.get("COLD_STORAGE_DIR", "cold_storage")
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+
+SNAPSHOT_COLUMNS = ('id', 'usuario', 'influencer', 'data', 'ts', 'seguidores', 'curtidas', 'visualizacoes',
+                    'ganhos', 'live_curtidas', 'live_visualizacoes', 'metodo')
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_schema():
+    import pyarrow as pa
+
+    tipos = {'usuario': pa.string(), 'influencer': pa.string(), 'data': pa.string(), 'metodo': pa.string(),
+             'ganhos': pa.float64()}
+    return pa.schema([(coluna, tipos.get(coluna, pa.int64())) for coluna in SNAPSHOT_COLUMNS])
+
+
+def _limites_mes(mes):
+    """Epochs do início do mês 'AAAA-MM' e do início do mês seguinte."""
+    inicio = datetime.strptime(mes, "%Y-%m")
+    proximo = (inicio + timedelta(days=32)).replace(day=1)
+    return to_epoch(inicio), to_epoch(proximo)
+
+
+def remove_orphans(database, directory=COLD_STORAGE_DIR):
+    """Apaga arquivos Parquet que não chegaram a ser registrados em particoes_frias."""
+    registrados = {arquivo for (arquivo,) in database.fetchall("SELECT arquivo FROM particoes_frias")}
+    removidos = 0
+    for raiz, _, arquivos in os.walk(directory):
+        for nome in arquivos:
+            relativo = os.path.relpath(os.path.join(raiz, nome), directory)
+            if relativo not in registrados and (nome.endswith(".parquet") or nome.endswith(".tmp")):
+                os.remove(os.path.join(raiz, nome))
+                removidos += 1
+    return removidos
+
+
+def archive_snapshots(database=None, older_than_days=ARCHIVE_AFTER_DAYS, directory=COLD_STORAGE_DIR, agora=None):
+    """Move para o armazenamento frio os snapshots mais antigos que ``older_than_days``.
+
+    Grava um arquivo por mês a cada execução e retorna quantas linhas moveu.
+    """
+    database = database or get_database()
+    remove_orphans(database, directory)
+    corte = to_epoch((agora or datetime.now()) - timedelta(days=older_than_days))
+    meses = sorted(mes for (mes,) in database.fetchall(
+        "SELECT DISTINCT strftime('%Y-%m', data) FROM snapshots WHERE ts < ?", (corte,)))
+
+    total = 0
+    for mes in meses:
+        inicio, proximo = _limites_mes(mes)
+        fim = min(corte, proximo)
+        linhas, ts_min, ts_max, max_id = database.fetchone(
+            "SELECT count(*), min(ts), max(ts), max(id) FROM snapshots WHERE ts >= ? AND ts < ?", (inicio, fim))
+        if not linhas:
+            continue
+
+        relativo = os.path.join(f"mes={mes}", f"part-{fim}-{uuid.uuid4().hex[:8]}.parquet")
+        caminho = os.path.join(directory, relativo)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # id <= max_id deixa de fora linhas antigas gravadas depois da contagem
+        filtro = (inicio, fim, max_id)
+
+        def escrever(conn):
+            colunas, blocos = ler_em_blocos(conn, f"""
+            SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots
+            WHERE ts >= ? AND ts < ? AND id <= ? ORDER BY ts
+            """, filtro, EXPORT_CHUNK_ROWS)
+            with open(caminho + ".tmp", "wb") as destino:
+                escrever_parquet(colunas, blocos, destino, schema=_snapshot_schema())
+
+        def mover(conn):
+            with conn:
+                conn.execute("""
+                INSERT INTO particoes_frias (arquivo, mes, ts_min, ts_max, linhas, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, (relativo, mes, ts_min, ts_max, linhas, datetime.now().strftime(DATE_FORMAT)))
+                conn.execute("DELETE FROM snapshots WHERE ts >= ? AND ts < ? AND id <= ?", filtro)
+
+        database.run(escrever, "archive.write_parquet")
+        os.replace(caminho + ".tmp", caminho)
+        database.run(mover, "archive.delete_rows")
+        total += linhas
+        logger.info("Arquivados %d snapshots de %s em %s", linhas, mes, relativo)
+    return total
+
+
+# ==============================================
+# LEITURA DO ARMAZENAMENTO FRIO
+# ==============================================
+def _arquivos(database, inicio, fim, directory):
+    """Partições com algum snapshot entre os epochs ``inicio`` e ``fim``."""
+    return [os.path.join(directory, arquivo) for (arquivo,) in database.fetchall(
+        "SELECT arquivo FROM particoes_frias WHERE ts_max >= ? AND ts_min <= ? ORDER BY ts_min", (inicio, fim))]
+
+
+def _filtros(usuario, influencers, inicio, fim, extras):
+    return [('usuario', '=', usuario), ('influencer', 'in', list(influencers)),
+            ('ts', '>=', inicio), ('ts', '<=', fim), *extras]
+
+
+def read_cold(database, usuario, influencers, inicio, fim, colunas, filtros=(), directory=COLD_STORAGE_DIR):
+    """Snapshots frios do intervalo como DataFrame, lendo só as partições que se sobrepõem a ele.
+
+    ``filtros`` são condições extras no formato do pyarrow, ex.: [('live_visualizacoes', '>', 0)].
+    """
+    arquivos = _arquivos(database, inicio, fim, directory)
+    if not arquivos:
+        return pd.DataFrame(columns=list(colunas))
+
+    import pyarrow.parquet as pq
+
+    tabela = pq.read_table(arquivos, columns=list(colunas),
+                           filters=_filtros(usuario, influencers, inicio, fim, filtros))
+    return tabela.to_pandas()
+
+
+def iter_cold_rows(database, usuario, influencers, inicio, fim, colunas, chunk_rows=EXPORT_CHUNK_ROWS,
+                   directory=COLD_STORAGE_DIR):
+    """Blocos de linhas (tuplas em ``colunas``) do armazenamento frio, uma partição por vez.
+
+    A lista de partições é consultada já na chamada, não na iteração: quem
+    itera (ex.: export.gerar_arquivo) pode estar segurando uma conexão do
+    pool, e pedir outra ali travaria com o pool cheio.
+    """
+    arquivos = _arquivos(database, inicio, fim, directory)
+    return _ler_particoes(arquivos, _filtros(usuario, influencers, inicio, fim, ()), colunas, chunk_rows)
+
+
+def iter_partitions(arquivos, filtros=(), chunk_rows=EXPORT_CHUNK_ROWS, directory=COLD_STORAGE_DIR):
+    """Blocos de snapshots (tuplas em SNAPSHOT_COLUMNS) das partições ``arquivos`` de particoes_frias.
+
+    Para quem já tem a lista de partições, como os rebuilds de db.py, que
+    recebem uma conexão em vez do Database.
+    """
+    return _ler_particoes([os.path.join(directory, arquivo) for arquivo in arquivos], list(filtros) or None,
+                          SNAPSHOT_COLUMNS, chunk_rows)
+
+
+def _ler_particoes(arquivos, filtros, colunas, chunk_rows):
+    if not arquivos:
+        return
+
+    import pyarrow.parquet as pq
+
+    for arquivo in arquivos:
+        tabela = pq.read_table(arquivo, columns=list(colunas), filters=filtros)
+        for lote in tabela.to_batches(chunk_rows):
+            yield list(zip(*(coluna.to_pylist() for coluna in lote.columns)))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    total = archive_snapshots()
+    logger.info("Arquivamento concluído: %d snapshots movidos para %s", total, COLD_STORAGE_DIR)
+
+
+if __name__ == "__main__":
+    main()
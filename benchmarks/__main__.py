@@ -0,0 +1,71 @@
+"""Roda todos os benchmarks sobre um banco sintético e grava os resultados em JSON.
+
+Uso: python -m benchmarks [--usuarios N] [--influencers M] [--snapshots K] [--banco caminho.db] [--saida arquivo.json]
+
+Sem --banco, o histórico é gerado num diretório temporário. O JSON traz o
+commit atual para comparar execuções entre commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import bench_bulk_insert, bench_growth_summary, bench_import_time, bench_parse_counts, bench_queries
+from benchmarks.dataset import gerar_banco
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=2)
+    parser.add_argument("--influencers", type=int, default=50)
+    parser.add_argument("--snapshots", type=int, default=1500, help="snapshots por influencer (um a cada 6h)")
+    parser.add_argument("--produtos", type=int, default=20, help="produtos por influencer")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--banco", help="banco já gerado por benchmarks.dataset (não é alterado)")
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmark-<commit>.json)")
+    args = parser.parse_args()
+
+    commit = _commit_atual()
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = args.banco
+        if banco is None:
+            banco = os.path.join(diretorio, "influencers.db")
+            inicio = time.perf_counter()
+            resultados['dataset'] = gerar_banco(banco, args.usuarios, args.influencers, args.snapshots,
+                                                args.produtos)
+            resultados['dataset']['gerar_s'] = time.perf_counter() - inicio
+
+        resultados['consultas'] = bench_queries.run(banco, repeticoes=args.repeticoes)
+        resultados['escrita'] = bench_bulk_insert.run()
+        resultados['resumo_crescimento'] = bench_growth_summary.run([(100, 100), (1000, 100)])
+        resultados['contadores'] = bench_parse_counts.run(100_000)
+        resultados['importacao'] = bench_import_time.run()
+
+    relatorio = {
+        'commit': commit,
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parametros': vars(args),
+        'resultados': resultados,
+    }
+    saida = args.saida or f"benchmark-{commit or 'local'}.json"
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
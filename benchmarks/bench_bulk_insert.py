@@ -0,0 +1,55 @@
+"""Compara a escrita linha a linha (um commit por snapshot) com a escrita em lote.
+
+Uso: python -m benchmarks.bench_bulk_insert [linhas]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from db import connect_db, create_schema, insert_produtos, insert_snapshot, insert_snapshots, snapshot_row
+
+DADOS = {'seguidores': 150000, 'curtidas': 2500000, 'visualizacoes': 2500000}
+
+
+def _novo_banco(diretorio, nome):
+    conn = connect_db(os.path.join(diretorio, nome))
+    create_schema(conn)
+    return conn
+
+
+def bench_por_linha(conn, linhas):
+    inicio = time.perf_counter()
+    for i in range(linhas):
+        insert_snapshot(conn, 'bench', f"@influencer_{i}", DADOS)
+    return linhas / (time.perf_counter() - inicio)
+
+
+def bench_em_lote(conn, linhas):
+    inicio = time.perf_counter()
+    insert_snapshots(conn, (snapshot_row('bench', f"@influencer_{i}", DADOS) for i in range(linhas)))
+    return linhas / (time.perf_counter() - inicio)
+
+
+def bench_produtos_em_lote(conn, linhas):
+    inicio = time.perf_counter()
+    insert_produtos(conn, ((f"@influencer_{i % 100}", f"Produto {i}", 99.9) for i in range(linhas)))
+    return linhas / (time.perf_counter() - inicio)
+
+
+def run(linhas=2000):
+    with tempfile.TemporaryDirectory() as diretorio:
+        resultados = {
+            'snapshots_por_linha_rows_s': bench_por_linha(_novo_banco(diretorio, "por_linha.db"), linhas),
+            'snapshots_em_lote_rows_s': bench_em_lote(_novo_banco(diretorio, "em_lote.db"), linhas),
+            'produtos_em_lote_rows_s': bench_produtos_em_lote(_novo_banco(diretorio, "produtos.db"), linhas),
+        }
+    return resultados
+
+
+if __name__ == "__main__":
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    resultados = run(linhas)
+    for nome, valor in resultados.items():
+        print(f"{nome:32s} {valor:12,.0f}")
+    print(f"{'ganho do lote':32s} {resultados['snapshots_em_lote_rows_s'] / resultados['snapshots_por_linha_rows_s']:11.1f}x")
@@ -0,0 +1,83 @@
+"""Compara o resumo de crescimento vetorizado com o laço original por influencer.
+
+Uso: python -m benchmarks.bench_growth_summary
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis import METRICAS_CRESCIMENTO, resumo_crescimento
+
+# (influencers, snapshots por influencer); o laço antigo só roda nos menores
+TAMANHOS = [(100, 100), (1000, 100), (5000, 200), (10000, 200)]
+LIMITE_LACO = 1000
+
+
+def gerar_snapshots(influencers, snapshots, seed=42):
+    rng = np.random.default_rng(seed)
+    total = influencers * snapshots
+    inicio = rng.integers(1_000, 5_000_000, size=(influencers, 3))
+    passos = rng.integers(0, 500, size=(influencers, snapshots, 3)).cumsum(axis=1)
+    valores = (inicio[:, None, :] + passos).reshape(total, 3)
+    df = pd.DataFrame({
+        'influencer': np.repeat([f"@influencer_{i}" for i in range(influencers)], snapshots),
+        'data': np.tile(pd.date_range("2025-01-01", periods=snapshots, freq="h").values, influencers),
+        'seguidores': valores[:, 0],
+        'curtidas': valores[:, 1],
+        'visualizacoes': valores[:, 2],
+    })
+    df['ganhos'] = df['visualizacoes'] * 0.01
+    return df
+
+
+def resumo_crescimento_laco(df, influencers):
+    """Implementação anterior: máscara por influencer e pd.concat dentro do laço."""
+    crescimento_df = pd.DataFrame()
+    for influencer in influencers:
+        temp_df = df[df['influencer'] == influencer]
+        if not temp_df.empty:
+            crescimentos = {}
+            for tipo in METRICAS_CRESCIMENTO:
+                df_tipo = temp_df[tipo].dropna()
+                if not df_tipo.empty:
+                    start_value = df_tipo.iloc[0]
+                    end_value = df_tipo.iloc[-1]
+                    crescimentos[tipo] = end_value - start_value
+                    crescimentos[f'{tipo}_percentual'] = (
+                        (end_value - start_value) / start_value * 100 if start_value != 0 else 0)
+                else:
+                    crescimentos[tipo] = 0
+                    crescimentos[f'{tipo}_percentual'] = 0
+            crescimento_df = pd.concat([crescimento_df, pd.DataFrame([{'influencer': influencer, **crescimentos}])],
+                                       ignore_index=True)
+    return crescimento_df
+
+
+def _medir(fn, *args):
+    inicio = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - inicio
+
+
+def run(tamanhos=TAMANHOS):
+    resultados = []
+    for influencers, snapshots in tamanhos:
+        df = gerar_snapshots(influencers, snapshots)
+        resultado = {
+            'influencers': influencers,
+            'linhas': len(df),
+            'vetorizado_s': _medir(resumo_crescimento, df),
+            'laco_s': None,
+        }
+        if influencers <= LIMITE_LACO:
+            resultado['laco_s'] = _medir(resumo_crescimento_laco, df, df['influencer'].unique())
+        resultados.append(resultado)
+    return resultados
+
+
+if __name__ == "__main__":
+    print(f"{'influencers':>12} {'linhas':>12} {'vetorizado (s)':>15} {'laço (s)':>10}")
+    for r in run():
+        laco = f"{r['laco_s']:10.3f}" if r['laco_s'] is not None else f"{'-':>10}"
+        print(f"{r['influencers']:>12,} {r['linhas']:>12,} {r['vetorizado_s']:>15.3f} {laco}")
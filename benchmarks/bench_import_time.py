@@ -0,0 +1,87 @@
+"""Mede o tempo de importação dos módulos do app e o que a tela de login carrega.
+
+Uso: python -m benchmarks.bench_import_time
+
+Cada medição roda num interpretador novo (``python -X importtime``), já que um
+módulo importado uma vez fica em sys.modules. A tela de login é renderizada
+duas vezes com o AppTest do Streamlit, como duas visitas ao mesmo servidor: a
+segunda não deve criar o schema de novo nem importar pandas, plotly ou
+Playwright.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = ("metrics", "db", "export", "analysis", "archive", "browser_pool", "scraper", "scheduler")
+PESADOS = ("pandas", "plotly.express", "playwright", "requests", "pyarrow")
+SCRIPTS_LOGIN = ("app_backup.py", "app.py")
+
+_CARREGADOS = f"import json, sys; print(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))"
+
+_LOGIN = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+import metrics
+
+inicio = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+primeira = time.perf_counter() - inicio
+inicio = time.perf_counter()
+app.run()
+segunda = time.perf_counter() - inicio
+print(json.dumps({
+    'primeira_s': primeira,
+    'segunda_s': segunda,
+    'create_schema': metrics.summary().get('sql.create_schema', {}).get('count', 0),
+    'excecoes': [str(e.value) for e in app.exception],
+    'pesados': [m for m in %r if m in sys.modules],
+}))
+""" % (PESADOS,)
+
+
+def _python(args, env=None):
+    return subprocess.run([sys.executable, *args], cwd=RAIZ, capture_output=True, text=True, check=True,
+                          env={**os.environ, **(env or {})})
+
+
+def _cumulativo_s(stderr, modulo):
+    """Tempo cumulativo (s) de ``modulo`` na saída do -X importtime."""
+    for linha in stderr.splitlines():
+        partes = linha.split("|")
+        if len(partes) == 3 and partes[2].strip() == modulo:
+            return int(partes[1]) / 1_000_000
+    return None
+
+
+def importar(modulo):
+    processo = _python(["-X", "importtime", "-c", f"import {modulo}; {_CARREGADOS}"])
+    return {'modulo': modulo, 'importacao_s': _cumulativo_s(processo.stderr, modulo),
+            'pesados': json.loads(processo.stdout)}
+
+
+def tela_login(script):
+    with tempfile.TemporaryDirectory() as diretorio:
+        processo = _python(["-c", _LOGIN, script], env={'INFLUENCERS_DB': os.path.join(diretorio, "login.db")})
+    return {'script': script, **json.loads(processo.stdout.splitlines()[-1])}
+
+
+def run(modulos=MODULOS, scripts=SCRIPTS_LOGIN):
+    return {
+        'modulos': [importar(modulo) for modulo in modulos],
+        'login': [tela_login(script) for script in scripts],
+    }
+
+
+if __name__ == "__main__":
+    resultados = run()
+    print(f"{'módulo':>14} {'importação (s)':>15}  pesados carregados")
+    for r in resultados['modulos']:
+        print(f"{r['modulo']:>14} {r['importacao_s']:>15.3f}  {', '.join(r['pesados']) or '-'}")
+    print()
+    for r in resultados['login']:
+        print(f"{r['script']}: login em {r['primeira_s']:.2f}s (1ª visita) e {r['segunda_s']:.2f}s (2ª), "
+              f"schema criado {r['create_schema']}x, pesados: {', '.join(r['pesados']) or '-'}")
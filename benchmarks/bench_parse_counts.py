@@ -0,0 +1,67 @@
+"""Compara o parser de contadores escalar e vetorizado com o convert_to_int original.
+
+Uso: python -m benchmarks.bench_parse_counts [textos]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+from counts import parse_count, parse_counts
+
+FORMATOS = ("{inteiro}", "{milhar:,}", "{decimal}K", "{decimal}M", "{decimal_virgula} mil", "{decimal_virgula} mi")
+
+
+def convert_to_int_original(text):
+    """Implementação anterior: remove ',' e '.' antes do sufixo ('1.2M' vira 12000000)."""
+    text = text.replace(',', '').replace('.', '')
+    if 'K' in text:
+        return int(float(text.replace('K', '')) * 1000)
+    elif 'M' in text:
+        return int(float(text.replace('M', '')) * 1000000)
+    elif 'B' in text:
+        return int(float(text.replace('B', '')) * 1000000000)
+    else:
+        try:
+            return int(text)
+        except:
+            return 0
+
+
+def gerar_textos(quantidade, seed=42):
+    rng = random.Random(seed)
+    textos = []
+    for _ in range(quantidade):
+        decimal = f"{rng.randint(1, 999)}.{rng.randint(0, 9)}"
+        textos.append(rng.choice(FORMATOS).format(
+            inteiro=rng.randint(0, 999), milhar=rng.randint(1000, 10 ** 7), decimal=decimal,
+            decimal_virgula=decimal.replace('.', ',')))
+    return textos
+
+
+def _medir(fn, *args):
+    inicio = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - inicio
+
+
+def run(quantidade=200_000, distintos=5_000):
+    textos = gerar_textos(quantidade)
+    # Contadores guardados se repetem: mesma quantidade, só ``distintos`` textos diferentes
+    repetidos = pd.Series(gerar_textos(distintos)).sample(quantidade, replace=True, random_state=42)
+    return {
+        'textos': quantidade,
+        'original_s': _medir(lambda: [convert_to_int_original(texto) for texto in textos]),
+        'escalar_s': _medir(lambda: [parse_count(texto) for texto in textos]),
+        'series_s': _medir(parse_counts, pd.Series(textos)),
+        'series_repetidos_s': _medir(parse_counts, repetidos),
+        # Textos que o convert_to_int original convertia para outro valor
+        'divergencias_original': sum(convert_to_int_original(texto) != parse_count(texto) for texto in textos),
+    }
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for nome, valor in run(quantidade).items():
+        print(f"{nome:24s} {valor:12,.3f}" if isinstance(valor, float) else f"{nome:24s} {valor:12,}")
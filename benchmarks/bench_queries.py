@@ -0,0 +1,74 @@
+"""Mede as consultas da análise, o resumo de crescimento, os produtos e a exportação.
+
+Uso: python -m benchmarks.bench_queries caminho.db (gerado por benchmarks.dataset)
+"""
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from analysis import resumo_crescimento
+from db import (METRIC_COLUMNS, Database, escolher_granularidade, pontos_query, produtos_query, rollup_query,
+                snapshots_query)
+from export import formatos_disponiveis, gerar_arquivo
+
+COLUNAS_ANALISE = "influencer, data, " + ", ".join(METRIC_COLUMNS) + ", live_curtidas, live_visualizacoes"
+# Dias de histórico de cada consulta medida
+PERIODOS = (3, 30, 365)
+
+
+def medir(fn, repeticoes):
+    """Mediana, em segundos, de ``repeticoes`` execuções de ``fn``."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def run(path, usuario="usuario_0", repeticoes=3, hoje=None):
+    database = Database(path)
+    influencers = [influencer for (influencer,) in database.fetchall(
+        "SELECT DISTINCT influencer FROM rollup_mensal WHERE usuario = ?", (usuario,))]
+    data_fim = hoje or datetime.now().date()
+    resultados = {'influencers': len(influencers)}
+
+    for dias in PERIODOS:
+        data_inicio = data_fim - timedelta(days=dias - 1)
+        consulta_bruta = snapshots_query(usuario, influencers, data_inicio, data_fim, COLUNAS_ANALISE)
+        df = database.query_df(*consulta_bruta[:2])
+        resultados[f'analise_{dias}d_linhas'] = len(df)
+        resultados[f'analise_{dias}d_bruta_s'] = medir(lambda: database.query_df(*consulta_bruta[:2]), repeticoes)
+        resultados[f'resumo_{dias}d_s'] = medir(lambda: resumo_crescimento(df), repeticoes)
+
+        consulta_pontos = pontos_query(usuario, influencers, data_inicio, data_fim)
+        df_pontos = database.query_df(*consulta_pontos[:2])
+        granularidade = escolher_granularidade(data_inicio, data_fim,
+                                               int(df_pontos['pontos'].max()) if not df_pontos.empty else 0)
+        resultados[f'analise_{dias}d_granularidade'] = granularidade
+        if granularidade != 'bruto':
+            consulta_rollup = rollup_query(usuario, influencers, data_inicio, data_fim, granularidade,
+                                           "influencer, periodo, " + ", ".join(
+                                               f"{metrica}_ultimo" for metrica in METRIC_COLUMNS))
+            resultados[f'analise_{dias}d_rollup_s'] = medir(
+                lambda: database.query_df(*consulta_rollup[:2]), repeticoes)
+
+        consulta_produtos = produtos_query(influencers, data_inicio, data_fim)
+        resultados[f'produtos_{dias}d_s'] = medir(lambda: database.query_df(*consulta_produtos[:2]), repeticoes)
+
+    data_inicio = data_fim - timedelta(days=29)
+    consulta_exportacao = snapshots_query(usuario, influencers, data_inicio, data_fim, COLUNAS_ANALISE)
+    for formato in formatos_disponiveis():
+        resultados[f'exportacao_30d_{formato}_s'] = medir(
+            lambda: gerar_arquivo(database, *consulta_exportacao[:2], formato=formato), repeticoes)
+
+    database.close()
+    return resultados
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    for nome, valor in run(sys.argv[1]).items():
+        print(f"{nome:32s} {valor:12.4f}" if isinstance(valor, float) else f"{nome:32s} {valor!s:>12}")
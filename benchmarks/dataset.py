@@ -0,0 +1,64 @@
+"""Gera um banco com histórico sintético: N usuários × M influencers × K snapshots.
+
+Uso: python -m benchmarks.dataset caminho.db [usuarios] [influencers] [snapshots]
+"""
+import itertools
+import random
+import sys
+from datetime import datetime, timedelta
+
+from db import connect_db, create_schema, insert_produtos, insert_snapshots, snapshot_row
+
+# Um snapshot a cada 6 horas, como o agendador
+INTERVALO_HORAS = 6
+LOTE = 10_000
+CHANCE_LIVE = 1 / 30
+
+
+def _snapshots(rng, usuarios, influencers, snapshots, inicio):
+    for u in range(usuarios):
+        for i in range(influencers):
+            seguidores = rng.randint(1_000, 5_000_000)
+            curtidas = seguidores * rng.randint(5, 40)
+            for k in range(snapshots):
+                quando = inicio + timedelta(hours=INTERVALO_HORAS * k, seconds=rng.randint(0, 600))
+                seguidores = max(0, seguidores + rng.randint(-50, 500))
+                curtidas += rng.randint(0, 5_000)
+                live = None
+                if rng.random() < CHANCE_LIVE:
+                    live = {'live_curtidas': rng.randint(100, 50_000), 'live_visualizacoes': rng.randint(1_000, 500_000)}
+                dados = {'seguidores': seguidores, 'curtidas': curtidas, 'visualizacoes': curtidas}
+                yield snapshot_row(f"usuario_{u}", f"@influencer_{i}", dados, live, 'Agendador', quando)
+
+
+def gerar_banco(path, usuarios=2, influencers=50, snapshots=400, produtos=20, seed=42, fim=None):
+    """Preenche snapshots e produtos_live do banco em ``path``; retorna quantas linhas gravou."""
+    rng = random.Random(seed)
+    fim = fim or datetime.now().replace(microsecond=0)
+    inicio = fim - timedelta(hours=INTERVALO_HORAS * snapshots)
+
+    conn = connect_db(path)
+    create_schema(conn)
+    total_snapshots = 0
+    linhas = _snapshots(rng, usuarios, influencers, snapshots, inicio)
+    while True:
+        lote = list(itertools.islice(linhas, LOTE))
+        if not lote:
+            break
+        total_snapshots += insert_snapshots(conn, lote)
+
+    segundos = int((fim - inicio).total_seconds())
+    total_produtos = insert_produtos(conn, (
+        (f"@influencer_{i}", f"Produto {p}", round(rng.uniform(10, 2_000), 2),
+         inicio + timedelta(seconds=rng.randint(0, segundos)))
+        for i in range(influencers) for p in range(produtos)
+    ))
+    conn.close()
+    return {'snapshots': total_snapshots, 'produtos': total_produtos}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    tamanhos = [int(valor) for valor in sys.argv[2:5]]
+    print(gerar_banco(sys.argv[1], *tamanhos))
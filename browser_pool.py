@@ -0,0 +1,179 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+
+from metrics import observe, span
+
+# ==============================================
+# POOL DE NAVEGADORES CHROMIUM
+# ==============================================
+# A API síncrona do Playwright só pode ser usada na thread que a iniciou, e o
+# Streamlit executa cada sessão numa thread própria. Por isso cada navegador do
+# pool pertence a uma thread trabalhadora; as sessões apenas enfileiram tarefas
+# e aguardam o resultado.
+
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_BROWSER = int(os.environ.get("BROWSER_MAX_PAGES", "50"))
+
+
+class BrowserPool:
+    """Mantém navegadores Chromium abertos e entrega um contexto novo por tarefa.
+
+    Cada navegador é reciclado depois de ``max_pages`` tarefas ou quando deixa
+    de responder (crash). ``stats()`` informa hits/misses e tempo de abertura.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES_PER_BROWSER, launch_options=None):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.launch_options = launch_options or {"headless": True}
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._closed = False
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "launches": 0,
+            "launch_time_total": 0.0,
+            "launch_time_last": 0.0,
+            "recycles": 0,
+            "crashes": 0,
+        }
+
+    def run(self, fn, context_options=None, timeout=None):
+        """Executa ``fn(context)`` em um contexto novo e devolve o resultado."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("O pool de navegadores já foi encerrado.")
+            while len(self._workers) < self.size:
+                worker = threading.Thread(target=self._worker_loop, name=f"browser-pool-{len(self._workers)}",
+                                          daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+        future = Future()
+        self._tasks.put((fn, context_options or {}, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        """Retorna uma cópia das métricas do pool."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers"] = len(self._workers)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        stats["launch_time_avg"] = stats["launch_time_total"] / stats["launches"] if stats["launches"] else 0.0
+        return stats
+
+    def shutdown(self, timeout=30):
+        """Fecha todos os navegadores e encerra as threads do pool."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._tasks.put(None)
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _launch(self, playwright):
+        inicio = time.perf_counter()
+        browser = playwright.chromium.launch(**self.launch_options)
+        duracao = time.perf_counter() - inicio
+        observe("browser.launch", duracao)
+        with self._lock:
+            self._stats["launches"] += 1
+            self._stats["launch_time_total"] += duracao
+            self._stats["launch_time_last"] = duracao
+        return browser
+
+    def _worker_loop(self):
+        playwright = None
+        browser = None
+        pages = 0
+        try:
+            while True:
+                item = self._tasks.get()
+                if item is None:
+                    break
+                fn, context_options, future, enfileirado = item
+                observe("browser.queue_wait", time.perf_counter() - enfileirado)
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    if playwright is None:
+                        playwright = sync_playwright().start()
+                    if browser is not None and not browser.is_connected():
+                        self._count("crashes")
+                        browser = None
+                        pages = 0
+                    if browser is None:
+                        self._count("misses")
+                        browser = self._launch(playwright)
+                    else:
+                        self._count("hits")
+
+                    with span("browser.new_context"):
+                        context = browser.new_context(**context_options)
+                    try:
+                        with span("browser.task"):
+                            result = fn(context)
+                    finally:
+                        try:
+                            context.close()
+                        except PlaywrightError:
+                            pass
+                    future.set_result(result)
+                except BaseException as e:
+                    future.set_exception(e)
+
+                pages += 1
+                if browser is not None and (pages >= self.max_pages or not browser.is_connected()):
+                    if browser.is_connected():
+                        self._count("recycles")
+                    else:
+                        self._count("crashes")
+                    _close_quietly(browser)
+                    browser = None
+                    pages = 0
+        finally:
+            if browser is not None:
+                _close_quietly(browser)
+            if playwright is not None:
+                try:
+                    playwright.stop()
+                except PlaywrightError:
+                    pass
+
+
+def _close_quietly(browser):
+    try:
+        browser.close()
+    except PlaywrightError:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Retorna o pool compartilhado pelo processo, criando-o no primeiro uso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+# ==============================================
+# CACHE COM TTL E LRU
+# ==============================================
+class TTLCache:
+    """Cache em memória com expiração (TTL), despejo LRU e single-flight.
+
+    Chamadas simultâneas de ``get_or_load`` para a mesma chave compartilham uma
+    única execução do ``loader``; as demais aguardam o mesmo resultado. Erros
+    não são guardados no cache.
+
+    Com ``max_bytes``, ``sizeof(valor)`` dá o tamanho de cada valor e o LRU
+    também despeja até a soma caber nesse orçamento.
+    """
+
+    def __init__(self, ttl, max_entries, max_bytes=None, sizeof=None):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                self._remove(key)
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self._stats["misses"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, value)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def get(self, key, default=None):
+        """Valor ainda válido de ``key``, sem carregar nada (para quem não pode bloquear)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        if self.sizeof is not None:
+            self._sizes[key] = self.sizeof(value)
+            self._bytes += self._sizes[key]
+        while self._data and (len(self._data) > self.max_entries
+                              or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._remove(next(iter(self._data)))
+            self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        self._data.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def invalidate(self, key=None):
+        """Remove uma chave (ou todas, se ``key`` for None)."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self._sizes.clear()
+                self._bytes = 0
+            else:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+            stats["bytes"] = self._bytes
+        total = stats["hits"] + stats["shared"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["shared"]) / total if total else 0.0
+        return stats
+
+
+# ==============================================
+# VERSÕES DE DADOS (INVALIDAÇÃO POR CHAVE)
+# ==============================================
+class DataVersions:
+    """Contadores de versão por chave (ex.: ('snapshots', usuario, influencer)).
+
+    Quem grava chama ``bump`` para as chaves afetadas; quem guarda resultados
+    em cache inclui ``snapshot(chaves)`` na chave do cache. Assim uma escrita
+    invalida só as consultas que dependem daquelas chaves.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def snapshot(self, keys):
+        with self._lock:
+            return tuple(self._versions.get(key, 0) for key in keys)
@@ -0,0 +1,130 @@
+import re
+
+# ==============================================
+# CONTADORES DO TIKTOK (TEXTO -> INTEIRO)
+# ==============================================
+# Aceita os formatos exibidos nas páginas em inglês e em português:
+# "1234", "1,234", "1.234.567", "3.4K", "12.5M", "1,2 mil", "3,5 mi", "2 bi".
+#
+# Separadores: com "." e "," no mesmo número, o último é o decimal. Com um só
+# tipo, ele é decimal quando há sufixo ("1,2 mil") e, sem sufixo, é separador
+# de milhar quando aparece mais de uma vez ou é seguido de exatamente 3 dígitos
+# ("1,234"); senão é decimal ("12,5").
+MULTIPLICADORES = {
+    '': 1,
+    'k': 1_000,
+    'mil': 1_000,
+    'm': 1_000_000,
+    'mi': 1_000_000,
+    'mm': 1_000_000,
+    'b': 1_000_000_000,
+    'bi': 1_000_000_000,
+}
+
+# Separadores de milhar a remover, conforme o separador decimal
+AGRUPAMENTO = {'.': ',', ',': '.', '': '.,'}
+
+# Só classes ASCII explícitas e um conjunto fixo de espaços: a mesma regra
+# roda no re do Python (parse_count) e no RE2 do pyarrow (parse_counts), que
+# não têm as mesmas classes Unicode de espaço, dígito e letra
+ESPACOS = ' \t\n\r\f\v\u00a0'
+CONTAGEM_PADRAO = rf'^(?P<numero>[0-9][0-9.,]*)[{ESPACOS}]*(?P<sufixo>[a-zA-Z]*)\.?$'
+CONTAGEM_RE = re.compile(CONTAGEM_PADRAO)
+
+
+def _separador_decimal(numero, tem_sufixo):
+    """'.', ',' ou '' (sem parte decimal) para o número sem sufixo."""
+    ponto, virgula = numero.rfind('.'), numero.rfind(',')
+    if ponto >= 0 and virgula >= 0:
+        return '.' if ponto > virgula else ','
+    if ponto < 0 and virgula < 0:
+        return ''
+    separador = '.' if ponto >= 0 else ','
+    if numero.count(separador) > 1:
+        return ''
+    if not tem_sufixo and len(numero) - numero.rfind(separador) - 1 == 3:
+        return ''
+    return separador
+
+
+def parse_count(texto, default=0):
+    """Converte um contador do TikTok ('1.2M', '1,2 mil', '15,3K', '1,234') para inteiro.
+
+    Texto vazio, None ou fora do formato devolve ``default``.
+    """
+    if texto is None:
+        return default
+    correspondencia = CONTAGEM_RE.match(str(texto).strip(ESPACOS))
+    if correspondencia is None:
+        return default
+    numero, sufixo = correspondencia.group('numero', 'sufixo')
+    multiplicador = MULTIPLICADORES.get(sufixo.lower())
+    if multiplicador is None:
+        return default
+
+    decimal = _separador_decimal(numero, bool(sufixo))
+    for separador in AGRUPAMENTO[decimal]:
+        numero = numero.replace(separador, '')
+    try:
+        valor = float(numero.replace(',', '.'))
+    except ValueError:
+        return default
+    return int(round(valor * multiplicador))
+
+
+def parse_counts(textos, default=0):
+    """Versão para Series de ``parse_count``; devolve Series int64 com o mesmo índice.
+
+    Aplica as mesmas regras com kernels do pyarrow.compute (regex no RE2, sem
+    passar por Python a cada texto) e aritmética do numpy. Valores fora do
+    int64 também viram ``default``.
+    """
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    textos = pd.Series(textos)
+    # Como o str() de parse_count; nulos continuam nulos e não casam com a regex
+    brutos = pa.array(textos.astype(str))
+    if isinstance(brutos, pa.ChunkedArray):
+        brutos = brutos.combine_chunks()
+    partes = pc.extract_regex(pc.utf8_trim(brutos, ESPACOS), CONTAGEM_PADRAO)
+    numero, sufixo = pc.struct_field(partes, 'numero'), pc.ascii_lower(pc.struct_field(partes, 'sufixo'))
+
+    def para_numpy(valores, nulo=0):
+        return pc.fill_null(valores, nulo).to_numpy(zero_copy_only=False)
+
+    posicao = para_numpy(pc.index_in(sufixo, value_set=pa.array(list(MULTIPLICADORES))), -1)
+    valido = posicao >= 0
+    multiplicador = np.array(list(MULTIPLICADORES.values()), dtype='float64')[posicao]
+
+    pontos, virgulas = para_numpy(pc.count_substring(numero, '.')), para_numpy(pc.count_substring(numero, ','))
+    # Dígitos depois do último separador
+    cauda = para_numpy(pc.utf8_length(pc.replace_substring_regex(numero, r'^.*[.,]', '')))
+    ultimo_ponto = para_numpy(pc.match_substring_regex(numero, r'\.[0-9]*$'), False)
+    tem_sufixo = para_numpy(pc.utf8_length(sufixo)) > 0
+
+    # _separador_decimal: o último separador é decimal quando há dos dois tipos
+    # ou, com um tipo só, quando ele aparece uma vez e há sufixo ou a cauda não
+    # tem exatamente 3 dígitos
+    um_tipo = (pontos == 0) | (virgulas == 0)
+    tem_decimal = (pontos + virgulas > 0) & (~um_tipo | ((pontos + virgulas == 1) & (tem_sufixo | (cauda != 3))))
+    decimal_ponto = tem_decimal & ultimo_ponto
+    decimal_virgula = tem_decimal & ~ultimo_ponto
+    # Decimal repetido ("1.2,3,4") não vira float em parse_count
+    valido &= ~(decimal_ponto & (pontos > 1)) & ~(decimal_virgula & (virgulas > 1))
+
+    # Tira os separadores de milhar e deixa o decimal como '.', para o float
+    sem_pontos = pc.replace_substring(numero, '.', '')
+    limpos = pc.if_else(decimal_ponto, pc.replace_substring(numero, ',', ''),
+                        pc.if_else(decimal_virgula, pc.replace_substring(sem_pontos, ',', '.'),
+                                   pc.replace_substring(sem_pontos, ',', '')))
+    limpos = pc.if_else(valido, limpos, pa.scalar(None, limpos.type))
+
+    valores = np.rint(para_numpy(pc.cast(limpos, pa.float64()), np.nan) * multiplicador)
+    # 2**63 é exato em float64; acima dele (ou em NaN) o valor não cabe no int64
+    cabe = np.abs(valores) < 2.0 ** 63
+    resultado = np.full(len(textos), default, dtype=np.int64)
+    resultado[cabe] = valores[cabe].astype(np.int64)
+    return pd.Series(resultado, index=textos.index, dtype='int64')
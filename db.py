@@ -0,0 +1,872 @@
+import calendar
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time as time_module
+from contextlib import contextmanager
+from datetime import datetime, time
+
+from cache import DataVersions, TTLCache
+from metrics import span
+from utils import estimate_earnings
+
+# ==============================================
+# BANCO DE DADOS
+# ==============================================
+# Funções de acesso ao SQLite sem dependência do Streamlit, usadas pelo app e
+# pelos processos em segundo plano (agendador).
+DB_PATH = os.environ.get("INFLUENCERS_DB", "influencers.db")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_BUSY_RETRIES = 5
+DB_BUSY_BACKOFF_S = 0.05
+QUERY_CACHE_TTL_S = float(os.environ.get("QUERY_CACHE_TTL_S", "300"))
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "128"))
+
+# WAL deixa leitores e o escritor trabalharem ao mesmo tempo; synchronous=NORMAL
+# é seguro com WAL e evita um fsync por commit
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def connect_db(path=DB_PATH):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# As colunas ts guardam a data como inteiro (segundos), calculado a partir do
+# mesmo horário local gravado em data, sem conversão de fuso. Assim o valor é
+# igual ao de strftime('%s', data) no SQLite e as consultas por período
+# comparam inteiros em vez de texto.
+def to_epoch(dt):
+    return calendar.timegm(dt.timetuple())
+
+
+def day_range_epoch(data_inicio, data_fim):
+    """Intervalo [início do primeiro dia, fim do último dia] em ts."""
+    return to_epoch(datetime.combine(data_inicio, time.min)), to_epoch(datetime.combine(data_fim, time.max))
+
+
+def create_schema(conn):
+    """Cria as tabelas necessárias e aplica as migrações pendentes."""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT UNIQUE,
+        senha TEXT,
+        tipo TEXT
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS historico (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT,
+        influencer TEXT,
+        tipo TEXT,
+        valor INTEGER,
+        data TEXT,
+        metodo TEXT,
+        ganhos REAL,
+        live_curtidas INTEGER,
+        live_visualizacoes INTEGER
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS produtos_live (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        influencer TEXT,
+        nome_produto TEXT,
+        valor_estimado REAL,
+        data TEXT,
+        ts INTEGER
+    )
+    """)
+
+    # Um registro por scraping, com todas as métricas em colunas (substitui as
+    # quatro linhas por scraping de historico)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT NOT NULL,
+        influencer TEXT NOT NULL,
+        data TEXT NOT NULL,
+        ts INTEGER,
+        seguidores INTEGER,
+        curtidas INTEGER,
+        visualizacoes INTEGER,
+        ganhos REAL,
+        live_curtidas INTEGER,
+        live_visualizacoes INTEGER,
+        metodo TEXT,
+        UNIQUE (usuario, influencer, data)
+    )
+    """)
+
+    # Próximas execuções do agendador de snapshots (scheduler.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS agendamentos (
+        usuario TEXT,
+        influencer TEXT,
+        proxima_execucao TEXT,
+        ultima_execucao TEXT,
+        ultimo_erro TEXT,
+        PRIMARY KEY (usuario, influencer)
+    )
+    """)
+
+    # Arquivos Parquet do armazenamento frio (archive.py); só os listados aqui são lidos
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS particoes_frias (
+        arquivo TEXT PRIMARY KEY,
+        mes TEXT NOT NULL,
+        ts_min INTEGER NOT NULL,
+        ts_max INTEGER NOT NULL,
+        linhas INTEGER NOT NULL,
+        criado_em TEXT NOT NULL
+    )
+    """)
+
+    # Adiciona colunas se não existirem
+    try:
+        cursor.execute("ALTER TABLE historico ADD COLUMN ganhos REAL")
+    except sqlite3.OperationalError:
+        pass
+
+    try:
+        cursor.execute("ALTER TABLE historico ADD COLUMN live_curtidas INTEGER")
+    except sqlite3.OperationalError:
+        pass
+
+    try:
+        cursor.execute("ALTER TABLE historico ADD COLUMN live_visualizacoes INTEGER")
+    except sqlite3.OperationalError:
+        pass
+
+    try:
+        cursor.execute("ALTER TABLE snapshots ADD COLUMN ts INTEGER")
+    except sqlite3.OperationalError:
+        pass
+
+    try:
+        cursor.execute("ALTER TABLE produtos_live ADD COLUMN ts INTEGER")
+    except sqlite3.OperationalError:
+        pass
+
+    # Liga cada linha antiga ao snapshot para o qual foi migrada
+    try:
+        cursor.execute("ALTER TABLE historico ADD COLUMN snapshot_id INTEGER")
+    except sqlite3.OperationalError:
+        pass
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_historico_pendentes ON historico (id) WHERE snapshot_id IS NULL
+    """)
+
+    # Adiciona ou atualiza usuários de login
+    cursor.execute("INSERT OR IGNORE INTO usuarios (usuario, senha, tipo) VALUES (?, ?, ?)",
+                   ('admin', 'alfa@01admin', 'criador'))
+    cursor.execute("INSERT OR IGNORE INTO usuarios (usuario, senha, tipo) VALUES (?, ?, ?)",
+                   ('dev', 'dev@123', 'criador'))
+
+    conn.commit()
+
+    migrate_historico_to_snapshots(conn)
+    backfill_epoch_columns(conn)
+    create_indexes(conn)
+    create_rollups(conn)
+    create_influencer_state(conn)
+
+
+def backfill_epoch_columns(conn):
+    """Preenche ts nas linhas gravadas antes da coluna existir."""
+    with conn:
+        for tabela in ('snapshots', 'produtos_live'):
+            conn.execute(f"UPDATE {tabela} SET ts = CAST(strftime('%s', data) AS INTEGER) WHERE ts IS NULL")
+
+
+def create_indexes(conn):
+    """Índices das consultas de análise, agenda, lives e produtos."""
+    with conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_usuario_influencer_ts "
+                     "ON snapshots (usuario, influencer, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_influencer_ts ON snapshots (influencer, ts)")
+        # Cobre get_produtos_ganhados inteira, sem voltar à tabela
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_produtos_live_influencer_ts "
+                     "ON produtos_live (influencer, ts, nome_produto, valor_estimado, data)")
+
+
+# ==============================================
+# CAMADA DE ACESSO (POOL DE CONEXÕES)
+# ==============================================
+def _is_busy(erro):
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+class Database:
+    """Pool de conexões SQLite compartilhado pelas sessões do app.
+
+    Cada conexão é usada por uma thread de cada vez (``connection()``), e as
+    operações que encontram o banco ocupado (SQLITE_BUSY) são repetidas com
+    backoff exponencial (``run``).
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=DB_POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, pool_size))
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect_db(self.path)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def run(self, fn, nome="sql.run"):
+        """Executa ``fn(conn)`` com uma conexão do pool, repetindo se o banco estiver ocupado.
+
+        A duração (com espera por conexão e novas tentativas) entra no span ``nome``.
+        """
+        with span(nome):
+            return self._run(fn)
+
+    def _run(self, fn):
+        for tentativa in range(DB_BUSY_RETRIES + 1):
+            try:
+                with self.connection() as conn:
+                    return fn(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or tentativa == DB_BUSY_RETRIES:
+                    raise
+                time_module.sleep(DB_BUSY_BACKOFF_S * (2 ** tentativa) * random.uniform(0.5, 1.5))
+
+    def fetchone(self, sql, params=()):
+        return self.run(lambda conn: conn.execute(sql, params).fetchone(), "sql.fetchone")
+
+    def fetchall(self, sql, params=()):
+        return self.run(lambda conn: conn.execute(sql, params).fetchall(), "sql.fetchall")
+
+    def query_df(self, sql, params=None):
+        import pandas as pd
+
+        return self.run(lambda conn: pd.read_sql_query(sql, conn, params=params), "sql.query_df")
+
+    def query_df_cached(self, sql, params=None, depends_on=()):
+        """Como ``query_df``, mas reaproveita o resultado até uma escrita em ``depends_on``.
+
+        ``depends_on`` lista as chaves de ``data_versions`` que a consulta lê. O
+        TTL (QUERY_CACHE_TTL_S) limita o atraso para escritas feitas por outros
+        processos, que não passam por ``data_versions``.
+        """
+        return self.cached((sql, tuple(params or ())), depends_on, lambda: self.query_df(sql, params))
+
+    def cached(self, key, depends_on, loader):
+        """DataFrame de ``loader()`` guardado no cache de consultas sob ``key`` (ver query_df_cached)."""
+        chave = (self.path, key, data_versions.snapshot(depends_on))
+        return query_cache.get_or_load(chave, loader).copy()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+# Versões por (tabela, ...) usadas para invalidar o cache de consultas
+data_versions = DataVersions()
+query_cache = TTLCache(ttl=QUERY_CACHE_TTL_S, max_entries=QUERY_CACHE_MAX_ENTRIES)
+
+
+def snapshot_key(usuario, influencer):
+    return ('snapshots', usuario, influencer)
+
+
+def influencers_key(usuario):
+    return ('influencers', usuario)
+
+
+def produto_key(influencer):
+    return ('produtos', influencer)
+
+
+def get_database(path=DB_PATH):
+    """Retorna o Database do arquivo, criando o schema uma vez por processo."""
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = Database(path)
+            database.run(create_schema, "sql.create_schema")
+            _databases[path] = database
+        return database
+
+
+# ==============================================
+# MIGRAÇÃO historico -> snapshots
+# ==============================================
+# O historico antigo tem uma linha por métrica (tipo/valor) e as quatro linhas
+# de um mesmo scraping podem ter segundos diferentes. As linhas são agrupadas
+# por (usuario, influencer) em ordem de id: um snapshot termina quando tem as
+# quatro métricas, quando um tipo se repete ou quando o intervalo passa de
+# SNAPSHOT_GROUP_WINDOW_S.
+# Cada linha migrada recebe o snapshot_id correspondente, então a migração
+# roda em lotes curtos (uma transação por lote) e pode ser interrompida e
+# retomada com o app no ar.
+MIGRATION_BATCH_SIZE = 5000
+SNAPSHOT_GROUP_WINDOW_S = 60
+METRIC_COLUMNS = ('seguidores', 'curtidas', 'visualizacoes', 'ganhos')
+
+
+def _snapshot_from_rows(rows):
+    snapshot = {
+        'usuario': rows[0][1],
+        'influencer': rows[0][2],
+        'data': rows[0][5],
+        'ts': to_epoch(datetime.strptime(rows[0][5], DATE_FORMAT)),
+        'seguidores': None,
+        'curtidas': None,
+        'visualizacoes': None,
+        'ganhos': None,
+        'live_curtidas': None,
+        'live_visualizacoes': None,
+        'metodo': rows[0][6],
+    }
+    for _, _, _, tipo, valor, _, _, live_curtidas, live_visualizacoes in rows:
+        if tipo in METRIC_COLUMNS:
+            snapshot[tipo] = valor
+        if live_visualizacoes:
+            snapshot['live_curtidas'] = live_curtidas
+            snapshot['live_visualizacoes'] = live_visualizacoes
+    if snapshot['ganhos'] is None and snapshot['visualizacoes'] is not None:
+        snapshot['ganhos'] = estimate_earnings(snapshot['visualizacoes'])
+    return snapshot
+
+
+def _group_rows(rows):
+    """Agrupa as linhas de historico em snapshots. Retorna (fechados, abertos)."""
+    abertos = {}
+    fechados = []
+    for row in rows:
+        chave = (row[1], row[2])
+        grupo = abertos.get(chave)
+        if grupo is not None:
+            inicio = datetime.strptime(grupo[0][5], DATE_FORMAT)
+            atual = datetime.strptime(row[5], DATE_FORMAT)
+            if any(r[3] == row[3] for r in grupo) or (atual - inicio).total_seconds() > SNAPSHOT_GROUP_WINDOW_S:
+                fechados.append(grupo)
+                grupo = None
+        if grupo is None:
+            grupo = abertos[chave] = []
+        grupo.append(row)
+        if len({r[3] for r in grupo}) == len(METRIC_COLUMNS):
+            fechados.append(abertos.pop(chave))
+    return fechados, list(abertos.values())
+
+
+def migrate_historico_to_snapshots(conn, batch_size=MIGRATION_BATCH_SIZE):
+    """Migra as linhas de historico ainda sem snapshot_id. Retorna quantos snapshots gravou."""
+    total = 0
+
+    while True:
+        rows = conn.execute("""
+        SELECT id, usuario, influencer, tipo, valor, data, metodo, live_curtidas, live_visualizacoes
+        FROM historico WHERE snapshot_id IS NULL ORDER BY id LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            break
+
+        fechados, abertos = _group_rows(rows)
+        # Um grupo incompleto no fim do lote pode continuar no próximo; só é
+        # gravado agora se for o último lote (ou, para garantir progresso, se
+        # nenhum grupo fechou neste lote)
+        if len(rows) < batch_size:
+            fechados.extend(abertos)
+        elif not fechados:
+            fechados.append(abertos[0])
+
+        with conn:
+            for grupo in fechados:
+                snapshot = _snapshot_from_rows(grupo)
+                cur = conn.execute("""
+                INSERT OR IGNORE INTO snapshots (usuario, influencer, data, ts, seguidores, curtidas, visualizacoes,
+                                                 ganhos, live_curtidas, live_visualizacoes, metodo)
+                VALUES (:usuario, :influencer, :data, :ts, :seguidores, :curtidas, :visualizacoes,
+                        :ganhos, :live_curtidas, :live_visualizacoes, :metodo)
+                """, snapshot)
+                if cur.rowcount:
+                    snapshot_id = cur.lastrowid
+                    total += 1
+                else:
+                    snapshot_id = conn.execute(
+                        "SELECT id FROM snapshots WHERE usuario = ? AND influencer = ? AND data = ?",
+                        (snapshot['usuario'], snapshot['influencer'], snapshot['data'])).fetchone()[0]
+                conn.executemany("UPDATE historico SET snapshot_id = ? WHERE id = ?",
+                                 [(snapshot_id, row[0]) for row in grupo])
+
+    return total
+
+
+# ==============================================
+# ROLLUPS DIÁRIOS, SEMANAIS E MENSAIS
+# ==============================================
+# Um agregado por (usuario, influencer, período) com primeiro/último valor,
+# mínimo, máximo e quantidade de snapshots. Um trigger em snapshots mantém as
+# três tabelas na mesma transação do INSERT (linhas descartadas pelo INSERT OR
+# IGNORE não contam) e rebuild_rollups recalcula tudo a partir dos snapshots,
+# inclusive os que já foram para o armazenamento frio (archive.py).
+# ts é o início do período; semanas começam na segunda-feira.
+ROLLUPS = {
+    'dia': ('rollup_diario', "date({data})"),
+    'semana': ('rollup_semanal', "date({data}, '-6 days', 'weekday 1')"),
+    'mes': ('rollup_mensal', "strftime('%Y-%m-01', {data})"),
+}
+
+# Os snapshots brutos são usados enquanto o influencer com mais snapshots no
+# intervalo tiver até GRANULARIDADE_MAX_PONTOS (o mesmo limite de pontos por
+# série dos gráficos, analysis.PONTOS_POR_SERIE). Acima disso, o rollup mais
+# grosso que ainda cabe no intervalo: até N dias usa o primeiro da lista que
+# couber; acima do último limite, mensal.
+GRANULARIDADE_MAX_PONTOS = int(os.environ.get("GRANULARIDADE_MAX_PONTOS", "1000"))
+GRANULARIDADE_MAX_DIAS = (('dia', 92), ('semana', 731))
+
+
+def escolher_granularidade(data_inicio, data_fim, pontos):
+    """'bruto', 'dia', 'semana' ou 'mes' para o intervalo de datas.
+
+    ``pontos`` é o maior número de snapshots de um influencer no intervalo
+    (o máximo da coluna pontos de ``pontos_query``).
+    """
+    if pontos <= GRANULARIDADE_MAX_PONTOS:
+        return 'bruto'
+    dias = (data_fim - data_inicio).days + 1
+    for granularidade, max_dias in GRANULARIDADE_MAX_DIAS:
+        if dias <= max_dias:
+            return granularidade
+    return 'mes'
+
+
+def _rollup_upsert_sql(tabela, periodo, fonte, sufixo="", origem="snapshots"):
+    """Soma cada linha de snapshots (``fonte`` é 'NEW.' no trigger ou '' num SELECT) ao período."""
+    def col(nome):
+        return f"{fonte}{nome}"
+
+    periodo = periodo.format(data=col('data'))
+    ts = f"coalesce({col('ts')}, CAST(strftime('%s', {col('data')}) AS INTEGER))"
+    colunas = ['usuario', 'influencer', 'periodo', 'ts', 'contagem', 'primeiro_ts', 'ultimo_ts']
+    valores = [col('usuario'), col('influencer'), periodo, f"CAST(strftime('%s', {periodo}) AS INTEGER)", "1", ts, ts]
+    atualizacoes = [
+        "contagem = contagem + 1",
+        "primeiro_ts = min(primeiro_ts, excluded.primeiro_ts)",
+        "ultimo_ts = max(ultimo_ts, excluded.ultimo_ts)",
+    ]
+    for metrica in METRIC_COLUMNS:
+        colunas += [f"{metrica}_primeiro", f"{metrica}_ultimo", f"{metrica}_min", f"{metrica}_max"]
+        valores += [col(metrica)] * 4
+        # min()/max() com NULL devolvem NULL; coalesce fica com o valor que existir
+        atualizacoes += [
+            f"{metrica}_primeiro = CASE WHEN excluded.primeiro_ts < primeiro_ts "
+            f"THEN excluded.{metrica}_primeiro ELSE {metrica}_primeiro END",
+            f"{metrica}_ultimo = CASE WHEN excluded.ultimo_ts >= ultimo_ts "
+            f"THEN excluded.{metrica}_ultimo ELSE {metrica}_ultimo END",
+            f"{metrica}_min = coalesce(min({metrica}_min, excluded.{metrica}_min), {metrica}_min, excluded.{metrica}_min)",
+            f"{metrica}_max = coalesce(max({metrica}_max, excluded.{metrica}_max), {metrica}_max, excluded.{metrica}_max)",
+        ]
+
+    if fonte:
+        origem = f"VALUES ({', '.join(valores)})"
+    else:
+        # O WHERE evita a ambiguidade de parsing entre INSERT ... SELECT e ON CONFLICT
+        origem = f"SELECT {', '.join(valores)} FROM {origem} {sufixo}"
+    return (f"INSERT INTO {tabela} ({', '.join(colunas)}) {origem} "
+            f"ON CONFLICT (usuario, influencer, ts) DO UPDATE SET {', '.join(atualizacoes)}")
+
+
+def create_rollups(conn):
+    """Cria as tabelas de rollup e o trigger; preenche com ``rebuild_rollups`` se estiverem vazias."""
+    metricas = ", ".join(f"{metrica}_{sufixo} {'REAL' if metrica == 'ganhos' else 'INTEGER'}"
+                         for metrica in METRIC_COLUMNS for sufixo in ('primeiro', 'ultimo', 'min', 'max'))
+    with conn:
+        for tabela, periodo in ROLLUPS.values():
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                usuario TEXT NOT NULL,
+                influencer TEXT NOT NULL,
+                periodo TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                contagem INTEGER NOT NULL,
+                primeiro_ts INTEGER NOT NULL,
+                ultimo_ts INTEGER NOT NULL,
+                {metricas},
+                PRIMARY KEY (usuario, influencer, ts)
+            )
+            """)
+        corpo = "; ".join(_rollup_upsert_sql(tabela, periodo, "NEW.") for tabela, periodo in ROLLUPS.values())
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_snapshots_rollups AFTER INSERT ON snapshots "
+                     f"BEGIN {corpo}; END")
+
+    vazio = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM rollup_diario)").fetchone()[0]
+    if vazio and _tem_snapshots(conn):
+        rebuild_rollups(conn)
+
+
+def _tem_snapshots(conn):
+    """Se há algum snapshot, no SQLite ou no armazenamento frio."""
+    return conn.execute("SELECT EXISTS (SELECT 1 FROM snapshots) OR EXISTS (SELECT 1 FROM particoes_frias)"
+                        ).fetchone()[0]
+
+
+def rebuild_rollups(conn, usuario=None, influencer=None, directory=None):
+    """Recalcula os rollups a partir de snapshots e das partições frias (todos ou só de um usuário/influencer).
+
+    ``directory`` é o diretório do armazenamento frio (padrão: archive.COLD_STORAGE_DIR).
+    """
+    filtros, params = ["1"], []
+    if usuario is not None:
+        filtros.append("usuario = ?")
+        params.append(usuario)
+    if influencer is not None:
+        filtros.append("influencer = ?")
+        params.append(influencer)
+    where = "WHERE " + " AND ".join(filtros)
+
+    with conn:
+        for tabela, _ in ROLLUPS.values():
+            conn.execute(f"DELETE FROM {tabela} {where}", params)
+        for origem in _origens_brutas(conn, usuario, influencer, directory):
+            for tabela, periodo in ROLLUPS.values():
+                conn.execute(_rollup_upsert_sql(tabela, periodo, "", f"{where} ORDER BY ts", origem), params)
+
+
+def _origens_brutas(conn, usuario=None, influencer=None, directory=None):
+    """Tabelas com os snapshots brutos, para os rebuilds: as partições frias e depois snapshots.
+
+    As partições (archive.py) são lidas em blocos, e cada bloco passa pela
+    tabela temporária snapshots_frios antes de ser entregue. Partições
+    registradas mas ausentes do disco interrompem o rebuild, em vez de
+    apagar em silêncio os períodos arquivados.
+    """
+    arquivos = [arquivo for (arquivo,) in conn.execute("SELECT arquivo FROM particoes_frias ORDER BY ts_min")]
+    if arquivos:
+        from archive import COLD_STORAGE_DIR, SNAPSHOT_COLUMNS, iter_partitions
+
+        filtros = [(coluna, '=', valor) for coluna, valor in (('usuario', usuario), ('influencer', influencer))
+                   if valor is not None]
+        colunas = ", ".join(SNAPSHOT_COLUMNS)
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS snapshots_frios AS SELECT {colunas} FROM snapshots WHERE 0")
+        try:
+            for bloco in iter_partitions(arquivos, filtros, directory=directory or COLD_STORAGE_DIR):
+                conn.executemany(f"INSERT INTO snapshots_frios ({colunas}) "
+                                 f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})", bloco)
+                yield "snapshots_frios"
+                conn.execute("DELETE FROM snapshots_frios")
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.snapshots_frios")
+    yield "snapshots"
+
+
+# ==============================================
+# ESTADO ATUAL DE CADA INFLUENCER
+# ==============================================
+# Uma linha por (usuario, influencer) com o último scraping, o último scraping
+# com live e os últimos contadores, mantida por um trigger em snapshots na
+# mesma transação do INSERT, como os rollups. Consultas de "quando foi a última
+# vez" viram uma busca pela chave primária em vez de ordenar os snapshots do
+# par. Snapshots fora de ordem (ex.: importação) só avançam as datas; o
+# arquivamento não apaga o estado, e rebuild_influencer_state também lê as
+# partições frias.
+def _estado_upsert_sql(fonte, sufixo="", origem="snapshots"):
+    """Aplica cada linha de snapshots (``fonte`` é 'NEW.' no trigger ou '' num SELECT) ao estado do par."""
+    def col(nome):
+        return f"{fonte}{nome}"
+
+    ts = f"coalesce({col('ts')}, CAST(strftime('%s', {col('data')}) AS INTEGER))"
+    live = f"{col('live_visualizacoes')} > 0"
+    colunas = ['usuario', 'influencer', 'ultimo_ts', 'ultima_data', 'ultimo_live_ts', 'ultima_live_data',
+               *METRIC_COLUMNS, 'live_curtidas', 'live_visualizacoes']
+    valores = [col('usuario'), col('influencer'), ts, col('data'), f"CASE WHEN {live} THEN {ts} END",
+               f"CASE WHEN {live} THEN {col('data')} END",
+               *(col(coluna) for coluna in colunas[6:])]
+    recente = "excluded.ultimo_ts >= ultimo_ts"
+    live_recente = "excluded.ultimo_live_ts >= coalesce(ultimo_live_ts, excluded.ultimo_live_ts)"
+    atualizacoes = [
+        f"ultima_data = CASE WHEN {recente} THEN excluded.ultima_data ELSE ultima_data END",
+        f"ultima_live_data = CASE WHEN {live_recente} THEN excluded.ultima_live_data ELSE ultima_live_data END",
+        "ultimo_live_ts = coalesce(max(ultimo_live_ts, excluded.ultimo_live_ts), ultimo_live_ts, "
+        "excluded.ultimo_live_ts)",
+        *(f"{coluna} = CASE WHEN {recente} THEN excluded.{coluna} ELSE {coluna} END" for coluna in colunas[6:]),
+        "ultimo_ts = max(ultimo_ts, excluded.ultimo_ts)",
+    ]
+
+    if fonte:
+        origem = f"VALUES ({', '.join(valores)})"
+    else:
+        origem = f"SELECT {', '.join(valores)} FROM {origem} {sufixo}"
+    return (f"INSERT INTO influencer_state ({', '.join(colunas)}) {origem} "
+            f"ON CONFLICT (usuario, influencer) DO UPDATE SET {', '.join(atualizacoes)}")
+
+
+def create_influencer_state(conn):
+    """Cria influencer_state e o trigger; preenche com ``rebuild_influencer_state`` se estiver vazia."""
+    metricas = ", ".join(f"{metrica} {'REAL' if metrica == 'ganhos' else 'INTEGER'}" for metrica in METRIC_COLUMNS)
+    with conn:
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS influencer_state (
+            usuario TEXT NOT NULL,
+            influencer TEXT NOT NULL,
+            ultimo_ts INTEGER NOT NULL,
+            ultima_data TEXT NOT NULL,
+            ultimo_live_ts INTEGER,
+            ultima_live_data TEXT,
+            {metricas},
+            live_curtidas INTEGER,
+            live_visualizacoes INTEGER,
+            PRIMARY KEY (usuario, influencer)
+        )
+        """)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_snapshots_influencer_state AFTER INSERT ON snapshots "
+                     f"BEGIN {_estado_upsert_sql('NEW.')}; END")
+
+    vazio = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM influencer_state)").fetchone()[0]
+    if vazio and _tem_snapshots(conn):
+        rebuild_influencer_state(conn)
+
+
+def rebuild_influencer_state(conn, directory=None):
+    """Recalcula influencer_state a partir de snapshots e das partições frias (ver ``rebuild_rollups``)."""
+    with conn:
+        conn.execute("DELETE FROM influencer_state")
+        for origem in _origens_brutas(conn, directory=directory):
+            conn.execute(_estado_upsert_sql("", "WHERE 1 ORDER BY ts", origem))
+
+
+INFLUENCER_STATE_SQL = "SELECT * FROM influencer_state WHERE usuario = ? AND influencer = ?"
+
+
+def influencer_state(database, usuario, influencer):
+    """Linha de influencer_state do par como dict, ou None se ele nunca teve snapshot."""
+    def ler(conn):
+        cursor = conn.execute(INFLUENCER_STATE_SQL, (usuario, influencer))
+        linha = cursor.fetchone()
+        return dict(zip((coluna[0] for coluna in cursor.description), linha)) if linha else None
+
+    return database.run(ler, "sql.influencer_state")
+
+
+# ==============================================
+# CONSULTAS DA ANÁLISE
+# ==============================================
+# Cada função devolve (sql, params, depends_on); depends_on são as chaves de
+# data_versions para Database.query_df_cached.
+def _condicao_marcas(marcas):
+    """``ts`` a partir da marca d'água de cada influencer (ver analysis.AnaliseIncremental).
+
+    Retorna (menor marca, condição SQL, parâmetros); a menor marca vai no
+    limite inferior do intervalo para o índice pular as linhas já lidas.
+    """
+    casos = " ".join("WHEN ? THEN ?" for _ in marcas)
+    params = [valor for par in marcas.items() for valor in par]
+    return min(marcas.values()), f"AND ts >= CASE influencer {casos} END", params
+
+
+def snapshots_query(usuario, influencers, data_inicio, data_fim, colunas, condicao="", marcas=None):
+    """Consulta dos snapshots do período; com ``marcas`` ({influencer: ts}), só os a partir delas."""
+    inicio, fim = day_range_epoch(data_inicio, data_fim)
+    params_marcas = []
+    if marcas:
+        menor, condicao_marcas, params_marcas = _condicao_marcas(marcas)
+        inicio = max(inicio, menor)
+        condicao = f"{condicao_marcas} {condicao}"
+    query = """
+    SELECT {}
+    FROM snapshots
+    WHERE usuario = ? AND influencer IN ({}) AND ts BETWEEN ? AND ? {}
+    """.format(colunas, ','.join(['?'] * len(influencers)), condicao)
+    params = [usuario] + list(influencers) + [inicio, fim] + params_marcas
+    return query, params, [snapshot_key(usuario, influencer) for influencer in influencers]
+
+
+def pontos_query(usuario, influencers, data_inicio, data_fim):
+    """Snapshots de cada influencer no período (colunas influencer e pontos), pelo rollup diário.
+
+    O rollup também conta os snapshots que já foram para o armazenamento frio.
+    """
+    query = """
+    SELECT influencer, sum(contagem) AS pontos
+    FROM rollup_diario
+    WHERE usuario = ? AND influencer IN ({}) AND ts BETWEEN ? AND ?
+    GROUP BY influencer
+    """.format(','.join(['?'] * len(influencers)))
+    params = [usuario] + list(influencers) + list(day_range_epoch(data_inicio, data_fim))
+    return query, params, [snapshot_key(usuario, influencer) for influencer in influencers]
+
+
+def rollup_query(usuario, influencers, data_inicio, data_fim, granularidade, colunas, marcas=None):
+    """Como ``snapshots_query``, nos períodos do rollup de ``granularidade`` (marcas em ts do período)."""
+    tabela = ROLLUPS[granularidade][0]
+    inicio, fim = day_range_epoch(data_inicio, data_fim)
+    condicao, params_marcas = "", []
+    if marcas:
+        menor, condicao_marcas, params_marcas = _condicao_marcas(marcas)
+        condicao = f"AND ts >= ? {condicao_marcas}"
+        params_marcas = [menor] + params_marcas
+    # Períodos que se sobrepõem ao intervalo (semanas e meses das pontas entram inteiros)
+    query = """
+    SELECT {}
+    FROM {}
+    WHERE usuario = ? AND influencer IN ({}) AND ts <= ? AND ultimo_ts >= ? {}
+    """.format(colunas, tabela, ','.join(['?'] * len(influencers)), condicao)
+    params = [usuario] + list(influencers) + [fim, inicio] + params_marcas
+    return query, params, [snapshot_key(usuario, influencer) for influencer in influencers]
+
+
+def influencers_query(usuario):
+    """Influencers com snapshots de ``usuario`` (inclusive os que já foram para o armazenamento frio)."""
+    query = "SELECT influencer FROM influencer_state WHERE usuario = ? ORDER BY influencer"
+    return query, [usuario], [influencers_key(usuario)]
+
+
+def produtos_query(influencers, data_inicio, data_fim):
+    query = """
+    SELECT influencer, nome_produto, valor_estimado, data
+    FROM produtos_live
+    WHERE influencer IN ({}) AND ts BETWEEN ? AND ?
+    """.format(','.join(['?'] * len(influencers)))
+    params = list(influencers) + list(day_range_epoch(data_inicio, data_fim))
+    return query, params, [produto_key(influencer) for influencer in influencers]
+
+
+# ==============================================
+# ESCRITA DE SNAPSHOTS E PRODUTOS
+# ==============================================
+# As funções de escrita recebem vários registros e gravam todos numa única
+# transação (um commit/fsync por lote).
+# Dois snapshots do mesmo par no mesmo segundo (ex.: botão e agendador) são o
+# mesmo dado; o segundo é descartado em vez de derrubar o lote inteiro e não
+# conta como gravado
+INSERT_SNAPSHOT_SQL = """
+INSERT OR IGNORE INTO snapshots (usuario, influencer, data, ts, seguidores, curtidas, visualizacoes,
+                       ganhos, live_curtidas, live_visualizacoes, metodo)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_PRODUTO_SQL = """
+INSERT INTO produtos_live (influencer, nome_produto, valor_estimado, data, ts)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def snapshot_row(usuario, influencer, dados, live_data=None, metodo='Scraping', quando=None):
+    """Monta a linha de snapshots para um scraping (quando: datetime, padrão agora)."""
+    live_data = live_data or {}
+    quando = quando or datetime.now()
+    return (usuario, influencer, quando.strftime(DATE_FORMAT), to_epoch(quando), dados['seguidores'],
+            dados['curtidas'], dados['visualizacoes'], estimate_earnings(dados['visualizacoes']),
+            live_data.get('live_curtidas'), live_data.get('live_visualizacoes'), metodo)
+
+
+def insert_snapshots(conn, rows):
+    """Grava várias linhas de ``snapshot_row`` numa única transação.
+
+    Retorna quantas foram de fato inseridas (as repetidas descartadas pelo
+    INSERT OR IGNORE não contam) e só invalida o cache dos pares que mudaram.
+    """
+    pares = set()
+    inseridas = 0
+    with conn:
+        # Um execute por linha no lugar de executemany: o rowcount de cada uma
+        # diz se ela entrou (sem contar as escritas dos triggers)
+        for row in rows:
+            if conn.execute(INSERT_SNAPSHOT_SQL, row).rowcount:
+                inseridas += 1
+                pares.add((row[0], row[1]))
+    data_versions.bump(*{snapshot_key(usuario, influencer) for usuario, influencer in pares},
+                       *{influencers_key(usuario) for usuario, _ in pares})
+    return inseridas
+
+
+def insert_snapshot(conn, usuario, influencer, dados, live_data=None, metodo='Scraping'):
+    """Grava os contadores de um scraping como um único registro em snapshots.
+
+    Retorna 1, ou 0 se o par já tinha um snapshot no mesmo segundo.
+    """
+    return insert_snapshots(conn, [snapshot_row(usuario, influencer, dados, live_data, metodo)])
+
+
+def insert_produtos(conn, produtos):
+    """Grava vários produtos (influencer, nome_produto, valor_estimado[, data]) numa única transação.
+
+    ``data`` pode ser datetime ou texto no formato DATE_FORMAT; sem ela, usa o horário atual.
+    """
+    agora = datetime.now()
+    rows = []
+    for produto in produtos:
+        influencer, nome_produto, valor_estimado = produto[:3]
+        quando = produto[3] if len(produto) > 3 and produto[3] else agora
+        if isinstance(quando, str):
+            quando = datetime.strptime(quando, DATE_FORMAT)
+        rows.append((influencer, nome_produto, valor_estimado, quando.strftime(DATE_FORMAT), to_epoch(quando)))
+    with conn:
+        conn.executemany(INSERT_PRODUTO_SQL, rows)
+    data_versions.bump(*{produto_key(row[0]) for row in rows})
+    return len(rows)
+
+
+class SnapshotBatchWriter:
+    """Acumula snapshots e grava em lotes de ``flush_every`` numa única transação."""
+
+    def __init__(self, database, flush_every=50):
+        self.database = database
+        self.flush_every = max(1, flush_every)
+        self.written = 0
+        self._pending = []
+
+    @property
+    def pending(self):
+        """Snapshots recebidos por ``add`` que ainda não foram gravados."""
+        return len(self._pending)
+
+    def add(self, usuario, influencer, dados, live_data=None, metodo='Scraping'):
+        self._pending.append(snapshot_row(usuario, influencer, dados, live_data, metodo))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Grava os pendentes; retorna o total de snapshots inseridos até aqui (``written``)."""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.written += self.database.run(lambda conn: insert_snapshots(conn, pending), "sql.insert_snapshots")
+        return self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
@@ -0,0 +1,134 @@
+import csv
+import hashlib
+import importlib.util
+import io
+import itertools
+import os
+
+from cache import TTLCache
+from db import data_versions
+from metrics import span
+
+# ==============================================
+# EXPORTAÇÃO DE RELATÓRIOS
+# ==============================================
+# Os arquivos são gerados só quando alguém clica em baixar, direto da consulta
+# no SQLite e em blocos de EXPORT_CHUNK_ROWS linhas: nenhum formato precisa do
+# resultado inteiro num DataFrame. O arquivo pronto fica em cache pela hash da
+# consulta + versões dos dados que ela lê (ver db.data_versions).
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_CACHE_TTL_S = float(os.environ.get("EXPORT_CACHE_TTL_S", "600"))
+EXPORT_CACHE_MAX_ENTRIES = int(os.environ.get("EXPORT_CACHE_MAX_ENTRIES", "8"))
+
+# formato: (rótulo, mime)
+FORMATOS = {
+    'xlsx': ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'csv': ("CSV", "text/csv"),
+    'parquet': ("Parquet", "application/vnd.apache.parquet"),
+}
+
+export_cache = TTLCache(ttl=EXPORT_CACHE_TTL_S, max_entries=EXPORT_CACHE_MAX_ENTRIES)
+
+
+def formatos_disponiveis():
+    """Formatos cuja dependência está instalada (Parquet precisa do pyarrow)."""
+    return [formato for formato in FORMATOS
+            if formato != 'parquet' or importlib.util.find_spec("pyarrow") is not None]
+
+
+def ler_em_blocos(conn, sql, params, chunk_rows):
+    """(colunas, gerador de listas de linhas) de uma consulta, lida em blocos."""
+    cursor = conn.execute(sql, params)
+    colunas = [coluna[0] for coluna in cursor.description]
+
+    def gerar():
+        while True:
+            linhas = cursor.fetchmany(chunk_rows)
+            if not linhas:
+                return
+            yield linhas
+
+    return colunas, gerar()
+
+
+def escrever_csv(colunas, blocos, destino):
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    escritor = csv.writer(texto)
+    escritor.writerow(colunas)
+    for linhas in blocos:
+        escritor.writerows(linhas)
+    texto.flush()
+    texto.detach()
+
+
+def escrever_xlsx(colunas, blocos, destino):
+    from openpyxl import Workbook
+
+    # write_only grava as linhas em disco conforme chegam, em vez de montar a planilha em memória
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet()
+    aba.append(colunas)
+    for linhas in blocos:
+        for linha in linhas:
+            aba.append(linha)
+    planilha.save(destino)
+
+
+def escrever_parquet(colunas, blocos, destino, schema=None, compression="zstd"):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    if schema is not None:
+        escritor = pq.ParquetWriter(destino, schema, compression=compression)
+    for linhas in blocos:
+        tabela = pa.Table.from_pydict({coluna: [linha[i] for linha in linhas] for i, coluna in enumerate(colunas)})
+        if escritor is None:
+            # Coluna só com NULL no primeiro bloco não tem tipo; nas tabelas
+            # exportadas as colunas anuláveis são numéricas (ex.: live_curtidas)
+            schema = pa.schema([campo.with_type(pa.float64()) if pa.types.is_null(campo.type) else campo
+                                for campo in tabela.schema])
+            escritor = pq.ParquetWriter(destino, schema, compression=compression)
+        escritor.write_table(tabela.cast(escritor.schema))
+    if escritor is None:
+        escritor = pq.ParquetWriter(destino, pa.schema([(coluna, pa.string()) for coluna in colunas]),
+                                    compression=compression)
+    escritor.close()
+
+
+ESCRITORES = {
+    'xlsx': escrever_xlsx,
+    'csv': escrever_csv,
+    'parquet': escrever_parquet,
+}
+
+
+def gerar_arquivo(database, sql, params=(), formato='xlsx', chunk_rows=EXPORT_CHUNK_ROWS, antes=None):
+    """Executa a consulta e devolve o arquivo no formato pedido, em bytes.
+
+    ``antes`` é um iterável opcional de blocos de linhas (mesmas colunas da
+    consulta) gravados antes do resultado do SQLite, ex.: o armazenamento frio.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    destino = io.BytesIO()
+    with span(f"export.{formato}"), database.connection() as conn:
+        colunas, blocos = ler_em_blocos(conn, sql, list(params), chunk_rows)
+        ESCRITORES[formato](colunas, itertools.chain(antes or (), blocos), destino)
+    return destino.getvalue()
+
+
+def chave_exportacao(database, sql, params, formato, depends_on=()):
+    conteudo = repr((database.path, sql, tuple(params), formato, data_versions.snapshot(depends_on)))
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def exportar_consulta(database, sql, params=(), formato='xlsx', depends_on=(), antes=None):
+    """Como ``gerar_arquivo``, reaproveitando o arquivo enquanto os dados em ``depends_on`` não mudarem.
+
+    ``antes`` aqui é uma função que devolve os blocos, chamada só se o arquivo
+    precisar ser gerado.
+    """
+    chave = chave_exportacao(database, sql, params, formato, depends_on)
+    return export_cache.get_or_load(
+        chave, lambda: gerar_arquivo(database, sql, params, formato, antes=antes() if antes else None))
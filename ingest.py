@@ -0,0 +1,164 @@
+"""Busca perfis do TikTok e grava os snapshots sem passar pelo Streamlit.
+
+Uso:
+    python ingest.py simoneses outro_influencer
+    python ingest.py --arquivo influencers.txt --usuario admin --workers 8
+    cat influencers.txt | python ingest.py
+
+Sai com status 0 se todos os perfis foram salvos, 1 se algum falhou e 130 se
+for interrompido, para o cron/systemd detectarem falhas parciais.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from db import DB_PATH, SnapshotBatchWriter, get_database
+from metrics import start_exporters
+from scraper import fetch_profile
+from utils import limpar_usernames
+
+# ==============================================
+# INGESTÃO PELA LINHA DE COMANDO
+# ==============================================
+# Os perfis são buscados por um pool de INGEST_WORKERS threads com
+# fetch_profile (HTTP primeiro, navegador do pool só no fallback) e os
+# snapshots são gravados pela thread principal em lotes de INGEST_FLUSH_EVERY,
+# uma transação por lote, como na busca em lote do app.
+INGEST_USUARIO = os.environ.get("INGEST_USUARIO", "admin")
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "4"))
+INGEST_FLUSH_EVERY = int(os.environ.get("INGEST_FLUSH_EVERY", "20"))
+
+logger = logging.getLogger(__name__)
+
+
+def ler_usernames(nomes=(), arquivo=None, entrada=None):
+    """Usernames dos argumentos, de ``arquivo`` ('-' é a entrada padrão) e da entrada padrão redirecionada.
+
+    Em arquivos, aceita um ou mais nomes por linha (separados por espaço,
+    vírgula ou ponto e vírgula) e ignora linhas começando com #. Os nomes são
+    normalizados como em ``fetch_profile`` (ver ``utils.limpar_usernames``).
+    """
+    entrada = entrada or sys.stdin
+    linhas = []
+    if arquivo == "-":
+        linhas = entrada.readlines()
+    elif arquivo:
+        with open(arquivo, encoding="utf-8") as origem:
+            linhas = origem.readlines()
+    elif not nomes and not entrada.isatty():
+        linhas = entrada.readlines()
+
+    nomes = list(nomes)
+    for linha in linhas:
+        if not linha.lstrip().startswith("#"):
+            nomes += linha.replace(',', ' ').replace(';', ' ').split()
+    return limpar_usernames(nomes)
+
+
+def _buscar(username):
+    inicio = time.perf_counter()
+    try:
+        return username, fetch_profile(username), None, time.perf_counter() - inicio
+    except Exception as e:
+        return username, None, e, time.perf_counter() - inicio
+
+
+def ingest(usernames, usuario=INGEST_USUARIO, workers=INGEST_WORKERS, flush_every=INGEST_FLUSH_EVERY,
+           database=None, on_result=None):
+    """Busca ``usernames`` e grava os snapshots de ``usuario``; retorna o resumo da execução.
+
+    ``on_result(username, dados, erro, segundos)`` é chamado na thread do
+    chamador assim que cada perfil termina.
+    """
+    database = database or get_database()
+    inicio = time.perf_counter()
+    falhas = []
+    tempos = []
+    escritor = SnapshotBatchWriter(database, flush_every=flush_every)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest") as executor:
+        futuros = [executor.submit(_buscar, username) for username in usernames]
+        try:
+            for futuro in as_completed(futuros):
+                username, dados, erro, segundos = futuro.result()
+                tempos.append(segundos)
+                if dados:
+                    try:
+                        escritor.add(usuario, f"@{username}", dados)
+                    except Exception as e:
+                        # O lote inteiro que estava pendente se perde; a contagem
+                        # final usa escritor.written
+                        logger.error("Erro ao salvar snapshots no banco: %s", e)
+                else:
+                    falhas.append(username)
+                if on_result:
+                    on_result(username, dados, erro, segundos)
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+            try:
+                escritor.flush()
+            except Exception as e:
+                logger.error("Erro ao salvar os últimos snapshots no banco: %s", e)
+
+    duracao = time.perf_counter() - inicio
+    return {
+        'perfis': len(usernames),
+        'buscados': len(tempos),
+        'salvos': escritor.written,
+        'falhas': falhas,
+        'duracao_s': duracao,
+        'perfis_por_minuto': len(tempos) / duracao * 60 if duracao else 0.0,
+        'tempo_medio_s': sum(tempos) / len(tempos) if tempos else 0.0,
+        'tempo_max_s': max(tempos, default=0.0),
+    }
+
+
+def _imprimir_resultado(username, dados, erro, segundos):
+    if dados:
+        print(f"ok     @{username:<30} {segundos:7.2f}s  seguidores={dados['seguidores']:,} "
+              f"curtidas={dados['curtidas']:,}", flush=True)
+    else:
+        print(f"falha  @{username:<30} {segundos:7.2f}s  {erro}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("usernames", nargs="*", help="usernames do TikTok (com ou sem @)")
+    parser.add_argument("-f", "--arquivo", help="arquivo com os usernames ('-' para a entrada padrão)")
+    parser.add_argument("-u", "--usuario", default=INGEST_USUARIO, help="usuário do app dono dos snapshots")
+    parser.add_argument("-w", "--workers", type=int, default=INGEST_WORKERS, help="perfis buscados ao mesmo tempo")
+    parser.add_argument("--flush-every", type=int, default=INGEST_FLUSH_EVERY, help="snapshots por transação")
+    parser.add_argument("--banco", default=DB_PATH, help="arquivo SQLite")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    usernames = ler_usernames(args.usernames, args.arquivo)
+    if not usernames:
+        parser.error("informe ao menos um username nos argumentos, em --arquivo ou na entrada padrão")
+
+    start_exporters()
+    # SIGTERM (systemd stop) interrompe como o Ctrl+C: o que já foi buscado é gravado
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        resumo = ingest(usernames, args.usuario, args.workers, args.flush_every, get_database(args.banco),
+                        on_result=_imprimir_resultado)
+    except KeyboardInterrupt:
+        logger.warning("Ingestão interrompida")
+        return 130
+
+    print(f"\n{resumo['salvos']} de {resumo['perfis']} perfis salvos em {resumo['duracao_s']:.1f}s "
+          f"({resumo['perfis_por_minuto']:.1f} perfis/min; média de {resumo['tempo_medio_s']:.2f}s "
+          f"e máximo de {resumo['tempo_max_s']:.2f}s por perfil)")
+    if resumo['falhas']:
+        print(f"Falharam: {', '.join('@' + username for username in resumo['falhas'])}", file=sys.stderr)
+    return 0 if resumo['salvos'] == resumo['perfis'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
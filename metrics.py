@@ -0,0 +1,169 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==============================================
+# MÉTRICAS DE TEMPO (SPANS E HISTOGRAMAS)
+# ==============================================
+# ``with span("scraper.goto"):`` mede o bloco e soma a duração no histograma
+# daquele nome, em memória e por processo. O painel da barra lateral lê
+# ``summary()``; ``prometheus_text()`` gera o formato de texto do Prometheus,
+# que pode ser servido em METRICS_PORT (/metrics) ou gravado em METRICS_FILE
+# (ex.: para o textfile collector do node_exporter).
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+METRICS_FILE_INTERVAL_S = float(os.environ.get("METRICS_FILE_INTERVAL_S", "15"))
+METRICS_PREFIX = "influencers"
+
+# Limites superiores dos buckets, em segundos (o último, implícito, é +Inf)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Contagens por bucket, soma e máximo das durações de um span."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, valor):
+        self.counts[bisect.bisect_left(self.buckets, valor)] += 1
+        self.total += 1
+        self.sum += valor
+        self.max = max(self.max, valor)
+
+    def quantile(self, q):
+        """Estimativa do quantil ``q`` por interpolação linear dentro do bucket, como no Prometheus."""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.counts):
+            if acumulado + contagem >= alvo and contagem:
+                inicio = self.buckets[i - 1] if i > 0 else 0.0
+                fim = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(inicio + (fim - inicio) * (alvo - acumulado) / contagem, self.max)
+            acumulado += contagem
+        return self.max
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def observe(nome, segundos):
+    with _lock:
+        histograma = _histograms.get(nome)
+        if histograma is None:
+            histograma = _histograms[nome] = Histogram()
+        histograma.observe(segundos)
+
+
+@contextmanager
+def span(nome):
+    """Mede o bloco e registra a duração em ``nome``, inclusive se ele levantar exceção."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(nome, time.perf_counter() - inicio)
+
+
+def summary():
+    """{nome: {count, sum, avg, p50, p95, max}} de todos os spans, em segundos."""
+    with _lock:
+        return {
+            nome: {
+                'count': h.total,
+                'sum': h.sum,
+                'avg': h.sum / h.total if h.total else 0.0,
+                'p50': h.quantile(0.5),
+                'p95': h.quantile(0.95),
+                'max': h.max,
+            }
+            for nome, h in sorted(_histograms.items())
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def prometheus_text():
+    """Todos os histogramas no formato de texto do Prometheus (um metric com o label span)."""
+    metrica = f"{METRICS_PREFIX}_span_seconds"
+    linhas = [f"# HELP {metrica} Duração dos trechos instrumentados.", f"# TYPE {metrica} histogram"]
+    with _lock:
+        for nome, h in sorted(_histograms.items()):
+            acumulado = 0
+            for limite, contagem in zip(h.buckets + ('+Inf',), h.counts):
+                acumulado += contagem
+                linhas.append(f'{metrica}_bucket{{span="{nome}",le="{limite}"}} {acumulado}')
+            linhas.append(f'{metrica}_sum{{span="{nome}"}} {h.sum:.6f}')
+            linhas.append(f'{metrica}_count{{span="{nome}"}} {h.total}')
+    return "\n".join(linhas) + "\n"
+
+
+# ==============================================
+# EXPORTAÇÃO PARA O PROMETHEUS
+# ==============================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path=METRICS_FILE):
+    """Grava prometheus_text() em ``path`` de forma atômica (arquivo temporário + rename)."""
+    temporario = f"{path}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(prometheus_text())
+    os.replace(temporario, path)
+
+
+def _file_loop(path, interval):
+    while True:
+        try:
+            write_metrics_file(path)
+        except OSError:
+            logger.exception("Erro ao gravar métricas em %s", path)
+        time.sleep(interval)
+
+
+_exporters_started = False
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL_S):
+    """Liga o endpoint /metrics e/ou o arquivo de métricas configurados, uma vez por processo."""
+    global _exporters_started
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if port:
+        servidor = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        threading.Thread(target=servidor.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("Métricas em http://0.0.0.0:%d/metrics", port)
+    if path:
+        threading.Thread(target=_file_loop, args=(path, interval), name="metrics-file", daemon=True).start()
@@ -0,0 +1,193 @@
+import logging
+import os
+import signal
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from db import DATE_FORMAT, DB_PATH, get_database, insert_snapshot
+from metrics import start_exporters
+from scraper import fetch_profile
+
+# ==============================================
+# AGENDADOR DE SNAPSHOTS
+# ==============================================
+# Tira snapshots de todos os influencers cadastrados em snapshots, sem depender
+# de alguém clicar em "Buscar Dados e Salvar". Pode rodar como processo próprio
+# (python scheduler.py) ou como thread única dentro do servidor Streamlit
+# (SCHEDULER_IN_APP=1). As próximas execuções ficam na tabela agendamentos,
+# então o agendador retoma de onde parou após reiniciar. O último scraping de
+# cada par vem de influencer_state: perfis buscados há pouco (botão do app,
+# ingest.py) têm o snapshot adiado em vez de repetido.
+SCHEDULER_INTERVAL_S = float(os.environ.get("SCHEDULER_INTERVAL_S", str(6 * 3600)))
+SCHEDULER_RETRY_S = float(os.environ.get("SCHEDULER_RETRY_S", "900"))
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "2"))
+SCHEDULER_TICK_S = float(os.environ.get("SCHEDULER_TICK_S", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotScheduler:
+    """Executa os snapshots vencidos da agenda com um pool limitado de workers."""
+
+    def __init__(self, interval=SCHEDULER_INTERVAL_S, workers=SCHEDULER_WORKERS, tick=SCHEDULER_TICK_S,
+                 retry=SCHEDULER_RETRY_S, db_path=DB_PATH):
+        self.interval = interval
+        self.workers = max(1, workers)
+        self.tick = tick
+        self.retry = retry
+        self.database = get_database(db_path)
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="snapshot")
+        self._stop = threading.Event()
+
+    def _offset(self, usuario, influencer):
+        # Posição estável de cada perfil dentro do intervalo, para espalhar a carga
+        return (zlib.crc32(f"{usuario}|{influencer}".encode()) % 10000) / 10000 * self.interval
+
+    def _proxima(self, usuario, influencer, ultima_data, agora):
+        """Próxima execução de um par novo: espalhada a partir de agora, e não antes de um intervalo após o último scraping."""
+        proxima = agora + timedelta(seconds=self._offset(usuario, influencer))
+        if ultima_data:
+            proxima = max(proxima, datetime.strptime(ultima_data, DATE_FORMAT) + timedelta(seconds=self.interval))
+        return proxima.strftime(DATE_FORMAT)
+
+    def sync_jobs(self):
+        """Inclui na agenda os pares (usuario, influencer) novos do histórico."""
+        agora = datetime.now()
+        novos = self.database.fetchall("""
+        SELECT e.usuario, e.influencer, e.ultima_data
+        FROM influencer_state e
+        LEFT JOIN agendamentos a ON a.usuario = e.usuario AND a.influencer = e.influencer
+        WHERE a.usuario IS NULL
+        """)
+        if novos:
+            linhas = [(usuario, influencer, self._proxima(usuario, influencer, ultima_data, agora))
+                      for usuario, influencer, ultima_data in novos]
+
+            def inserir(conn):
+                with conn:
+                    conn.executemany("""
+                    INSERT OR IGNORE INTO agendamentos (usuario, influencer, proxima_execucao)
+                    VALUES (?, ?, ?)
+                    """, linhas)
+
+            self.database.run(inserir, "sql.sync_jobs")
+        return len(novos)
+
+    def due_jobs(self, limit):
+        """Pares vencidos na agenda; os que tiveram snapshot há menos de um intervalo são adiados."""
+        agora = datetime.now()
+        candidatos = self.database.fetchall("""
+        SELECT a.usuario, a.influencer, e.ultima_data
+        FROM agendamentos a
+        LEFT JOIN influencer_state e ON e.usuario = a.usuario AND e.influencer = a.influencer
+        WHERE a.proxima_execucao <= ?
+        ORDER BY a.proxima_execucao LIMIT ?
+        """, (agora.strftime(DATE_FORMAT), limit))
+
+        vencidos, adiados = [], []
+        for usuario, influencer, ultima_data in candidatos:
+            proxima = ultima_data and datetime.strptime(ultima_data, DATE_FORMAT) + timedelta(seconds=self.interval)
+            if proxima and proxima > agora:
+                adiados.append((proxima.strftime(DATE_FORMAT), usuario, influencer))
+            else:
+                vencidos.append((usuario, influencer))
+
+        if adiados:
+            def adiar(conn):
+                with conn:
+                    conn.executemany("""
+                    UPDATE agendamentos SET proxima_execucao = ? WHERE usuario = ? AND influencer = ?
+                    """, adiados)
+
+            self.database.run(adiar, "sql.postpone_jobs")
+        return vencidos
+
+    def run_pending(self):
+        """Envia ao pool os snapshots vencidos, sem ultrapassar o número de workers."""
+        self.sync_jobs()
+        with self._running_lock:
+            livres = self.workers - len(self._running)
+            if livres <= 0:
+                return 0
+            candidatos = self.due_jobs(livres + len(self._running))
+            jobs = [job for job in candidatos if job not in self._running][:livres]
+            self._running.update(jobs)
+
+        for usuario, influencer in jobs:
+            self._executor.submit(self._snapshot, usuario, influencer)
+        return len(jobs)
+
+    def _snapshot(self, usuario, influencer):
+        erro = None
+        try:
+            dados = fetch_profile(influencer.lstrip('@'))
+            self.database.run(lambda conn: insert_snapshot(conn, usuario, influencer, dados), "sql.insert_snapshot")
+            logger.info("Snapshot de %s salvo para %s", influencer, usuario)
+        except Exception as e:
+            erro = str(e)
+            logger.warning("Falha no snapshot de %s (%s): %s", influencer, usuario, erro)
+
+        agora = datetime.now()
+        proxima = agora + timedelta(seconds=self.retry if erro else self.interval)
+        try:
+            def atualizar(conn):
+                with conn:
+                    conn.execute("""
+                    UPDATE agendamentos SET proxima_execucao = ?, ultima_execucao = ?, ultimo_erro = ?
+                    WHERE usuario = ? AND influencer = ?
+                    """, (proxima.strftime(DATE_FORMAT), agora.strftime(DATE_FORMAT), erro, usuario, influencer))
+
+            self.database.run(atualizar, "sql.update_job")
+        finally:
+            with self._running_lock:
+                self._running.discard((usuario, influencer))
+
+    def run_forever(self):
+        logger.info("Agendador iniciado: intervalo de %.0fs, %d workers", self.interval, self.workers)
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Erro no ciclo do agendador")
+            self._stop.wait(self.tick)
+        self._executor.shutdown(wait=True)
+        logger.info("Agendador encerrado")
+
+    def start(self):
+        thread = threading.Thread(target=self.run_forever, name="snapshot-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_background_scheduler():
+    """Inicia o agendador numa thread, uma única vez por processo."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SnapshotScheduler()
+            _scheduler.start()
+        return _scheduler
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    start_exporters()
+    scheduler = SnapshotScheduler()
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,655 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError, async_playwright
+from requests.adapters import HTTPAdapter
+
+from browser_pool import get_browser_pool
+from cache import TTLCache
+from counts import parse_count
+from metrics import observe, span
+from throttle import get_host_guard
+from utils import normalize_username
+
+# ==============================================
+# SCRAPING DO PERFIL DO TIKTOK
+# ==============================================
+PROFILE_URL = "https://www.tiktok.com/@{username}"
+USER_AGENT = os.environ.get("SCRAPER_USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+FOLLOWERS_SELECTOR = "xpath=//strong[@data-e2e='followers-count']"
+LIKES_SELECTOR = "xpath=//strong[@data-e2e='likes-count']"
+GOTO_TIMEOUT_MS = 120000
+LEAN_NAVIGATION = os.environ.get("SCRAPER_LEAN_NAVIGATION", "1") != "0"
+SCRAPER_BACKEND = os.environ.get("SCRAPER_BACKEND", "auto")
+HTTP_TIMEOUT_S = float(os.environ.get("SCRAPER_HTTP_TIMEOUT_S", "15"))
+HTTP_POOL_SIZE = int(os.environ.get("SCRAPER_HTTP_POOL_SIZE", "10"))
+PROFILE_CACHE_TTL_S = float(os.environ.get("PROFILE_CACHE_TTL_S", "600"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", "1000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+BATCH_ITEM_TIMEOUT_S = float(os.environ.get("BATCH_ITEM_TIMEOUT_S", "90"))
+# Cookies e localStorage do TikTok: fora do repositório (e da imagem Docker) por padrão
+BROWSER_STATE_PATH = os.environ.get(
+    "BROWSER_STATE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "influencers", "browser_state.json"))
+BROWSER_STATE_MAX_AGE_S = float(os.environ.get("BROWSER_STATE_MAX_AGE_S", str(6 * 3600)))
+ASSET_CACHE_TTL_S = float(os.environ.get("BROWSER_ASSET_CACHE_TTL_S", "3600"))
+ASSET_CACHE_MAX_ENTRIES = int(os.environ.get("BROWSER_ASSET_CACHE_MAX_ENTRIES", "100"))
+ASSET_CACHE_MAX_BYTES = int(os.environ.get("BROWSER_ASSET_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+ASSET_CACHE_MAX_TOTAL_BYTES = int(os.environ.get("BROWSER_ASSET_CACHE_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+logger = logging.getLogger(__name__)
+
+# Respostas que indicam limite de taxa ou bloqueio do TikTok
+BLOCKED_STATUS = {403, 429}
+
+
+class BlockedError(Exception):
+    """O TikTok respondeu 403/429 (limite de taxa ou bloqueio)."""
+
+    def __init__(self, username, status, retry_after=None):
+        super().__init__(f"TikTok respondeu {status} ao buscar @{username}.")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _retry_after(valor):
+    """Segundos do cabeçalho Retry-After (só o formato numérico)."""
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def check_blocked(username, status, retry_after=None):
+    if status in BLOCKED_STATUS:
+        raise BlockedError(username, status, _retry_after(retry_after))
+
+
+def is_transient_error(erro):
+    """Erros que indicam host lento ou limitando: repetidos com backoff e contados no circuit breaker."""
+    return isinstance(erro, (BlockedError, TimeoutError, PlaywrightTimeoutError, requests.Timeout,
+                             requests.ConnectionError))
+
+
+def read_profile(context, username, lean=LEAN_NAVIGATION, warm=False):
+    """Abre o perfil em um contexto do Playwright e lê os contadores.
+
+    ``warm`` indica que o contexto foi criado com o estado salvo em
+    ``storage_state``; um contexto frio que chega aos contadores salva o seu.
+    """
+    page = context.new_page()
+    medidor = PageMeter(username, lean, warm)
+    page.on("requestfinished", medidor.on_request_finished)
+    page.on("response", medidor.on_response)
+    page.route("**/*", medidor.route)
+
+    with span("scraper.goto"):
+        resposta = page.goto(PROFILE_URL.format(username=username), timeout=GOTO_TIMEOUT_MS,
+                             wait_until="domcontentloaded" if lean else "load")
+    if resposta is not None:
+        storage_state.check(username, resposta.status, resposta.headers.get("retry-after"))
+
+    followers_elem = page.locator(FOLLOWERS_SELECTOR)
+    likes_elem = page.locator(LIKES_SELECTOR)
+
+    # Wait for elements to be visible
+    with span("scraper.selector_wait"):
+        followers_elem.wait_for(state="visible")
+        likes_elem.wait_for(state="visible")
+    medidor.selector_ready()
+    if not warm:
+        storage_state.save(context.storage_state())
+
+    followers_num = parse_count(followers_elem.inner_text())
+    likes_num = parse_count(likes_elem.inner_text())
+    views_num = likes_num
+
+    medidor.finish()
+
+    return {
+        'seguidores': followers_num,
+        'curtidas': likes_num,
+        'visualizacoes': views_num
+    }
+
+
+def scrape_profile(username, pool=None):
+    """Busca os contadores de @username usando um navegador do pool compartilhado."""
+    pool = pool or get_browser_pool()
+
+    def buscar():
+        # Lido a cada tentativa: depois de um bloqueio o estado é descartado
+        estado = storage_state.load()
+        return pool.run(lambda context: read_profile(context, username, warm=estado is not None),
+                        context_options=context_options(estado))
+
+    return get_host_guard(PROFILE_URL).call(buscar, is_transient_error)
+
+
+# ==============================================
+# CAMINHO RÁPIDO VIA HTTP (SEM NAVEGADOR)
+# ==============================================
+# O HTML do perfil já traz os contadores no JSON de hidratação da página
+# (__UNIVERSAL_DATA_FOR_REHYDRATION__, ou SIGI_STATE nas versões antigas).
+HYDRATION_SCRIPT_RE = re.compile(
+    r'<script[^>]*\bid="(__UNIVERSAL_DATA_FOR_REHYDRATION__|SIGI_STATE)"[^>]*>(.*?)</script>', re.S)
+
+
+class ProfileParseError(Exception):
+    """O HTML do perfil não contém os contadores no formato esperado."""
+
+
+def _find_stats(script_id, data, username):
+    if script_id == "SIGI_STATE":
+        stats_por_usuario = data.get("UserModule", {}).get("stats", {})
+        return stats_por_usuario.get(username) or next(iter(stats_por_usuario.values()), None)
+    user_detail = data.get("__DEFAULT_SCOPE__", {}).get("webapp.user-detail", {})
+    return user_detail.get("userInfo", {}).get("stats")
+
+
+def parse_profile_html(html, username=None):
+    """Extrai seguidores, curtidas e vídeos do JSON embutido no HTML do perfil."""
+    for match in HYDRATION_SCRIPT_RE.finditer(html):
+        try:
+            data = json.loads(match.group(2))
+        except ValueError:
+            continue
+
+        stats = _find_stats(match.group(1), data, username)
+        if not isinstance(stats, dict):
+            continue
+        seguidores = stats.get("followerCount")
+        curtidas = stats.get("heartCount", stats.get("heart"))
+        if seguidores is None or curtidas is None:
+            continue
+
+        return {
+            'seguidores': int(seguidores),
+            'curtidas': int(curtidas),
+            'visualizacoes': int(curtidas),
+            'videos': int(stats.get("videoCount") or 0)
+        }
+
+    raise ProfileParseError(f"Contadores de @{username} não encontrados no HTML do perfil.")
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Sessão HTTP compartilhada, com pool de conexões keep-alive."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+            })
+            _http_session = session
+        return _http_session
+
+
+def fetch_profile_http(username, session=None):
+    """Busca o HTML do perfil via HTTP e extrai os contadores."""
+    session = session or get_http_session()
+
+    def buscar():
+        with span("scraper.http_get"):
+            response = session.get(PROFILE_URL.format(username=username), timeout=HTTP_TIMEOUT_S)
+        check_blocked(username, response.status_code, response.headers.get("Retry-After"))
+        response.raise_for_status()
+        return response
+
+    response = get_host_guard(PROFILE_URL).call(buscar, is_transient_error)
+    with span("scraper.parse_html"):
+        return parse_profile_html(response.text, username)
+
+
+# ==============================================
+# BACKENDS DE SCRAPING
+# ==============================================
+class HttpBackend:
+    name = "http"
+
+    def fetch(self, username):
+        return fetch_profile_http(username)
+
+
+class BrowserBackend:
+    name = "browser"
+
+    def fetch(self, username):
+        return scrape_profile(username)
+
+
+class FallbackBackend:
+    """Tenta o caminho HTTP e só abre o navegador quando o HTML não pôde ser lido."""
+    name = "auto"
+
+    def __init__(self, primary=None, fallback=None):
+        self.primary = primary or HttpBackend()
+        self.fallback = fallback or BrowserBackend()
+        self._lock = threading.Lock()
+        self._stats = {"primary": 0, "fallback": 0}
+
+    def fetch(self, username):
+        try:
+            dados = self.primary.fetch(username)
+            chave = "primary"
+        except ProfileParseError:
+            with span("scraper.browser_fallback"):
+                dados = self.fallback.fetch(username)
+            chave = "fallback"
+        with self._lock:
+            self._stats[chave] += 1
+        return dados
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+BACKENDS = {"http": HttpBackend, "browser": BrowserBackend, "auto": FallbackBackend}
+_backend = None
+
+
+def get_profile_backend():
+    """Backend configurado em SCRAPER_BACKEND (auto, http ou browser)."""
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS.get(SCRAPER_BACKEND, FallbackBackend)()
+    return _backend
+
+
+profile_cache = TTLCache(ttl=PROFILE_CACHE_TTL_S, max_entries=PROFILE_CACHE_MAX_ENTRIES)
+
+
+def fetch_profile(username):
+    """Ponto único de entrada para buscar os contadores de um perfil.
+
+    O resultado fica em cache por PROFILE_CACHE_TTL_S segundos, e buscas
+    simultâneas do mesmo perfil compartilham um único scraping.
+    """
+    username = normalize_username(username)
+
+    def carregar():
+        # Só as buscas de verdade; acertos do cache não entram no span
+        with span("scraper.fetch"):
+            return get_profile_backend().fetch(username)
+
+    dados = profile_cache.get_or_load(username, carregar)
+    return dict(dados)
+
+
+# ==============================================
+# NAVEGAÇÃO ENXUTA E MÉTRICAS DE PÁGINA
+# ==============================================
+# Só os dois contadores <strong data-e2e=...> interessam; imagens, vídeos,
+# fontes e scripts de terceiros são descartados antes de sair do navegador.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+FIRST_PARTY_DOMAINS = ("tiktok.com", "tiktokcdn.com", "tiktokcdn-us.com", "ttwstatic.com", "ibytedtos.com")
+
+_page_metrics = deque(maxlen=500)
+_page_metrics_lock = threading.Lock()
+
+
+def is_first_party(url):
+    host = urlparse(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in FIRST_PARTY_DOMAINS)
+
+
+def should_block(request):
+    """Indica se a requisição pode ser descartada na navegação enxuta."""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return request.resource_type == "script" and not is_first_party(request.url)
+
+
+class PageMeter:
+    """Mede bytes transferidos e tempo até os seletores de uma página.
+
+    Os bytes são a soma dos Content-Length das respostas, lidos dos
+    cabeçalhos que já chegam com o evento ``response``: pedir
+    ``request.sizes()`` custaria uma ida e volta ao navegador por
+    requisição. Respostas sem Content-Length (chunked) e as servidas pelo
+    cache de arquivos estáticos não entram na soma.
+    """
+
+    def __init__(self, username, lean, warm=False):
+        self.username = username
+        self.lean = lean
+        self.warm = warm
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.cached = 0
+        self.start = time.perf_counter()
+        self.time_to_selector = None
+
+    def on_request_finished(self, request):
+        self.requests += 1
+
+    def on_response(self, response):
+        try:
+            self.bytes += int(response.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    def route(self, route):
+        request = route.request
+        if self.lean and should_block(request):
+            self.blocked += 1
+            route.abort()
+        elif not is_cacheable(request):
+            route.continue_()
+        elif (em_cache := asset_cache.get(request.url)) is not None:
+            self.cached += 1
+            route.fulfill(status=200, headers=em_cache[0], body=em_cache[1])
+        else:
+            try:
+                resposta = route.fetch()
+                corpo = resposta.body()
+            except PlaywrightError:
+                route.continue_()
+                return
+            store_asset(request.url, resposta.status, resposta.headers, corpo)
+            route.fulfill(response=resposta, body=corpo)
+
+    async def route_async(self, route):
+        request = route.request
+        if self.lean and should_block(request):
+            self.blocked += 1
+            await route.abort()
+        elif not is_cacheable(request):
+            await route.continue_()
+        elif (em_cache := asset_cache.get(request.url)) is not None:
+            self.cached += 1
+            await route.fulfill(status=200, headers=em_cache[0], body=em_cache[1])
+        else:
+            try:
+                resposta = await route.fetch()
+                corpo = await resposta.body()
+            except PlaywrightError:
+                await route.continue_()
+                return
+            store_asset(request.url, resposta.status, resposta.headers, corpo)
+            await route.fulfill(response=resposta, body=corpo)
+
+    def selector_ready(self):
+        self.time_to_selector = time.perf_counter() - self.start
+        observe("scraper.page_warm" if self.warm else "scraper.page_cold", self.time_to_selector)
+
+    def finish(self):
+        """Registra a medição; uma falha aqui é só registrada no log, sem derrubar o scraping."""
+        try:
+            self._record()
+        except Exception as e:
+            logger.warning("Não foi possível medir a página de @%s: %s", self.username, e)
+
+    def _record(self):
+        with _page_metrics_lock:
+            _page_metrics.append({
+                "username": self.username,
+                "mode": "lean" if self.lean else "full",
+                "context": "warm" if self.warm else "cold",
+                "bytes": self.bytes,
+                "requests": self.requests,
+                "blocked": self.blocked,
+                "cached": self.cached,
+                "time_to_selector": self.time_to_selector,
+            })
+
+
+def get_page_metrics():
+    """Resumo das últimas páginas carregadas pelo scraper, por modo (lean/full) e por contexto (warm/cold)."""
+    with _page_metrics_lock:
+        registros = list(_page_metrics)
+
+    resumo = {}
+    for campo, valor in (("mode", "lean"), ("mode", "full"), ("context", "warm"), ("context", "cold")):
+        grupo = [r for r in registros if r[campo] == valor]
+        if grupo:
+            resumo[valor] = {
+                "pages": len(grupo),
+                "avg_bytes": sum(r["bytes"] for r in grupo) / len(grupo),
+                "avg_requests": sum(r["requests"] for r in grupo) / len(grupo),
+                "avg_blocked": sum(r["blocked"] for r in grupo) / len(grupo),
+                "avg_cached": sum(r["cached"] for r in grupo) / len(grupo),
+                "avg_time_to_selector": sum(r["time_to_selector"] for r in grupo) / len(grupo),
+            }
+    return resumo
+
+
+# ==============================================
+# ESTADO DO NAVEGADOR E CACHE DE ARQUIVOS ESTÁTICOS
+# ==============================================
+# Cada tarefa do pool recebe um contexto novo, que começaria sem cookies (e
+# cairia de novo no aviso de consentimento/região) e baixaria de novo os
+# scripts do TikTok. Os contextos passam a nascer com o storage state (cookies
+# e localStorage) salvo pelo primeiro contexto frio que leu um perfil, e os
+# scripts e CSS estáticos ficam num cache em memória compartilhado pelos
+# contextos do processo. O estado é trocado a cada BROWSER_STATE_MAX_AGE_S e
+# descartado na hora quando o TikTok responde 403/429.
+CACHEABLE_RESOURCE_TYPES = {"script", "stylesheet"}
+# Cabeçalhos que não valem para o corpo já decodificado guardado no cache
+UNCACHED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+# ASSET_CACHE_MAX_BYTES limita cada arquivo; ASSET_CACHE_MAX_TOTAL_BYTES, a soma de todos
+asset_cache = TTLCache(ttl=ASSET_CACHE_TTL_S, max_entries=ASSET_CACHE_MAX_ENTRIES,
+                       max_bytes=ASSET_CACHE_MAX_TOTAL_BYTES, sizeof=lambda valor: len(valor[1]))
+
+
+def is_cacheable(request):
+    """Scripts e CSS dos domínios estáticos do TikTok (não a página do perfil)."""
+    return (request.method == "GET" and request.resource_type in CACHEABLE_RESOURCE_TYPES
+            and is_first_party(request.url) and urlparse(request.url).hostname != urlparse(PROFILE_URL).hostname)
+
+
+def store_asset(url, status, headers, corpo):
+    if status != 200 or "no-store" in headers.get("cache-control", "") or len(corpo) > ASSET_CACHE_MAX_BYTES:
+        return
+    asset_cache.set(url, ({nome: valor for nome, valor in headers.items() if nome.lower() not in UNCACHED_HEADERS},
+                          corpo))
+
+
+class StorageStateStore:
+    """Storage state do Playwright reaproveitado pelos contextos novos, com rotação.
+
+    O estado é gravado uma vez, pelo primeiro contexto frio que chega aos
+    contadores, e vale por ``max_age`` segundos a partir daí (também entre
+    reinícios, pelo arquivo em ``path``). ``rotate()`` o descarta antes.
+    """
+
+    def __init__(self, path=BROWSER_STATE_PATH, max_age=BROWSER_STATE_MAX_AGE_S):
+        self.path = path
+        self.max_age = max_age
+        self._state = None
+        self._created = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"saves": 0, "rotations": 0, "blocks": 0}
+
+    def load(self):
+        """Estado para ``new_context(storage_state=...)``, ou None se não há um válido."""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._read_file()
+            if self._state is not None and time.time() - self._created > self.max_age:
+                self._discard()
+            return self._state
+
+    def save(self, state):
+        """Guarda o estado de um contexto frio, se ainda não houver um válido."""
+        with self._lock:
+            if self._state is not None:
+                return
+            self._state = state
+            self._created = time.time()
+            self._stats["saves"] += 1
+            if not self.path:
+                return
+            temporario = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # Só o dono do processo lê os cookies
+                with open(os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w",
+                          encoding="utf-8") as arquivo:
+                    json.dump(state, arquivo)
+                os.replace(temporario, self.path)
+            except OSError as e:
+                # O estado em memória continua valendo para este processo
+                logger.warning("Não foi possível gravar o estado do navegador em %s: %s", self.path, e)
+
+    def rotate(self):
+        with self._lock:
+            if self._state is not None:
+                self._discard()
+
+    def check(self, username, status, retry_after=None):
+        """``check_blocked`` que também descarta o estado quando o TikTok bloqueia."""
+        try:
+            check_blocked(username, status, retry_after)
+        except BlockedError:
+            with self._lock:
+                self._stats["blocks"] += 1
+            self.rotate()
+            raise
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["age_s"] = time.time() - self._created if self._state is not None else None
+        return stats
+
+    def _read_file(self):
+        try:
+            self._created = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as arquivo:
+                self._state = json.load(arquivo)
+        except (OSError, ValueError):
+            self._state = None
+
+    def _discard(self):
+        self._state = None
+        self._stats["rotations"] += 1
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+storage_state = StorageStateStore()
+
+
+def context_options(estado):
+    """Opções de ``new_context``: user agent fixo e, se houver, o storage state salvo."""
+    opcoes = {"user_agent": USER_AGENT}
+    if estado is not None:
+        opcoes["storage_state"] = estado
+    return opcoes
+
+
+# ==============================================
+# SCRAPING EM LOTE (API ASSÍNCRONA)
+# ==============================================
+async def read_profile_async(context, username, lean=LEAN_NAVIGATION, warm=False):
+    """Versão assíncrona de ``read_profile``."""
+    page = await context.new_page()
+    medidor = PageMeter(username, lean, warm)
+    page.on("requestfinished", medidor.on_request_finished)
+    page.on("response", medidor.on_response)
+    await page.route("**/*", medidor.route_async)
+
+    with span("scraper.goto"):
+        resposta = await page.goto(PROFILE_URL.format(username=username), timeout=GOTO_TIMEOUT_MS,
+                                   wait_until="domcontentloaded" if lean else "load")
+    if resposta is not None:
+        storage_state.check(username, resposta.status, resposta.headers.get("retry-after"))
+
+    followers_elem = page.locator(FOLLOWERS_SELECTOR)
+    likes_elem = page.locator(LIKES_SELECTOR)
+
+    with span("scraper.selector_wait"):
+        await followers_elem.wait_for(state="visible")
+        await likes_elem.wait_for(state="visible")
+    medidor.selector_ready()
+    if not warm:
+        storage_state.save(await context.storage_state())
+
+    followers_num = parse_count(await followers_elem.inner_text())
+    likes_num = parse_count(await likes_elem.inner_text())
+    views_num = likes_num
+
+    medidor.finish()
+
+    return {
+        'seguidores': followers_num,
+        'curtidas': likes_num,
+        'visualizacoes': views_num
+    }
+
+
+async def scrape_many_async(usernames, concurrency=BATCH_CONCURRENCY, timeout=BATCH_ITEM_TIMEOUT_S, on_result=None):
+    """Busca vários perfis em paralelo num único navegador.
+
+    No máximo ``concurrency`` páginas ficam abertas ao mesmo tempo (menos, se
+    o limite adaptativo do host baixar) e cada perfil tem ``timeout`` segundos
+    para terminar, somando as novas tentativas e o backoff entre elas (a espera
+    por vaga no limite do host não conta). ``on_result(username, dados, erro)``
+    é chamado assim que cada perfil termina, na mesma thread do chamador.
+    Retorna a lista de tuplas ``(username, dados, erro)`` na ordem de término.
+    """
+    resultados = []
+    semaforo = asyncio.Semaphore(max(1, concurrency))
+    guarda = get_host_guard(PROFILE_URL)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+
+        async def buscar(username):
+            dados, erro = None, None
+            async with semaforo:
+                estado = storage_state.load()
+                context = await browser.new_context(**context_options(estado))
+                prazo = time.monotonic() + timeout
+                try:
+                    # Cada tentativa fica com o tempo que ainda resta até o prazo do perfil
+                    dados = await guarda.call_async(
+                        lambda: asyncio.wait_for(read_profile_async(context, username, warm=estado is not None),
+                                                 max(0.0, prazo - time.monotonic())),
+                        is_transient_error, deadline=prazo)
+                except asyncio.TimeoutError:
+                    erro = TimeoutError(f"Tempo limite de {timeout:.0f}s excedido para @{username}")
+                except Exception as e:
+                    erro = e
+                finally:
+                    await context.close()
+            resultados.append((username, dados, erro))
+            if on_result:
+                on_result(username, dados, erro)
+
+        try:
+            await asyncio.gather(*(buscar(username) for username in usernames))
+        finally:
+            await browser.close()
+
+    return resultados
+
+
+def scrape_many(usernames, concurrency=BATCH_CONCURRENCY, timeout=BATCH_ITEM_TIMEOUT_S, on_result=None):
+    """Executa ``scrape_many_async`` a partir de código síncrono."""
+    return asyncio.run(scrape_many_async(usernames, concurrency=concurrency, timeout=timeout, on_result=on_result))
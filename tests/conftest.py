@@ -0,0 +1,53 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+
+# Os módulos do app ficam na raiz do repositório
+sys.path.insert(0, RAIZ)
+
+
+def ler_pagina(nome):
+    with open(os.path.join(PAGINAS, nome), encoding="utf-8") as arquivo:
+        return arquivo.read()
+
+
+class _PerfisHandler(BaseHTTPRequestHandler):
+    """Responde /@username com as páginas gravadas em tests/paginas ou com o status configurado."""
+    respostas = {}
+
+    def do_GET(self):
+        status, corpo, cabecalhos = self.respostas.get(self.path, (404, "", {}))
+        corpo = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def servidor_perfis():
+    """Servidor HTTP local no lugar do TikTok.
+
+    Devolve (url, respostas); ``respostas[caminho] = (status, html, cabeçalhos)``.
+    """
+    handler = type("PerfisHandler", (_PerfisHandler,), {"respostas": {}})
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{servidor.server_address[1]}", handler.respostas
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import db
+from analysis import carregar_analise
+from db import Database, create_schema, insert_snapshots, snapshot_row
+
+AGORA = datetime(2026, 6, 15, 18)
+INFLUENCERS = ['@a', '@b', '@novo']
+
+
+def _linha(influencer, quando, n, live=False):
+    dados = {'seguidores': 1000 + n * 7, 'curtidas': 5000 + n * 13, 'visualizacoes': 5000 + n * 13}
+    live_data = {'live_curtidas': n, 'live_visualizacoes': 10 * n} if live else None
+    return snapshot_row('admin', influencer, dados, live_data, quando=quando)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Snapshots de @a e @b a cada 12h por 120 dias, com uma live a cada 5; @novo ainda sem nenhum."""
+    database = Database(str(tmp_path / "influencers.db"), pool_size=2)
+    database.run(create_schema)
+    linhas = [_linha(influencer, AGORA - timedelta(hours=12 * i) - timedelta(minutes=desvio), i, live=i % 5 == 0)
+              for influencer, desvio in (('@a', 0), ('@b', 30)) for i in range(1, 240)]
+    database.run(lambda conn: insert_snapshots(conn, linhas))
+    yield database
+    database.close()
+
+
+def _ordenado(df, chave):
+    return df.sort_values(chave, kind='stable').reset_index(drop=True)
+
+
+def _resultados(analise):
+    chave_df = ['id'] if analise.granularidade == 'bruto' else ['influencer', 'ts']
+    return {
+        'df': _ordenado(analise.df, chave_df),
+        'df_lives': _ordenado(analise.df_lives, ['id']),
+        'resumo': _ordenado(analise.resumo_crescimento(), ['influencer']),
+        'engajamento': _ordenado(analise.engajamento(), ['influencer']),
+        'lives_por_mes': _ordenado(analise.lives_por_mes(), ['influencer', 'mes']),
+    }
+
+
+@pytest.mark.parametrize("dias, max_pontos, granularidade", [
+    (20, 1000, 'bruto'),
+    (20, 10, 'dia'),
+    (110, 10, 'semana'),
+])
+def test_atualizacao_incremental_igual_a_carga_completa(banco, monkeypatch, dias, max_pontos, granularidade):
+    monkeypatch.setattr(db, "GRANULARIDADE_MAX_PONTOS", max_pontos)
+    inicio, fim = (AGORA - timedelta(days=dias)).date(), AGORA.date()
+    analise, _ = carregar_analise(banco, 'admin', INFLUENCERS, inicio, fim)
+    assert analise.granularidade == granularidade
+    # Nos snapshots brutos, o segundo da marca d'água de @a (relido por ts >=);
+    # nos rollups, o período já lido do último snapshot de @b
+    marca_a = analise.marcas(INFLUENCERS, 0)['df']['@a']
+    quando_b = (datetime(1970, 1, 1) + timedelta(seconds=marca_a) if granularidade == 'bruto'
+                else AGORA - timedelta(hours=1))
+
+    banco.run(lambda conn: insert_snapshots(conn, [
+        _linha('@b', quando_b, 900, live=True),
+        # No mesmo período (dia/semana) já lido do último snapshot de @a
+        _linha('@a', AGORA + timedelta(minutes=30), 901),
+        _linha('@novo', AGORA - timedelta(hours=2), 902, live=True),
+        _linha('@novo', AGORA - timedelta(hours=1), 903),
+    ]))
+    atualizada, linhas_novas = carregar_analise(banco, 'admin', INFLUENCERS, inicio, fim, analise)
+    completa, _ = carregar_analise(banco, 'admin', INFLUENCERS, inicio, fim)
+
+    assert atualizada is analise and linhas_novas > 0
+    esperado = _resultados(completa)
+    for nome, df in _resultados(atualizada).items():
+        pd.testing.assert_frame_equal(df, esperado[nome], check_dtype=False, obj=nome)
+    assert set(esperado['resumo']['influencer']) == set(INFLUENCERS)
+    assert '@novo' in set(esperado['lives_por_mes']['influencer'])
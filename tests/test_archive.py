@@ -0,0 +1,107 @@
+import csv
+import io
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import archive
+from archive import archive_snapshots, iter_cold_rows
+from db import (ROLLUPS, Database, create_schema, day_range_epoch, influencers_query, insert_snapshots,
+                rebuild_influencer_state, rebuild_rollups, snapshot_row, snapshots_query)
+from export import exportar_consulta
+
+AGORA = datetime(2026, 6, 15, 12)
+COLUNAS = ('influencer', 'data', 'seguidores')
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco com um pool de uma única conexão e snapshots diários de 60 dias, os 29 com mais de 30 dias já arquivados."""
+    database = Database(str(tmp_path / "influencers.db"), pool_size=1)
+    database.run(create_schema)
+    linhas = [snapshot_row('admin', '@simoneses', {'seguidores': dia, 'curtidas': dia, 'visualizacoes': dia},
+                           quando=AGORA - timedelta(days=dia))
+              for dia in range(60)]
+    database.run(lambda conn: insert_snapshots(conn, linhas))
+    arquivados = archive_snapshots(database, older_than_days=30, directory=str(tmp_path / "frio"), agora=AGORA)
+    assert arquivados == 29
+    yield database, str(tmp_path / "frio")
+    database.close()
+
+
+def _em_thread(fn, timeout=30):
+    """Resultado de ``fn()``, falhando em vez de travar o teste se ela não terminar."""
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.update(valor=fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "exportação travou esperando conexão do pool"
+    return resultado['valor']
+
+
+def test_exportacao_com_armazenamento_frio_usa_uma_conexao(banco):
+    database, frio = banco
+    inicio, fim = (AGORA - timedelta(days=59)).date(), AGORA.date()
+    sql, params, dependencias = snapshots_query('admin', ['@simoneses'], inicio, fim, ", ".join(COLUNAS))
+    ts_inicio, ts_fim = day_range_epoch(inicio, fim)
+
+    arquivo = _em_thread(lambda: exportar_consulta(
+        database, sql, params, 'csv', dependencias,
+        antes=lambda: iter_cold_rows(database, 'admin', ['@simoneses'], ts_inicio, ts_fim, COLUNAS,
+                                     directory=frio)))
+
+    linhas = list(csv.DictReader(io.StringIO(arquivo.decode('utf-8-sig'))))
+    assert sorted(int(linha['seguidores']) for linha in linhas) == list(range(60))
+
+
+def test_iter_cold_rows_le_so_o_intervalo(banco):
+    database, frio = banco
+    ts_inicio, ts_fim = day_range_epoch((AGORA - timedelta(days=39)).date(), (AGORA - timedelta(days=35)).date())
+
+    blocos = iter_cold_rows(database, 'admin', ['@simoneses'], ts_inicio, ts_fim, COLUNAS, directory=frio)
+
+    assert sorted(linha[2] for bloco in blocos for linha in bloco) == [35, 36, 37, 38, 39]
+
+
+def _rollups(database):
+    return {tabela: database.fetchall(f"SELECT * FROM {tabela} ORDER BY usuario, influencer, ts")
+            for tabela, _ in ROLLUPS.values()}
+
+
+@pytest.mark.parametrize("filtro", [{}, {'usuario': 'admin', 'influencer': '@simoneses'}])
+def test_rebuild_rollups_le_o_armazenamento_frio(banco, filtro):
+    database, frio = banco
+    antes = _rollups(database)
+    assert len(antes['rollup_diario']) == 60
+
+    database.run(lambda conn: rebuild_rollups(conn, directory=frio, **filtro))
+
+    assert _rollups(database) == antes
+
+
+def test_estado_de_influencer_so_no_armazenamento_frio(tmp_path, monkeypatch):
+    database = Database(str(tmp_path / "influencers.db"), pool_size=1)
+    database.run(create_schema)
+    dados = {'seguidores': 10, 'curtidas': 20, 'visualizacoes': 30}
+    database.run(lambda conn: insert_snapshots(conn, [
+        snapshot_row('admin', '@velho', dados, {'live_curtidas': 1, 'live_visualizacoes': 5},
+                     quando=AGORA - timedelta(days=100)),
+        snapshot_row('admin', '@velho', dados, quando=AGORA - timedelta(days=90)),
+        snapshot_row('admin', '@novo', dados, quando=AGORA - timedelta(days=1)),
+    ]))
+    estado = database.fetchall("SELECT * FROM influencer_state ORDER BY influencer")
+    archive_snapshots(database, older_than_days=30, directory=str(tmp_path / "frio"), agora=AGORA)
+    assert database.fetchall("SELECT DISTINCT influencer FROM snapshots") == [('@novo',)]
+
+    database.run(lambda conn: rebuild_influencer_state(conn, directory=str(tmp_path / "frio")))
+    assert database.fetchall("SELECT * FROM influencer_state ORDER BY influencer") == estado
+
+    # Banco antigo atualizado depois do arquivamento: a tabela nasce vazia e é preenchida na migração
+    monkeypatch.setattr(archive, 'COLD_STORAGE_DIR', str(tmp_path / "frio"))
+    database.run(lambda conn: conn.execute("DROP TABLE influencer_state"))
+    database.run(create_schema)
+    assert database.fetchall("SELECT * FROM influencer_state ORDER BY influencer") == estado
+    sql, params, _ = influencers_query('admin')
+    assert database.fetchall(sql, params) == [('@novo',), ('@velho',)]
+    database.close()
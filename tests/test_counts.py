@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from counts import MULTIPLICADORES, parse_count, parse_counts
+
+SUFIXOS = [sufixo for sufixo in MULTIPLICADORES if sufixo]
+# Maior contador que ainda cabe exato em float64 (parse_count passa por float)
+MAXIMO = 2 ** 53
+
+inteiros = st.integers(min_value=0, max_value=MAXIMO)
+espacos = st.sampled_from(['', ' ', ' '])
+
+
+@st.composite
+def inteiros_formatados(draw):
+    """(texto, valor) de um inteiro escrito sem separador, com ',' (en) ou com '.' (pt-BR) a cada milhar."""
+    valor = draw(inteiros)
+    texto = draw(st.sampled_from([str(valor), f"{valor:,}", f"{valor:,}".replace(',', '.')]))
+    return texto, valor
+
+
+@st.composite
+def contadores_com_sufixo(draw):
+    """(texto, valor) como '3.4K', '12,5M', '1,2 mil' ou '2 bi', com até 3 casas decimais."""
+    sufixo = draw(st.sampled_from(SUFIXOS))
+    inteiro = draw(st.integers(min_value=0, max_value=999_999))
+    casas = draw(st.integers(min_value=0, max_value=3))
+    fracao = draw(st.integers(min_value=0, max_value=10 ** casas - 1))
+    separador = draw(st.sampled_from(['.', ',']))
+    numero = f"{inteiro}{separador}{fracao:0{casas}d}" if casas else str(inteiro)
+    sufixo_texto = draw(st.sampled_from([sufixo, sufixo.upper(), sufixo.capitalize()]))
+    texto = f"{draw(espacos)}{numero}{draw(espacos)}{sufixo_texto}{draw(espacos)}"
+    return texto, (inteiro * 10 ** casas + fracao) * MULTIPLICADORES[sufixo] // 10 ** casas
+
+
+# Qualquer texto, mas com as formas válidas aparecendo com frequência
+quaisquer = st.one_of(
+    inteiros_formatados().map(lambda par: par[0]),
+    contadores_com_sufixo().map(lambda par: par[0]),
+    st.text(alphabet="0123456789.,kKmMbBil  \t\nx-", max_size=12),
+    st.text(max_size=12),
+    st.none(),
+    st.integers(min_value=-MAXIMO, max_value=MAXIMO),
+)
+
+
+@given(inteiros_formatados())
+def test_inteiros_formatados(par):
+    texto, valor = par
+    assert parse_count(texto) == valor
+
+
+@given(contadores_com_sufixo())
+def test_sufixos(par):
+    texto, valor = par
+    assert parse_count(texto) == valor
+
+
+@given(st.text().filter(lambda texto: not any('0' <= c <= '9' for c in texto)))
+def test_sem_digitos_devolve_default(texto):
+    assert parse_count(texto, default=-1) == -1
+
+
+@given(inteiros_formatados(), st.text(alphabet="acdefghjklnopqrstuvwxyz", min_size=1, max_size=4))
+def test_sufixo_desconhecido_devolve_default(par, sufixo):
+    if sufixo in MULTIPLICADORES:
+        return
+    assert parse_count(f"{par[0]} {sufixo}", default=-1) == -1
+
+
+@given(inteiros_formatados(), st.sampled_from(['x', '-', '@', '~']))
+def test_prefixo_invalido_devolve_default(par, prefixo):
+    assert parse_count(prefixo + par[0], default=-1) == -1
+
+
+@pytest.mark.parametrize("texto, valor", [
+    ("1234", 1234), ("1,234", 1234), ("1.234.567", 1234567), ("3.4K", 3400), ("12.5M", 12_500_000),
+    ("1,2 mil", 1200), ("3,5 mi", 3_500_000), ("2 bi", 2_000_000_000), ("15,3K", 15300), ("12,7", 13),
+    ("1.234,6", 1235), ("1,234.6", 1235), ("1.2M", 1_200_000), ("1.2.3k", 123_000),
+    ("", 0), (None, 0), ("abc", 0), ("1.2,3,4", 0), ("1 xyz", 0),
+])
+def test_exemplos(texto, valor):
+    assert parse_count(texto) == valor
+
+
+@settings(max_examples=200)
+@given(st.lists(quaisquer, max_size=30), st.integers(min_value=-1, max_value=1))
+def test_parse_counts_igual_a_map(textos, default):
+    serie = pd.Series(textos, dtype=object, index=range(100, 100 + len(textos)))
+
+    resultado = parse_counts(serie, default)
+
+    esperado = serie.map(lambda texto: parse_count(texto, default))
+    pd.testing.assert_series_equal(resultado, esperado.astype('int64'))
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from db import (Database, SnapshotBatchWriter, connect_db, create_schema, data_versions, insert_snapshot,
+                insert_snapshots, snapshot_key, snapshot_row)
+
+QUANDO = datetime(2026, 6, 15, 12)
+DADOS = {'seguidores': 10, 'curtidas': 20, 'visualizacoes': 30}
+
+
+def test_insert_snapshots_conta_so_as_linhas_inseridas():
+    conn = connect_db(":memory:")
+    create_schema(conn)
+    repetida = snapshot_row('admin', '@velho', DADOS, quando=QUANDO)
+    assert insert_snapshots(conn, [repetida]) == 1
+    versao_velho = data_versions.snapshot([snapshot_key('admin', '@velho')])
+    versao_novo = data_versions.snapshot([snapshot_key('admin', '@novo')])
+
+    inseridas = insert_snapshots(conn, [repetida, repetida, snapshot_row('admin', '@novo', DADOS, quando=QUANDO)])
+
+    assert inseridas == 1
+    assert conn.execute("SELECT count(*) FROM snapshots").fetchone()[0] == 2
+    # Só o par que ganhou uma linha invalida o cache
+    assert data_versions.snapshot([snapshot_key('admin', '@velho')]) == versao_velho
+    assert data_versions.snapshot([snapshot_key('admin', '@novo')]) != versao_novo
+    assert insert_snapshot(conn, 'admin', '@novo', DADOS) == 1
+    conn.close()
+
+
+def test_batch_writer_conta_so_as_linhas_inseridas(tmp_path):
+    database = Database(str(tmp_path / "influencers.db"), pool_size=1)
+    database.run(create_schema)
+    escritor = SnapshotBatchWriter(database, flush_every=2)
+
+    for influencer in ('@a', '@a', '@b'):
+        escritor.add('admin', influencer, DADOS)
+    assert escritor.pending == 1
+
+    # '@a' duas vezes no mesmo segundo é o mesmo snapshot (salvo que o relógio vire o segundo entre as duas)
+    assert escritor.flush() == database.fetchone("SELECT count(*) FROM snapshots")[0]
+    assert escritor.pending == 0
+    database.close()
@@ -0,0 +1,107 @@
+import io
+
+import pytest
+
+import ingest
+from db import get_database
+from ingest import ler_usernames, main
+
+
+class _Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class _Redirecionada(io.StringIO):
+    def isatty(self):
+        return False
+
+
+# ==============================================
+# LEITURA DOS USERNAMES
+# ==============================================
+def test_usernames_dos_argumentos():
+    assert ler_usernames(["simoneses", "@outro"], entrada=_Terminal()) == ["simoneses", "outro"]
+
+
+def test_usernames_do_arquivo_com_comentarios(tmp_path):
+    arquivo = tmp_path / "influencers.txt"
+    arquivo.write_text("# lista da semana\nsimoneses, outro;terceiro\n  # @comentado\n\n@quarto quinto\n",
+                       encoding="utf-8")
+
+    assert ler_usernames(["primeiro"], str(arquivo), entrada=_Terminal()) == [
+        "primeiro", "simoneses", "outro", "terceiro", "quarto", "quinto"]
+
+
+def test_usernames_da_entrada_padrao_com_traco():
+    assert ler_usernames(arquivo="-", entrada=_Terminal("simoneses\n# nao\noutro\n")) == ["simoneses", "outro"]
+
+
+def test_entrada_redirecionada_so_sem_argumentos():
+    assert ler_usernames(entrada=_Redirecionada("simoneses\n")) == ["simoneses"]
+    assert ler_usernames(["outro"], entrada=_Redirecionada("simoneses\n")) == ["outro"]
+
+
+def test_usernames_repetidos_sem_diferenca_de_caixa():
+    # fetch_profile busca 'foo' para os três; gravar @Foo e @foo seria o mesmo perfil duas vezes
+    assert ler_usernames(["Foo", "foo", " @FOO ", "bar"], entrada=_Terminal()) == ["foo", "bar"]
+
+
+# ==============================================
+# EXECUÇÃO PELA LINHA DE COMANDO
+# ==============================================
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """``main`` sem TikTok, exportadores nem troca do handler de SIGTERM; devolve (caminho do banco, buscados)."""
+    buscados = []
+
+    def buscar(username):
+        buscados.append(username)
+        if username.startswith("inexistente"):
+            raise ValueError(f"@{username} não encontrado")
+        return {'seguidores': 10, 'curtidas': 20, 'visualizacoes': 30}
+
+    monkeypatch.setattr(ingest, "fetch_profile", buscar)
+    monkeypatch.setattr(ingest, "start_exporters", lambda: None)
+    monkeypatch.setattr(ingest.signal, "signal", lambda *args: None)
+    monkeypatch.setattr(ingest.sys, "stdin", _Terminal())
+    return str(tmp_path / "influencers.db"), buscados
+
+
+def test_main_sai_com_zero_quando_todos_sao_salvos(cli, capsys):
+    banco, buscados = cli
+
+    assert main(["Foo", "foo", "@bar", "--banco", banco, "-w", "2"]) == 0
+
+    assert sorted(buscados) == ["bar", "foo"]
+    influencers = get_database(banco).fetchall("SELECT influencer FROM snapshots ORDER BY influencer")
+    assert influencers == [("@bar",), ("@foo",)]
+    assert "2 de 2 perfis salvos" in capsys.readouterr().out
+
+
+def test_main_sai_com_um_se_algum_perfil_falha(cli, capsys):
+    banco, _ = cli
+
+    assert main(["simoneses", "inexistente", "--banco", banco]) == 1
+
+    saida = capsys.readouterr()
+    assert "1 de 2 perfis salvos" in saida.out
+    assert "@inexistente" in saida.err
+
+
+def test_main_sai_com_130_se_interrompido(cli, monkeypatch):
+    banco, _ = cli
+
+    def interromper(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(ingest, "ingest", interromper)
+    assert main(["simoneses", "--banco", banco]) == 130
+
+
+def test_main_sem_usernames_e_erro_de_uso(cli):
+    banco, _ = cli
+
+    with pytest.raises(SystemExit) as saida:
+        main(["--banco", banco])
+    assert saida.value.code == 2
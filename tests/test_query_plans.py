@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from db import (INFLUENCER_STATE_SQL, connect_db, create_schema, influencers_query, pontos_query, produtos_query,
+                rollup_query, snapshots_query)
+
+INICIO, FIM = date(2026, 1, 1), date(2026, 3, 31)
+INFLUENCERS = ['@simoneses', '@outro_influencer']
+
+# (nome, sql, params, índice esperado) das consultas que rodam a cada análise, busca ou agendamento
+CONSULTAS = [
+    ("snapshots", *snapshots_query('admin', INFLUENCERS, INICIO, FIM, 'influencer, data, seguidores')[:2],
+     "idx_snapshots_usuario_influencer_ts"),
+    ("snapshots_lives", *snapshots_query('admin', INFLUENCERS, INICIO, FIM, 'influencer, data, live_visualizacoes',
+                                         condicao="AND live_visualizacoes > 0")[:2],
+     "idx_snapshots_usuario_influencer_ts"),
+    ("snapshots_incremental", *snapshots_query('admin', INFLUENCERS, INICIO, FIM, 'influencer, ts',
+                                               marcas={'@simoneses': 100, '@outro_influencer': 200})[:2],
+     "idx_snapshots_usuario_influencer_ts"),
+    ("rollup_dia", *rollup_query('admin', INFLUENCERS, INICIO, FIM, 'dia', 'influencer, ts')[:2],
+     "sqlite_autoindex_rollup_diario_1"),
+    ("rollup_semana", *rollup_query('admin', INFLUENCERS, INICIO, FIM, 'semana', 'influencer, ts')[:2],
+     "sqlite_autoindex_rollup_semanal_1"),
+    ("rollup_mes_incremental", *rollup_query('admin', INFLUENCERS, INICIO, FIM, 'mes', 'influencer, ts',
+                                             marcas={'@simoneses': 100})[:2],
+     "sqlite_autoindex_rollup_mensal_1"),
+    ("pontos", *pontos_query('admin', INFLUENCERS, INICIO, FIM)[:2], "sqlite_autoindex_rollup_diario_1"),
+    ("produtos", *produtos_query(INFLUENCERS, INICIO, FIM)[:2], "idx_produtos_live_influencer_ts"),
+    ("influencer_state", INFLUENCER_STATE_SQL, ('admin', '@simoneses'), "sqlite_autoindex_influencer_state_1"),
+    ("influencers", *influencers_query('admin')[:2], "sqlite_autoindex_influencer_state_1"),
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = connect_db(":memory:")
+    create_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("nome, sql, params, indice", CONSULTAS, ids=[consulta[0] for consulta in CONSULTAS])
+def test_consulta_usa_indice(conn, nome, sql, params, indice):
+    passos = [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    assert passos
+    for passo in passos:
+        # Sem varredura da tabela nem ordenação em tabela temporária
+        assert passo.startswith("SEARCH"), passos
+        assert f"USING INDEX {indice} " in passo or f"USING COVERING INDEX {indice} " in passo, passos
+        assert "TEMP B-TREE" not in passo, passos
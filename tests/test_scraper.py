@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+import requests
+
+import scraper
+from conftest import ler_pagina
+from scraper import BlockedError, FallbackBackend, PageMeter, ProfileParseError, fetch_profile_http, parse_profile_html
+from throttle import HostGuard
+
+
+# ==============================================
+# LEITURA DO HTML
+# ==============================================
+def test_parse_universal_data():
+    dados = parse_profile_html(ler_pagina("perfil_universal.html"), "simoneses")
+    assert dados == {'seguidores': 1234567, 'curtidas': 98765432, 'visualizacoes': 98765432, 'videos': 845}
+
+
+def test_parse_sigi_state():
+    dados = parse_profile_html(ler_pagina("perfil_sigi.html"), "outro_influencer")
+    assert dados == {'seguidores': 4321, 'curtidas': 55000, 'visualizacoes': 55000, 'videos': 17}
+
+
+def test_parse_sigi_state_com_outro_username_usa_o_unico_perfil():
+    assert parse_profile_html(ler_pagina("perfil_sigi.html"), "outro")['seguidores'] == 4321
+
+
+@pytest.mark.parametrize("html", [
+    ler_pagina("perfil_sem_dados.html"),
+    "<html><body>sem script</body></html>",
+    '<script id="SIGI_STATE">{json quebrado</script>',
+])
+def test_parse_sem_contadores(html):
+    with pytest.raises(ProfileParseError):
+        parse_profile_html(html, "simoneses")
+
+
+# ==============================================
+# CAMINHO HTTP (SERVIDOR LOCAL)
+# ==============================================
+@pytest.fixture
+def perfis(servidor_perfis, monkeypatch):
+    """PROFILE_URL apontando para o servidor local, com um HostGuard sem limite de taxa nem novas tentativas."""
+    url, respostas = servidor_perfis
+    monkeypatch.setattr(scraper, "PROFILE_URL", url + "/@{username}")
+    guarda = HostGuard("127.0.0.1", rate=0, attempts=1)
+    monkeypatch.setattr(scraper, "get_host_guard", lambda url: guarda)
+    with requests.Session() as session:
+        yield respostas, session
+
+
+def test_fetch_profile_http(perfis):
+    respostas, session = perfis
+    respostas["/@simoneses"] = (200, ler_pagina("perfil_universal.html"), {})
+    respostas["/@outro_influencer"] = (200, ler_pagina("perfil_sigi.html"), {})
+
+    assert fetch_profile_http("simoneses", session)['seguidores'] == 1234567
+    assert fetch_profile_http("outro_influencer", session)['curtidas'] == 55000
+
+
+def test_fetch_profile_http_sem_contadores(perfis):
+    respostas, session = perfis
+    respostas["/@simoneses"] = (200, ler_pagina("perfil_sem_dados.html"), {})
+
+    with pytest.raises(ProfileParseError):
+        fetch_profile_http("simoneses", session)
+
+
+@pytest.mark.parametrize("status, cabecalhos, retry_after", [
+    (429, {"Retry-After": "7"}, 7.0),
+    (429, {}, None),
+    (403, {}, None),
+])
+def test_fetch_profile_http_bloqueado(perfis, status, cabecalhos, retry_after):
+    respostas, session = perfis
+    respostas["/@simoneses"] = (status, "", cabecalhos)
+
+    with pytest.raises(BlockedError) as erro:
+        fetch_profile_http("simoneses", session)
+    assert erro.value.status == status
+    assert erro.value.retry_after == retry_after
+
+
+def test_fetch_profile_http_erro_http(perfis):
+    _, session = perfis
+    with pytest.raises(requests.HTTPError):
+        fetch_profile_http("inexistente", session)
+
+
+# ==============================================
+# FALLBACK PARA O NAVEGADOR
+# ==============================================
+class _Backend:
+    def __init__(self, resultado):
+        self.resultado = resultado
+        self.chamadas = []
+
+    def fetch(self, username):
+        self.chamadas.append(username)
+        if isinstance(self.resultado, Exception):
+            raise self.resultado
+        return self.resultado
+
+
+def test_fallback_usa_http_quando_o_html_e_lido():
+    http, navegador = _Backend({'seguidores': 1}), _Backend({'seguidores': 2})
+    backend = FallbackBackend(http, navegador)
+
+    assert backend.fetch("simoneses") == {'seguidores': 1}
+    assert navegador.chamadas == []
+    assert backend.stats() == {"primary": 1, "fallback": 0}
+
+
+def test_fallback_abre_o_navegador_quando_o_html_nao_e_lido():
+    http, navegador = _Backend(ProfileParseError("sem contadores")), _Backend({'seguidores': 2})
+    backend = FallbackBackend(http, navegador)
+
+    assert backend.fetch("simoneses") == {'seguidores': 2}
+    assert navegador.chamadas == ["simoneses"]
+    assert backend.stats() == {"primary": 0, "fallback": 1}
+
+
+@pytest.mark.parametrize("erro", [BlockedError("simoneses", 429), requests.ConnectionError("recusada"),
+                                  requests.HTTPError("404")])
+def test_fallback_nao_abre_o_navegador_em_outros_erros(erro):
+    http, navegador = _Backend(erro), _Backend({'seguidores': 2})
+
+    with pytest.raises(type(erro)):
+        FallbackBackend(http, navegador).fetch("simoneses")
+    assert navegador.chamadas == []
+
+
+# ==============================================
+# MEDIÇÃO DAS PÁGINAS DO NAVEGADOR
+# ==============================================
+class _Resposta:
+    def __init__(self, **headers):
+        self.headers = headers
+
+
+def test_page_meter_soma_content_length_sem_ida_ao_navegador(monkeypatch):
+    monkeypatch.setattr(scraper, "_page_metrics", deque(maxlen=10))
+    medidor = PageMeter("simoneses", lean=True)
+    for resposta in (_Resposta(**{"content-length": "1000"}), _Resposta(), _Resposta(**{"content-length": "x"}),
+                     _Resposta(**{"content-length": "24"})):
+        medidor.on_response(resposta)
+        # Só o evento é contado; o objeto da requisição não é guardado nem consultado
+        medidor.on_request_finished(object())
+    medidor.selector_ready()
+
+    medidor.finish()
+
+    registro, = scraper._page_metrics
+    assert (registro["bytes"], registro["requests"]) == (1024, 4)
+
+
+def test_page_meter_nao_derruba_o_scraping(monkeypatch):
+    class _Quebrado:
+        def append(self, registro):
+            raise RuntimeError("falhou")
+
+    monkeypatch.setattr(scraper, "_page_metrics", _Quebrado())
+    PageMeter("simoneses", lean=True).finish()
+
+
+# ==============================================
+# BUSCA EM LOTE (NAVEGADOR FALSO)
+# ==============================================
+class _Contexto:
+    async def close(self):
+        pass
+
+
+class _Navegador:
+    async def new_context(self, **opcoes):
+        return _Contexto()
+
+    async def close(self):
+        pass
+
+
+class _Playwright:
+    chromium = None
+
+    async def __aenter__(self):
+        async def launch(**opcoes):
+            return _Navegador()
+        self.chromium = type("Chromium", (), {"launch": staticmethod(launch)})
+        return self
+
+    async def __aexit__(self, *erro):
+        pass
+
+
+def test_lote_limita_o_tempo_total_por_perfil_com_novas_tentativas(monkeypatch):
+    async def pagina_travada(context, username, lean=True, warm=False):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(scraper, "async_playwright", _Playwright)
+    monkeypatch.setattr(scraper, "read_profile_async", pagina_travada)
+    monkeypatch.setattr(scraper.storage_state, "load", lambda: None)
+    guarda = HostGuard("127.0.0.1", rate=0, attempts=3)
+    monkeypatch.setattr(scraper, "get_host_guard", lambda url: guarda)
+
+    inicio = time.perf_counter()
+    (username, dados, erro), = scraper.scrape_many(["simoneses"], timeout=0.5)
+
+    # Sem o prazo, seriam 3 tentativas de 0,5s mais o backoff entre elas
+    assert time.perf_counter() - inicio < 1.0
+    assert dados is None and isinstance(erro, TimeoutError)
+    assert guarda.stats()["transient_errors"] >= 1
@@ -0,0 +1,245 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import throttle
+from throttle import AdaptiveLimit, CircuitBreaker, CircuitOpenError, HostGuard, TokenBucket
+
+
+class _Relogio:
+    """Substitui o módulo time em throttle: o tempo só anda com sleep() ou avancar()."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(throttle, "time", relogio)
+    return relogio
+
+
+class _Transitorio(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.retry_after = retry_after
+
+
+def _transitorio(erro):
+    return isinstance(erro, _Transitorio)
+
+
+# ==============================================
+# TOKEN BUCKET
+# ==============================================
+def test_token_bucket_rajada_e_depois_espera_pela_taxa(relogio):
+    balde = TokenBucket(rate=2, burst=2)
+
+    assert [balde.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+
+    # Em 1s entram 2 tokens, que pagam as duas reservas já feitas
+    relogio.avancar(1.0)
+    assert balde.reserve() == 0.5
+
+
+def test_token_bucket_sem_limite():
+    assert TokenBucket(rate=0, burst=1).reserve() == 0.0
+
+
+# ==============================================
+# LIMITE ADAPTATIVO (AIMD)
+# ==============================================
+def test_limite_cai_pela_metade_com_muitos_erros():
+    limite = AdaptiveLimit(start=8, maximum=16, high_error_rate=0.2, window=20)
+
+    for _ in range(throttle.ERROR_WINDOW_MIN - 1):
+        limite.record(True)
+    assert limite.limit == 8
+
+    limite.record(True)
+    assert limite.limit == 4
+    # A janela recomeça: um erro isolado logo depois não reduz de novo
+    limite.record(True)
+    assert limite.limit == 4
+
+
+def test_limite_sobe_de_um_em_um_com_sucessos():
+    limite = AdaptiveLimit(start=2, maximum=4, high_error_rate=0.2, window=20)
+
+    for esperado in (3, 4, 4):
+        for _ in range(limite.limit):
+            limite.record(False)
+        assert limite.limit == esperado
+
+
+def test_limite_nao_passa_de_limit_chamadas_simultaneas():
+    limite = AdaptiveLimit(start=2, maximum=4)
+
+    assert limite.try_acquire() and limite.try_acquire()
+    assert not limite.try_acquire()
+    limite.release()
+    assert limite.try_acquire()
+
+
+# ==============================================
+# CIRCUIT BREAKER
+# ==============================================
+def test_circuito_abre_depois_de_n_falhas_seguidas(relogio):
+    circuito = CircuitBreaker("tiktok.com", failures=3, open_for=60)
+
+    circuito.record(True)
+    circuito.record(True)
+    circuito.record(False)
+    circuito.record(True)
+    circuito.record(True)
+    circuito.allow()
+    assert circuito.state == CircuitBreaker.CLOSED
+
+    circuito.record(True)
+    assert circuito.state == CircuitBreaker.OPEN
+    relogio.avancar(59)
+    with pytest.raises(CircuitOpenError) as erro:
+        circuito.allow()
+    assert erro.value.retry_in == pytest.approx(1)
+
+
+@pytest.mark.parametrize("sonda_falha", [False, True])
+def test_meio_aberto_deixa_passar_uma_unica_sonda(relogio, sonda_falha):
+    circuito = CircuitBreaker("tiktok.com", failures=1, open_for=60)
+    circuito.record(True)
+    relogio.avancar(60)
+
+    circuito.allow()
+    assert circuito.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuito.allow()
+
+    circuito.record(sonda_falha)
+    if sonda_falha:
+        assert circuito.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            circuito.allow()
+    else:
+        assert circuito.state == CircuitBreaker.CLOSED
+        circuito.allow()
+        circuito.allow()
+
+
+def test_sonda_cancelada_e_substituida_depois_de_open_for(relogio):
+    circuito = CircuitBreaker("tiktok.com", failures=1, open_for=60)
+    circuito.record(True)
+    relogio.avancar(60)
+    circuito.allow()
+
+    relogio.avancar(60)
+    circuito.allow()
+    assert circuito.state == CircuitBreaker.HALF_OPEN
+
+
+# ==============================================
+# HOST GUARD (NOVAS TENTATIVAS)
+# ==============================================
+def _falha_depois(resultados):
+    """fn que levanta ou devolve os itens de ``resultados``, um por chamada."""
+    restantes = list(resultados)
+
+    def fn():
+        resultado = restantes.pop(0)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+    return fn
+
+
+def test_repete_erros_transitorios_com_backoff(relogio):
+    guarda = HostGuard("tiktok.com", rate=0, attempts=3)
+
+    assert guarda.call(_falha_depois([_Transitorio(), _Transitorio(), "ok"]), _transitorio) == "ok"
+
+    assert len(relogio.esperas) == 2
+    assert guarda.stats()["retries"] == 2
+    assert guarda.stats()["transient_errors"] == 2
+    assert guarda.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_nao_repete_erros_que_nao_sao_transitorios(relogio):
+    guarda = HostGuard("tiktok.com", rate=0, attempts=3)
+
+    with pytest.raises(ValueError):
+        guarda.call(_falha_depois([ValueError("404"), "ok"]), _transitorio)
+    assert relogio.esperas == []
+
+
+def test_retry_after_limitado_a_backoff_max(relogio):
+    guarda = HostGuard("tiktok.com", rate=0, attempts=2)
+
+    guarda.call(_falha_depois([_Transitorio(retry_after=3600), "ok"]), _transitorio)
+
+    assert relogio.esperas == [throttle.SCRAPER_BACKOFF_MAX_S]
+
+
+def test_retry_after_curto_respeitado(relogio, monkeypatch):
+    monkeypatch.setattr(throttle.random, "uniform", lambda inicio, fim: 0.0)
+    guarda = HostGuard("tiktok.com", rate=0, attempts=2)
+
+    guarda.call(_falha_depois([_Transitorio(retry_after=7), "ok"]), _transitorio)
+
+    assert relogio.esperas == [7]
+
+
+def test_nao_repete_se_o_backoff_passa_do_prazo(relogio):
+    guarda = HostGuard("tiktok.com", rate=0, attempts=3)
+
+    with pytest.raises(_Transitorio):
+        guarda.call(_falha_depois([_Transitorio(retry_after=20), "ok"]), _transitorio,
+                    deadline=relogio.agora + 10)
+    assert relogio.esperas == []
+    assert guarda.stats()["retries"] == 0
+
+
+def test_circuito_aberto_rejeita_sem_chamar(relogio):
+    guarda = HostGuard("tiktok.com", rate=0, attempts=1)
+    chamadas = []
+
+    def falhar():
+        chamadas.append(1)
+        raise _Transitorio()
+
+    for _ in range(guarda.breaker.failures):
+        with pytest.raises(_Transitorio):
+            guarda.call(falhar, _transitorio)
+    with pytest.raises(CircuitOpenError):
+        guarda.call(falhar, _transitorio)
+
+    assert len(chamadas) == guarda.breaker.failures
+    assert guarda.stats()["rejected"] == 1
+
+
+def test_call_async_repete_e_respeita_retry_after(relogio, monkeypatch):
+    esperas = []
+
+    async def dormir(segundos):
+        esperas.append(segundos)
+
+    monkeypatch.setattr(throttle, "asyncio", SimpleNamespace(sleep=dormir))
+    guarda = HostGuard("tiktok.com", rate=0, attempts=2)
+    fn = _falha_depois([_Transitorio(retry_after=3600), "ok"])
+
+    async def chamar():
+        return fn()
+
+    assert asyncio.run(guarda.call_async(chamar, _transitorio)) == "ok"
+    assert esperas == [throttle.SCRAPER_BACKOFF_MAX_S]
@@ -0,0 +1,319 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from metrics import observe
+
+# ==============================================
+# LIMITE DE TAXA, BACKOFF E CIRCUIT BREAKER
+# ==============================================
+# Toda chamada do scraper a um host passa pelo HostGuard dele, compartilhado
+# pelo processo inteiro (app, agendador, ingest.py):
+#   - TokenBucket: no máximo SCRAPER_RATE_PER_S requisições por segundo, com
+#     rajadas de até SCRAPER_BURST;
+#   - AdaptiveLimit: quantas chamadas ficam em andamento ao mesmo tempo; cai
+#     pela metade quando a taxa de erro recente passa de SCRAPER_ERROR_RATE_HIGH
+#     e sobe de um em um enquanto as chamadas dão certo (AIMD);
+#   - CircuitBreaker: depois de SCRAPER_CIRCUIT_FAILURES falhas seguidas, as
+#     chamadas falham na hora por SCRAPER_CIRCUIT_OPEN_S segundos, e então uma
+#     única chamada de teste decide se o circuito fecha;
+#   - novas tentativas com backoff exponencial e jitter (respeitando o
+#     Retry-After) para erros transitórios: tempo esgotado, 429 e 403.
+SCRAPER_RATE_PER_S = float(os.environ.get("SCRAPER_RATE_PER_S", "2"))
+SCRAPER_BURST = int(os.environ.get("SCRAPER_BURST", "4"))
+SCRAPER_CONCURRENCY_START = int(os.environ.get("SCRAPER_CONCURRENCY_START", "4"))
+SCRAPER_CONCURRENCY_MAX = int(os.environ.get("SCRAPER_CONCURRENCY_MAX", "16"))
+SCRAPER_ERROR_RATE_HIGH = float(os.environ.get("SCRAPER_ERROR_RATE_HIGH", "0.2"))
+SCRAPER_RETRY_ATTEMPTS = int(os.environ.get("SCRAPER_RETRY_ATTEMPTS", "3"))
+SCRAPER_BACKOFF_BASE_S = float(os.environ.get("SCRAPER_BACKOFF_BASE_S", "1"))
+SCRAPER_BACKOFF_MAX_S = float(os.environ.get("SCRAPER_BACKOFF_MAX_S", "30"))
+SCRAPER_CIRCUIT_FAILURES = int(os.environ.get("SCRAPER_CIRCUIT_FAILURES", "5"))
+SCRAPER_CIRCUIT_OPEN_S = float(os.environ.get("SCRAPER_CIRCUIT_OPEN_S", "60"))
+
+# Janela da taxa de erro e mínimo de resultados nela antes de reduzir o limite
+ERROR_WINDOW = 20
+ERROR_WINDOW_MIN = 5
+# Intervalo entre verificações de vaga no limite de concorrência (API assíncrona)
+ASYNC_POLL_S = 0.05
+
+
+class CircuitOpenError(Exception):
+    """O circuito do host está aberto: a chamada nem foi feita."""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"Muitas falhas seguidas em {host}; novas tentativas em {retry_in:.0f}s.")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def backoff(attempt, base=SCRAPER_BACKOFF_BASE_S, cap=SCRAPER_BACKOFF_MAX_S):
+    """Espera antes da tentativa ``attempt`` + 1: backoff exponencial com jitter total."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Limite de ``rate`` chamadas por segundo com rajadas de até ``burst``.
+
+    ``reserve()`` desconta o token na hora (o saldo pode ficar negativo) e
+    devolve quanto esperar antes de usá-lo, então quem chega primeiro sai
+    primeiro, tanto em threads quanto em corrotinas.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (agora - self._updated) * self.rate)
+            self._updated = agora
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class AdaptiveLimit:
+    """Limite de chamadas simultâneas ajustado pela taxa de erro (aumento aditivo, redução multiplicativa)."""
+
+    def __init__(self, start=SCRAPER_CONCURRENCY_START, minimum=1, maximum=SCRAPER_CONCURRENCY_MAX,
+                 high_error_rate=SCRAPER_ERROR_RATE_HIGH, window=ERROR_WINDOW):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(start, self.minimum), self.maximum)
+        self.high_error_rate = high_error_rate
+        self._results = deque(maxlen=window)
+        self._successes = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        with self._condition:
+            if self._in_use >= self.limit:
+                return False
+            self._in_use += 1
+            return True
+
+    def acquire(self):
+        with self._condition:
+            while self._in_use >= self.limit:
+                self._condition.wait()
+            self._in_use += 1
+
+    async def acquire_async(self):
+        while not self.try_acquire():
+            await asyncio.sleep(ASYNC_POLL_S)
+
+    def release(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def record(self, failed):
+        with self._condition:
+            self._results.append(failed)
+            taxa = sum(self._results) / len(self._results)
+            if failed:
+                self._successes = 0
+                if taxa >= self.high_error_rate and len(self._results) >= ERROR_WINDOW_MIN:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    # A próxima redução precisa de uma janela nova de evidências
+                    self._results.clear()
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and taxa < self.high_error_rate / 2:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._successes = 0
+                    self._condition.notify_all()
+
+    def error_rate(self):
+        with self._condition:
+            return sum(self._results) / len(self._results) if self._results else 0.0
+
+
+class CircuitBreaker:
+    """Fechado → aberto após ``failures`` falhas seguidas → meio-aberto após ``open_for`` segundos.
+
+    No estado meio-aberto só uma chamada de teste passa; se ela der certo o
+    circuito fecha, se falhar ele abre de novo.
+    """
+    CLOSED, OPEN, HALF_OPEN = "fechado", "aberto", "meio-aberto"
+
+    def __init__(self, host, failures=SCRAPER_CIRCUIT_FAILURES, open_for=SCRAPER_CIRCUIT_OPEN_S):
+        self.host = host
+        self.failures = max(1, failures)
+        self.open_for = open_for
+        self.state = self.CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Levanta CircuitOpenError se a chamada não deve ser feita agora."""
+        with self._lock:
+            agora = time.monotonic()
+            if self.state == self.OPEN:
+                restante = self._opened_at + self.open_for - agora
+                if restante > 0:
+                    raise CircuitOpenError(self.host, restante)
+                self.state = self.HALF_OPEN
+                self._probe_at = agora
+            elif self.state == self.HALF_OPEN:
+                # Uma chamada de teste por vez; se ela sumir (cancelada), outra assume depois de open_for
+                if agora - self._probe_at < self.open_for:
+                    raise CircuitOpenError(self.host, self._probe_at + self.open_for - agora)
+                self._probe_at = agora
+
+    def record(self, failed):
+        with self._lock:
+            if not failed:
+                self.state = self.CLOSED
+                self._consecutive = 0
+                return
+            self._consecutive += 1
+            if self.state == self.HALF_OPEN or self._consecutive >= self.failures:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._consecutive = 0
+
+
+class HostGuard:
+    """TokenBucket + AdaptiveLimit + CircuitBreaker de um host, com novas tentativas."""
+
+    def __init__(self, host, rate=SCRAPER_RATE_PER_S, burst=SCRAPER_BURST, attempts=SCRAPER_RETRY_ATTEMPTS):
+        self.host = host
+        self.attempts = max(1, attempts)
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = AdaptiveLimit()
+        self.breaker = CircuitBreaker(host)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "transient_errors": 0, "rejected": 0}
+
+    def _allow(self):
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self._count("rejected")
+            raise
+
+    def _record(self, failed):
+        self.breaker.record(failed)
+        self.limit.record(failed)
+
+    def _count(self, chave):
+        with self._lock:
+            self._stats[chave] += 1
+
+    def _after_error(self, erro, attempt, is_transient, deadline=None):
+        """Espera antes da próxima tentativa, ou None se o erro deve subir."""
+        if not is_transient(erro):
+            # O host respondeu (ex.: perfil inexistente): conta como chamada saudável
+            self._record(False)
+            return None
+        self._record(True)
+        self._count("transient_errors")
+        if attempt + 1 >= self.attempts:
+            return None
+        espera = backoff(attempt)
+        retry_after = getattr(erro, "retry_after", None)
+        if retry_after:
+            espera = max(espera, min(retry_after, SCRAPER_BACKOFF_MAX_S))
+        if deadline is not None and time.monotonic() + espera >= deadline:
+            return None
+        self._count("retries")
+        observe("throttle.backoff", espera)
+        return espera
+
+    def call(self, fn, is_transient=lambda erro: False, deadline=None):
+        """Executa ``fn()`` respeitando o circuito, a taxa e a concorrência do host.
+
+        Erros para os quais ``is_transient(erro)`` é verdadeiro contam como
+        falha do host e são repetidos até ``attempts`` vezes com backoff, sem
+        passar de ``deadline`` (em ``time.monotonic()``), se houver.
+        """
+        for attempt in range(self.attempts):
+            self._allow()
+            with self.limit:
+                self._count("calls")
+                espera = self.bucket.reserve()
+                if espera:
+                    observe("throttle.rate_wait", espera)
+                    time.sleep(espera)
+                try:
+                    resultado = fn()
+                except Exception as erro:
+                    espera = self._after_error(erro, attempt, is_transient, deadline)
+                    if espera is None:
+                        raise
+                else:
+                    self._record(False)
+                    return resultado
+            # Fora do limite de concorrência: a vaga fica para outra chamada
+            time.sleep(espera)
+
+    async def call_async(self, fn, is_transient=lambda erro: False, deadline=None):
+        """Versão assíncrona de ``call``: ``fn()`` devolve um awaitable."""
+        for attempt in range(self.attempts):
+            self._allow()
+            await self.limit.acquire_async()
+            try:
+                self._count("calls")
+                espera = self.bucket.reserve()
+                if espera:
+                    observe("throttle.rate_wait", espera)
+                    await asyncio.sleep(espera)
+                try:
+                    resultado = await fn()
+                except Exception as erro:
+                    espera = self._after_error(erro, attempt, is_transient, deadline)
+                    if espera is None:
+                        raise
+                else:
+                    self._record(False)
+                    return resultado
+            finally:
+                self.limit.release()
+            await asyncio.sleep(espera)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "host": self.host,
+            "circuit": self.breaker.state,
+            "concurrency": self.limit.limit,
+            "concurrency_max": self.limit.maximum,
+            "error_rate": self.limit.error_rate(),
+            "rate_per_s": self.bucket.rate,
+        })
+        return stats
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_host_guard(url):
+    """HostGuard compartilhado do host de ``url`` (ou do próprio host)."""
+    host = urlparse(url).hostname or url
+    with _guards_lock:
+        guard = _guards.get(host)
+        if guard is None:
+            guard = _guards[host] = HostGuard(host)
+        return guard
@@ -0,0 +1,18 @@
+# ==============================================
+# FUNÇÕES UTILITÁRIAS
+# ==============================================
+def estimate_earnings(views):
+    """Estimativa simples de ganhos baseada em visualizações."""
+    # Ajuste conforme sua lógica
+    return views * 0.01
+
+
+def normalize_username(username):
+    """Username como o TikTok o trata: sem espaços, sem @ e em minúsculas."""
+    return username.strip().lstrip('@').lower()
+
+
+def limpar_usernames(nomes):
+    """Usernames normalizados (``normalize_username``) e sem repetição, na ordem em que aparecem."""
+    # dict mantém a ordem e evita a busca linear numa lista a cada nome
+    return list(dict.fromkeys(nome for nome in map(normalize_username, nomes) if nome))